@@ -15,9 +15,14 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 
+# Use the application's database URL rather than the placeholder in alembic.ini
+from app.core.config import settings
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.core.database import Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
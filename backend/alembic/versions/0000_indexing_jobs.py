@@ -0,0 +1,51 @@
+"""Durable queue of RAG indexing jobs
+
+The indexing worker (``python -m app.worker``) claims rows from this table.
+Databases created with init_db.py already have it; run
+``alembic stamp head`` once after init_db.py.
+
+Revision ID: 0000_indexing_jobs
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0000_indexing_jobs"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# SQLAlchemy stores enum member names
+JOB_STATUS = sa.Enum("QUEUED", "RUNNING", "SUCCEEDED", "FAILED", name="indexingjobstatus")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "indexing_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("content_id", sa.Integer(), sa.ForeignKey("course_contents.id"), nullable=False),
+        sa.Column("status", JOB_STATUS, nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("worker_id", sa.String(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_indexing_jobs_id", "indexing_jobs", ["id"])
+    op.create_index("ix_indexing_jobs_content_id", "indexing_jobs", ["content_id"])
+    op.create_index("ix_indexing_jobs_status", "indexing_jobs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_indexing_jobs_status", table_name="indexing_jobs")
+    op.drop_index("ix_indexing_jobs_content_id", table_name="indexing_jobs")
+    op.drop_index("ix_indexing_jobs_id", table_name="indexing_jobs")
+    op.drop_table("indexing_jobs")
+    JOB_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,71 @@
+"""Key document_chunks by chunk id and course, with pgvector embeddings when enabled
+
+Chunks carry their content-derived chunk_id and course_id for filtered
+search. With VECTOR_STORE_BACKEND=pgvector, document_chunks also becomes the
+system of record for embeddings: the JSON embedding column becomes
+vector(384) with an HNSW cosine index. Other backends keep the JSON column
+and need no vector extension; switching an existing database to pgvector
+later is done by ``python init_db.py``, which applies the same change.
+Downgrade with the same VECTOR_STORE_BACKEND that was used to upgrade.
+
+Fresh databases created with init_db.py already have this shape; run
+``alembic stamp head`` once after init_db.py.
+
+Revision ID: 0001_pgvector_chunks
+Revises: 0000_indexing_jobs
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+revision = "0001_pgvector_chunks"
+down_revision = "0000_indexing_jobs"
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIM = 384
+
+
+def upgrade() -> None:
+    # JSON embeddings were never populated by the indexer; vectors are
+    # re-created by re-indexing content with VECTOR_STORE_BACKEND=pgvector.
+    op.execute("DELETE FROM document_chunks")
+    op.add_column("document_chunks", sa.Column("chunk_id", sa.String(length=64), nullable=False))
+    op.add_column("document_chunks", sa.Column("course_id", sa.Integer(), nullable=False))
+    op.create_foreign_key(
+        "fk_document_chunks_course_id", "document_chunks", "courses", ["course_id"], ["id"]
+    )
+
+    op.create_index("ix_document_chunks_chunk_id", "document_chunks", ["chunk_id"], unique=True)
+    op.create_index("ix_document_chunks_course_id", "document_chunks", ["course_id"])
+    op.create_index("ix_document_chunks_content_id", "document_chunks", ["content_id"])
+
+    if settings.VECTOR_STORE_BACKEND == "pgvector":
+        from pgvector.sqlalchemy import Vector
+
+        op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        op.drop_column("document_chunks", "embedding")
+        op.add_column("document_chunks", sa.Column("embedding", Vector(EMBEDDING_DIM), nullable=False))
+        op.create_index(
+            "ix_document_chunks_embedding_hnsw",
+            "document_chunks",
+            ["embedding"],
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        )
+
+
+def downgrade() -> None:
+    if settings.VECTOR_STORE_BACKEND == "pgvector":
+        op.drop_index("ix_document_chunks_embedding_hnsw", table_name="document_chunks")
+        op.execute("DELETE FROM document_chunks")
+        op.drop_column("document_chunks", "embedding")
+        op.add_column("document_chunks", sa.Column("embedding", sa.JSON(), nullable=False))
+
+    op.drop_index("ix_document_chunks_content_id", table_name="document_chunks")
+    op.drop_index("ix_document_chunks_course_id", table_name="document_chunks")
+    op.drop_index("ix_document_chunks_chunk_id", table_name="document_chunks")
+    op.drop_constraint("fk_document_chunks_course_id", "document_chunks", type_="foreignkey")
+    op.drop_column("document_chunks", "course_id")
+    op.drop_column("document_chunks", "chunk_id")
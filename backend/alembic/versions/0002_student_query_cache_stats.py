@@ -0,0 +1,31 @@
+"""Record answer-cache hits on student queries
+
+Adds cache_hit, cache_similarity, llm_latency_ms and saved_llm_ms to
+student_queries so cache hit rate and the Groq time it saves can be
+reported from the database.
+
+Revision ID: 0002_query_cache_stats
+Revises: 0001_pgvector_chunks
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_query_cache_stats"
+down_revision = "0001_pgvector_chunks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("student_queries", sa.Column("cache_hit", sa.String(length=16), nullable=True))
+    op.add_column("student_queries", sa.Column("cache_similarity", sa.Float(), nullable=True))
+    op.add_column("student_queries", sa.Column("llm_latency_ms", sa.Integer(), nullable=True))
+    op.add_column("student_queries", sa.Column("saved_llm_ms", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("student_queries", "saved_llm_ms")
+    op.drop_column("student_queries", "llm_latency_ms")
+    op.drop_column("student_queries", "cache_similarity")
+    op.drop_column("student_queries", "cache_hit")
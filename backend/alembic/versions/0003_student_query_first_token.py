@@ -0,0 +1,21 @@
+"""Record time to first token for streamed answers
+
+Revision ID: 0003_query_first_token
+Revises: 0002_query_cache_stats
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_query_first_token"
+down_revision = "0002_query_cache_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("student_queries", sa.Column("first_token_ms", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("student_queries", "first_token_ms")
@@ -0,0 +1,21 @@
+"""Store a document-level summary embedding per indexed content item
+
+Revision ID: 0004_summary_embedding
+Revises: 0003_query_first_token
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_summary_embedding"
+down_revision = "0003_query_first_token"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("vector_indices", sa.Column("summary_embedding", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("vector_indices", "summary_embedding")
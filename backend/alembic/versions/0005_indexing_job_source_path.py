@@ -0,0 +1,21 @@
+"""Record the local upload spool file an indexing job reads from
+
+Revision ID: 0005_job_source_path
+Revises: 0004_summary_embedding
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_job_source_path"
+down_revision = "0004_summary_embedding"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("indexing_jobs", sa.Column("source_path", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("indexing_jobs", "source_path")
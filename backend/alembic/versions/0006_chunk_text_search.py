@@ -0,0 +1,33 @@
+"""Full-text index on document_chunks.chunk_text for pgvector hybrid search
+
+With VECTOR_STORE_BACKEND=pgvector the keyword side of hybrid search runs in
+PostgreSQL, so every API node sees the same index as the vectors. Other
+backends keep node-local BM25 files and get no index.
+
+Revision ID: 0006_chunk_text_search
+Revises: 0005_job_source_path
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+revision = "0006_chunk_text_search"
+down_revision = "0005_job_source_path"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if settings.VECTOR_STORE_BACKEND == "pgvector":
+        op.create_index(
+            "ix_document_chunks_chunk_text_fts",
+            "document_chunks",
+            [sa.text("to_tsvector('simple', chunk_text)")],
+            postgresql_using="gin",
+        )
+
+
+def downgrade() -> None:
+    if settings.VECTOR_STORE_BACKEND == "pgvector":
+        op.drop_index("ix_document_chunks_chunk_text_fts", table_name="document_chunks")
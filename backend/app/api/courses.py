@@ -1,9 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
-import asyncio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List
-from app.core.database import get_db, SessionLocal
+from app.core.database import get_db
 from app.models.user import User, UserRole
 from app.models.course import Course, CourseContent, ContentType, Enrollment, ContentProgress, EnrollmentStatus
 from app.schemas.course import (
@@ -21,8 +20,9 @@ from app.schemas.course import (
     StudentSummary,
 )
 from app.api.dependencies import get_current_user
-from app.services.file_service import save_uploaded_file
-from app.services.rag_service import RAGService
+from app.services.file_service import new_upload_spool_path, save_uploaded_file
+from app.services.indexing_queue import enqueue_indexing_job
+from app.services.vector_gc import purge_content_vectors, purge_course_vectors, schedule_purge
 import os
 from app.core.config import settings
 from app.services.notification_service import notify_users
@@ -30,15 +30,6 @@ from app.services.notification_service import notify_users
 router = APIRouter()
 
 
-def _run_indexing_task(content_id: int) -> None:
-    db = SessionLocal()
-    try:
-        rag_service = RAGService(db)
-        asyncio.run(rag_service.process_uploaded_content(content_id))
-    finally:
-        db.close()
-
-
 @router.post("/", response_model=CourseResponse)
 async def create_course(
     course_data: CourseCreate,
@@ -183,6 +174,7 @@ async def update_course(
 @router.delete("/{course_id}")
 async def delete_course(
     course_id: int,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -198,6 +190,7 @@ async def delete_course(
 
     db.delete(course)
     db.commit()
+    await schedule_purge(background_tasks, purge_course_vectors, course_id)
     return {"detail": "Course deleted"}
 
 
@@ -208,7 +201,6 @@ async def upload_content(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = None
 ):
     """Upload course content (video or PDF)."""
     course = db.query(Course).filter(Course.id == course_id).first()
@@ -234,8 +226,9 @@ async def upload_content(
             detail=f"Unsupported file type. Supported: PDF (.pdf) or Video (.mp4, .mov, .avi, .mkv, .webm)"
         )
     
-    # Save file
-    file_url = await save_uploaded_file(file, course_id, content_type)
+    # Save file; PDFs are also spooled locally for the indexing worker
+    spool_path = new_upload_spool_path() if content_type == ContentType.PDF else None
+    file_url = await save_uploaded_file(file, course_id, content_type, spool_path=spool_path)
     
     # Create content record
     new_content = CourseContent(
@@ -249,8 +242,8 @@ async def upload_content(
     db.refresh(new_content)
 
     # Automatically index PDF content for RAG
-    if content_type == ContentType.PDF and background_tasks is not None:
-        background_tasks.add_task(_run_indexing_task, new_content.id)
+    if content_type == ContentType.PDF:
+        enqueue_indexing_job(db, new_content.id, source_path=spool_path)
 
     try:
         approved_students = (
@@ -582,6 +575,7 @@ async def mark_content_complete(
 async def delete_course_content(
     course_id: int,
     content_id: int,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -604,6 +598,7 @@ async def delete_course_content(
 
     db.delete(content)
     db.commit()
+    await schedule_purge(background_tasks, purge_content_vectors, course_id, content_id)
     return {"detail": "Content deleted"}
 
 
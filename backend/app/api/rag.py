@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
-import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.core.database import get_db, SessionLocal
+from app.core.database import SessionLocal, get_db
+from app.models.rag import StudentQuery
 from app.models.user import User
 from app.api.dependencies import get_current_user
 from app.services.rag_service import RAGService
+from app.services.embedding_executor import get_embedding_executor
+from app.services.answer_cache import get_answer_cache, get_query_embedding_cache, get_semantic_answer_cache
+from app.services.groq_client import get_groq_client
+from app.services.query_batcher import query_batcher_stats
+from app.services.single_flight import get_single_flight
+from app.services.indexing_queue import enqueue_indexing_job, get_latest_job, PRIORITY_MANUAL
 from app.middleware.rate_limiter import general_limiter
 from app.core.exceptions import handle_business_exception
 from app.schemas.rag import (
@@ -18,21 +27,10 @@ from app.schemas.rag import (
     ThreadMessageResponse,
 )
 from pydantic import BaseModel
-import chromadb
-from chromadb.config import Settings as ChromaSettings
 
 router = APIRouter()
 
 
-def _run_indexing_task(content_id: int) -> None:
-    db = SessionLocal()
-    try:
-        rag_service = RAGService(db)
-        asyncio.run(rag_service.process_uploaded_content(content_id))
-    finally:
-        db.close()
-
-
 @router.post("/ask", response_model=QuestionResponse)
 @general_limiter.limit("10/minute")
 async def ask_question(
@@ -50,6 +48,7 @@ async def ask_question(
             question=payload.question,
             thread_id=payload.thread_id,
             thread_title=payload.thread_title,
+            content_id=payload.content_id,
         )
         
         return QuestionResponse(
@@ -58,12 +57,95 @@ async def ask_question(
             sources=result["sources"],
             response_time_ms=result["response_time_ms"],
             thread_id=result.get("thread_id"),
+            cache_hit=result.get("cache_hit"),
         )
         
     except Exception as e:
         raise handle_business_exception(e)
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/ask/stream")
+@general_limiter.limit("10/minute")
+async def ask_question_stream(
+    payload: QuestionRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    """Ask a question and receive the answer as Server-Sent Events.
+
+    Events: ``meta`` (thread_id, sources, confidence) first, then ``token``
+    chunks of the answer, then ``done`` with response_time_ms and
+    first_token_ms. The query is saved to the thread when the stream ends.
+    """
+    student_id = current_user.id
+
+    async def events():
+        # Own session: the stream outlives the request-scoped one
+        db = SessionLocal()
+        try:
+            rag_service = RAGService(db)
+            async for event, data in rag_service.stream_student_answer(
+                student_id=student_id,
+                course_id=payload.course_id,
+                question=payload.question,
+                thread_id=payload.thread_id,
+                thread_title=payload.thread_title,
+                content_id=payload.content_id,
+            ):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/metrics")
+async def get_rag_metrics(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Runtime metrics for the AI assistant (admins only)."""
+    role_value = current_user.role.value if hasattr(current_user.role, "value") else str(current_user.role)
+    if role_value.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    # Streamed answers over the last day: first token is the latency students feel
+    streamed, avg_first_token, avg_total = (
+        db.query(
+            func.count(StudentQuery.id),
+            func.avg(StudentQuery.first_token_ms),
+            func.avg(StudentQuery.response_time_ms),
+        )
+        .filter(StudentQuery.first_token_ms.isnot(None))
+        .filter(StudentQuery.created_at >= datetime.utcnow() - timedelta(days=1))
+        .one()
+    )
+    return {
+        "streaming_24h": {
+            "answers": streamed,
+            "avg_first_token_ms": round(float(avg_first_token), 1) if avg_first_token is not None else None,
+            "avg_response_time_ms": round(float(avg_total), 1) if avg_total is not None else None,
+        },
+        "embedding_executor": get_embedding_executor().stats(),
+        "query_batcher": query_batcher_stats(),
+        "query_embedding_cache": get_query_embedding_cache().stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "semantic_answer_cache": get_semantic_answer_cache().stats(),
+        "groq": get_groq_client().stats(),
+        "single_flight": get_single_flight().stats(),
+    }
+
+
 @router.get("/history", response_model=List[QueryHistoryResponse])
 async def get_query_history(
     course_id: Optional[int] = None,
@@ -117,7 +199,6 @@ async def get_thread_messages(
 @router.post("/index-content/{content_id}", response_model=ContentIndexingResponse)
 async def index_content(
     content_id: int,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -141,8 +222,8 @@ async def index_content(
         if not content:
             raise HTTPException(status_code=404, detail="Content not found or access denied")
         
-        # Process in background with a fresh DB session
-        background_tasks.add_task(_run_indexing_task, content_id)
+        # Hand off to the indexing worker
+        enqueue_indexing_job(db, content_id, priority=PRIORITY_MANUAL)
         
         return ContentIndexingResponse(
             content_id=content_id,
@@ -162,7 +243,7 @@ async def get_index_status(
 ):
     """Get indexing status for content."""
     try:
-        from app.models.rag import VectorIndex
+        from app.models.rag import VectorIndex, IndexingJobStatus
         from app.models.course import CourseContent, Course
         
         # Check access
@@ -195,41 +276,23 @@ async def get_index_status(
             return {"content_id": content_id, "status": "not_indexed", "chunks_created": 0}
         
         status_map = {0: "not_indexed", 1: "indexing", 2: "completed"}
+        job = get_latest_job(db, content_id)
 
-        # If stuck in indexing, verify in ChromaDB and auto-fix status
-        if vector_index.is_indexed == 1:
-            try:
-                chroma_client = chromadb.PersistentClient(
-                    path="./chroma_db",
-                    settings=ChromaSettings(anonymized_telemetry=False),
-                )
-                collection = chroma_client.get_or_create_collection("course_content")
-                results = collection.get(where={"content_id": {"$eq": str(content_id)}})
-                ids = results.get("ids", []) if isinstance(results, dict) else []
-
-                if ids:
-                    vector_index.is_indexed = 2
-                    vector_index.chunk_count = len(ids)
-                    vector_index.last_updated = func.now()
-                    vector_index.error_message = None
-                    db.commit()
-                else:
-                    # If indexing has been stuck too long, mark as failed
-                    if vector_index.last_updated and vector_index.last_updated < datetime.utcnow() - timedelta(minutes=20):
-                        vector_index.is_indexed = 0
-                        vector_index.error_message = "Indexing timed out. Please retry."
-                        vector_index.last_updated = func.now()
-                        db.commit()
-            except Exception:
-                # Keep current status if Chroma check fails
-                pass
+        # "indexing" without a live job means the work was lost before the queue existed
+        if vector_index.is_indexed == 1 and (job is None or job.status not in {IndexingJobStatus.QUEUED, IndexingJobStatus.RUNNING}):
+            vector_index.is_indexed = 0
+            vector_index.error_message = job.last_error if job and job.last_error else "Indexing was interrupted. Please retry."
+            vector_index.last_updated = datetime.utcnow()
+            db.commit()
         
         return {
             "content_id": content_id,
             "status": status_map.get(vector_index.is_indexed, "unknown"),
             "chunks_created": vector_index.chunk_count,
             "last_updated": vector_index.last_updated.isoformat() if vector_index.last_updated else None,
-            "error_message": vector_index.error_message
+            "error_message": vector_index.error_message,
+            "job_status": job.status.value if job else None,
+            "attempts": job.attempts if job else 0,
         }
         
     except Exception as e:
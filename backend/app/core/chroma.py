@@ -0,0 +1,127 @@
+import os
+import logging
+import threading
+from typing import Any, Dict, Optional, Set
+from app.core.config import settings
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "false")
+os.environ.setdefault("CHROMA_TELEMETRY", "false")
+
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+
+logger = logging.getLogger(__name__)
+
+LEGACY_ADOPT_BATCH = 500
+
+# Process-wide ChromaDB client and collection handles, created lazily on first use
+_client: Optional[chromadb.ClientAPI] = None
+_collections: Dict[str, chromadb.Collection] = {}
+_lock = threading.Lock()
+# Courses whose vectors were already moved out of the legacy collection by this process
+_adopted: Set[int] = set()
+_legacy_empty = False
+_adopt_lock = threading.Lock()
+
+
+def get_chroma_client() -> chromadb.ClientAPI:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = chromadb.PersistentClient(
+                    path=settings.CHROMA_PATH,
+                    settings=ChromaSettings(anonymized_telemetry=False),
+                )
+    return _client
+
+
+def get_collection(name: Optional[str] = None) -> chromadb.Collection:
+    name = name or settings.CHROMA_COLLECTION
+    collection = _collections.get(name)
+    if collection is None:
+        client = get_chroma_client()
+        with _lock:
+            collection = _collections.get(name)
+            if collection is None:
+                collection = client.get_or_create_collection(name)
+                _collections[name] = collection
+    return collection
+
+
+def collection_name_for_course(course_id: int, layout: Optional[str] = None) -> str:
+    """Collection holding a course's chunks under the given sharding layout.
+
+    - ``course``: one collection (and HNSW graph) per course
+    - ``hash``: ``CHROMA_HASH_SHARDS`` collections, course id modulo shard count
+    - ``global``: the legacy single collection filtered by ``course_id``
+    """
+    layout = layout or settings.CHROMA_SHARDING
+    if layout == "course":
+        return f"{settings.CHROMA_COLLECTION}_course_{course_id}"
+    if layout == "hash":
+        return f"{settings.CHROMA_COLLECTION}_shard_{course_id % settings.CHROMA_HASH_SHARDS}"
+    if layout == "global":
+        return settings.CHROMA_COLLECTION
+    raise ValueError(f"Unknown CHROMA_SHARDING layout: {layout}")
+
+
+def get_course_collection(course_id: int) -> chromadb.Collection:
+    """A course's collection; on first access, its vectors still in the legacy collection move into it."""
+    collection = get_collection(collection_name_for_course(course_id))
+    if settings.CHROMA_SHARDING != "global" and not _legacy_empty and course_id not in _adopted:
+        with _adopt_lock:
+            if not _legacy_empty and course_id not in _adopted:
+                _adopt_legacy_vectors(course_id, collection)
+                _adopted.add(course_id)
+    return collection
+
+
+def _adopt_legacy_vectors(course_id: int, target: chromadb.Collection) -> None:
+    """Move a course's records from the single pre-sharding collection into its shard.
+
+    Lets a deployment switch ``CHROMA_SHARDING`` without running
+    migrate_chroma_shards.py first: nothing indexed before the switch goes
+    missing, and each course is moved the first time it is used. Upserting by
+    id and deleting afterwards keeps a move interrupted by a crash, or run by
+    two processes at once, safe to repeat.
+    """
+    global _legacy_empty
+    legacy_name = settings.CHROMA_COLLECTION
+    names = [getattr(collection, "name", collection) for collection in get_chroma_client().list_collections()]
+    if legacy_name not in names:
+        _legacy_empty = True
+        return
+    legacy = get_collection(legacy_name)
+    moved = 0
+    while True:
+        page = legacy.get(
+            where={"course_id": {"$eq": str(course_id)}},
+            include=["embeddings", "documents", "metadatas"],
+            limit=LEGACY_ADOPT_BATCH,
+        )
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        target.upsert(
+            ids=ids, embeddings=page["embeddings"], documents=page["documents"], metadatas=page["metadatas"]
+        )
+        legacy.delete(ids=ids)
+        moved += len(ids)
+    if moved:
+        logger.info("Moved %s vectors of course %s from %s to %s", moved, course_id, legacy_name, target.name)
+    if legacy.count() == 0:
+        _legacy_empty = True
+
+
+def course_filter(course_id: int) -> Optional[Dict[str, Any]]:
+    """Metadata filter still required when a collection is shared between courses."""
+    if settings.CHROMA_SHARDING == "course":
+        return None
+    return {"course_id": {"$eq": str(course_id)}}
+
+
+def forget_collection(name: str) -> None:
+    """Drop a cached handle after its collection has been deleted."""
+    with _lock:
+        _collections.pop(name, None)
@@ -34,6 +34,94 @@ class Settings(BaseSettings):
     
     # RAG Configuration - Groq Only
     GROQ_API_KEY: Optional[str] = None
+    GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"
+    GROQ_ATTEMPT_TIMEOUT_SECONDS: float = 20.0  # Per attempt, not per question
+    GROQ_MAX_ATTEMPTS: int = 3  # Retries on 429/5xx/connection errors
+    GROQ_RETRY_BASE_SECONDS: float = 0.25
+    GROQ_RETRY_MAX_SECONDS: float = 4.0
+    GROQ_HEDGE_AFTER_MS: float = 0  # >0 sends a second request if the first is slower than this (costs tokens)
+    GROQ_BREAKER_FAILURES: int = 5  # Consecutive failed calls before answering from the fallback
+    GROQ_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Shared outbound HTTP client (Groq, file downloads)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+
+    # Vector store
+    VECTOR_STORE_BACKEND: str = "chroma"  # chroma | numpy | pgvector
+    PGVECTOR_EF_SEARCH: int = 100  # HNSW candidate list size per query (recall vs. latency)
+    NUMPY_STORE_PATH: str = "./vector_store"  # Per-course .npy matrices for the numpy backend
+    NUMPY_STORE_FLUSH_ROWS: int = 512  # Buffered chunks per course written out at once (bounds indexing memory)
+    CHROMA_PATH: str = "./chroma_db"
+    CHROMA_COLLECTION: str = "course_content"
+    CHROMA_SHARDING: str = "course"  # course | hash | global (see migrate_chroma_shards.py)
+    CHROMA_HASH_SHARDS: int = 16
+    VECTOR_DELETE_MODE: str = "background"  # sync | background (purge chunks of deleted content after the response)
+    VECTOR_RECONCILE_INTERVAL_HOURS: float = 24  # Worker purges chunks of deleted content this often (0 = off)
+
+    # RAG indexing worker (python -m app.worker)
+    INDEXING_WORKER_EMBEDDED: bool = True  # Spawn the worker process alongside the API
+    INDEXING_WORKER_LOCK_PATH: Optional[str] = None  # One embedded worker per host holds this lock (default: temp dir)
+    INDEXING_WORKER_CONCURRENCY: int = 1
+    INDEXING_POLL_INTERVAL_SECONDS: float = 2.0
+    INDEXING_HEARTBEAT_SECONDS: int = 15
+    INDEXING_STALE_AFTER_SECONDS: int = 120
+    INDEXING_MAX_ATTEMPTS: int = 3
+    INDEXING_RETRY_BACKOFF_SECONDS: int = 30
+
+    # RAG ingestion pipeline
+    INGESTION_EXTRACT_WORKERS: int = 0  # 0 = one process per CPU core, capped at 4
+    INGESTION_PAGES_PER_TASK: int = 4
+    INGESTION_QUEUE_DEPTH: int = 4
+    INGESTION_EMBED_BATCH_SIZE: int = 8  # Starting size; adapted to memory headroom while indexing
+    EMBEDDING_MAX_BATCH_SIZE: int = 128
+    EMBEDDING_MEMORY_CEILING_MB: int = 0  # Process RSS the embed stage may grow towards; 0 = 90% of the cgroup limit or total RAM
+    EMBEDDING_MIN_AVAILABLE_MB: int = 64  # Shrink batches when system free memory drops below this
+    INGESTION_SPOOL_DIR: Optional[str] = None  # Downloaded PDFs are spooled here (defaults to system temp)
+    # Uploaded PDFs are kept here until indexed, so the worker skips the download from Cloudinary.
+    # Must be visible to the indexing worker; jobs fall back to downloading when the file is missing.
+    UPLOAD_SPOOL_DIR: Optional[str] = "./upload_spool"  # Empty = always download
+    UPLOAD_SPOOL_MAX_AGE_HOURS: int = 24  # Files of jobs that never finished are swept after this
+    # Switching modes changes chunk ids, so every document is re-embedded on its next re-index
+    CHUNKING_MODE: str = "chars"  # chars (~900 characters) | tokens (packed to the model's max_seq_length)
+    CHUNK_MAX_TOKENS: int = 0  # 0 = model max_seq_length minus special tokens
+    CHUNK_OVERLAP_TOKENS: int = 32
+
+    # Query-time embedding and retrieval
+    EMBEDDING_EXECUTOR_WORKERS: int = 1  # Concurrent query encodes (torch already uses all cores per encode)
+    EMBEDDING_EXECUTOR_MAX_QUEUE: int = 64  # Waiting encodes before /ask sheds load
+    QUERY_BATCHING_ENABLED: bool = True
+    QUERY_BATCH_WINDOW_MS: float = 5.0  # How long the first question waits for peers
+    QUERY_BATCH_MAX_SIZE: int = 32  # Encode immediately once this many are waiting
+    RAG_MAX_CONTEXT_CHUNKS: int = 8
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1200  # Estimated prompt tokens spent on course context
+    RAG_MMR_LAMBDA: float = 0.7  # 1.0 = pure relevance, lower = more diversity
+    RAG_MIN_SIMILARITY: float = 0.2  # Chunks less similar to the question are dropped
+    RAG_DUPLICATE_SIMILARITY: float = 0.95  # Chunks this similar to a picked one are dropped
+    LEXICAL_INDEX_ENABLED: bool = True  # BM25 over chunk text, fused with vector hits
+    LEXICAL_INDEX_PATH: str = "./vector_store/lexical"  # Node-local BM25 files (chroma/numpy); pgvector searches document_chunks
+    RAG_RRF_K: int = 60  # Reciprocal rank fusion damping; higher flattens rank differences
+    RAG_DOCUMENT_STAGE_MIN_DOCUMENTS: int = 10  # Courses with this many documents pick documents first (numpy/pgvector)
+    RAG_DOCUMENT_TOP_K: int = 5  # Documents whose chunks are searched in that case
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048  # Normalized question -> embedding LRU
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_PER_COURSE: int = 512
+    ANSWER_CACHE_TTL_SECONDS: int = 86400
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # Cosine similarity for reusing a paraphrase's answer
+    SEMANTIC_CACHE_MAX_PER_COURSE: int = 256
+
+    # Embedding cache keyed by (model id, sha256 of chunk text)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "./embedding_cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 100000  # ~1.5 KB each for 384-dim vectors
+    # Cleaned page text keyed by the PDF's sha256 (re-index, re-chunk and model changes skip PyPDF2)
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_PATH: str = "./extraction_cache/pages.sqlite3"
+    EXTRACTION_CACHE_MAX_MB: int = 512  # Compressed text; least recently used documents go first
     
     class Config:
         env_file = ".env"
@@ -4,6 +4,8 @@ from fastapi_utils.tasks import repeat_every
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.services.live_class_service import _auto_update_statuses
+from app.worker import start_embedded_worker, stop_embedded_worker
+from app.services.http_client import close_http_client
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api import auth, courses, exams, live, live_class, admin, notifications, rag
@@ -46,6 +48,23 @@ app.include_router(notifications.router, prefix="/api/notifications", tags=["Not
 app.include_router(rag.router, prefix="/api/rag", tags=["RAG - AI Assistant"])
 
 
+@app.on_event("startup")
+def launch_indexing_worker() -> None:
+    """Run RAG indexing in its own process so it never blocks request handling."""
+    if settings.INDEXING_WORKER_EMBEDDED:
+        start_embedded_worker()
+
+
+@app.on_event("shutdown")
+def shutdown_indexing_worker() -> None:
+    stop_embedded_worker()
+
+
+@app.on_event("shutdown")
+async def close_outbound_http() -> None:
+    await close_http_client()
+
+
 @app.on_event("startup")
 @repeat_every(seconds=60, wait_first=True)
 def refresh_live_class_statuses() -> None:
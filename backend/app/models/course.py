@@ -46,6 +46,7 @@ class CourseContent(Base):
     progress_entries = relationship("ContentProgress", back_populates="content", cascade="all, delete-orphan")
     chunks = relationship("DocumentChunk", back_populates="content", cascade="all, delete-orphan")
     vector_index = relationship("VectorIndex", back_populates="content", uselist=False, cascade="all, delete-orphan")
+    indexing_jobs = relationship("IndexingJob", back_populates="content", cascade="all, delete-orphan")
 
 
 class Enrollment(Base):
@@ -1,8 +1,22 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Float, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Float, JSON, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+import enum
+from app.core.config import settings
 from app.core.database import Base
 
+# all-MiniLM-L6-v2 output size
+EMBEDDING_DIM = 384
+# The vector extension is only required when chunks live in PostgreSQL
+PGVECTOR_ENABLED = settings.VECTOR_STORE_BACKEND == "pgvector"
+
+
+class IndexingJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
 
 class RagThread(Base):
     """Conversation thread for RAG chat."""
@@ -21,17 +35,51 @@ class RagThread(Base):
     queries = relationship("StudentQuery", back_populates="thread", cascade="all, delete-orphan")
 
 
+def _embedding_type():
+    if not PGVECTOR_ENABLED:
+        return JSON
+    from pgvector.sqlalchemy import Vector
+
+    return Vector(EMBEDDING_DIM)
+
+
 class DocumentChunk(Base):
-    """Represents a chunk of processed document content for RAG."""
+    """Represents a chunk of processed document content for RAG.
+
+    System of record for embeddings when VECTOR_STORE_BACKEND=pgvector; the
+    embedding is then a pgvector column with an HNSW index, and chunk text has
+    a full-text GIN index for keyword search (see ``ensure_pgvector_schema``). Other backends keep the plain JSON column and
+    need no database extension.
+    """
     
     __tablename__ = "document_chunks"
+    __table_args__ = (
+        (
+            Index(
+                "ix_document_chunks_embedding_hnsw",
+                "embedding",
+                postgresql_using="hnsw",
+                postgresql_ops={"embedding": "vector_cosine_ops"},
+            ),
+            # Keyword side of hybrid search (lexical_index.PgLexicalIndex)
+            Index(
+                "ix_document_chunks_chunk_text_fts",
+                text("to_tsvector('simple', chunk_text)"),
+                postgresql_using="gin",
+            ),
+        )
+        if PGVECTOR_ENABLED
+        else ()
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    content_id = Column(Integer, ForeignKey("course_contents.id"), nullable=False)
+    chunk_id = Column(String(64), nullable=False, unique=True, index=True)  # Content-derived id
+    content_id = Column(Integer, ForeignKey("course_contents.id"), nullable=False, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
     chunk_text = Column(Text, nullable=False)
     chunk_index = Column(Integer, nullable=False)  # Order in document
     chunk_metadata = Column(JSON, nullable=True)  # Page numbers, timestamps, etc.
-    embedding = Column(JSON, nullable=False)  # Vector embedding
+    embedding = Column(_embedding_type(), nullable=False)  # Vector embedding
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     # Relationships
@@ -52,6 +100,11 @@ class StudentQuery(Base):
     context_chunks = Column(JSON, nullable=True)  # Retrieved chunks used
     confidence_score = Column(Float, nullable=True)
     response_time_ms = Column(Integer, nullable=True)
+    first_token_ms = Column(Integer, nullable=True)  # Time to first streamed token (SSE endpoint)
+    cache_hit = Column(String(16), nullable=True)  # exact | semantic; NULL when the LLM answered
+    cache_similarity = Column(Float, nullable=True)  # Question similarity for cache hits
+    llm_latency_ms = Column(Integer, nullable=True)  # Groq time when the LLM answered
+    saved_llm_ms = Column(Integer, nullable=True)  # Groq time the cache hit avoided
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     # Relationships
@@ -71,6 +124,70 @@ class VectorIndex(Base):
     chunk_count = Column(Integer, default=0, nullable=False)
     last_updated = Column(DateTime, server_default=func.now(), nullable=False)
     error_message = Column(Text, nullable=True)
+    summary_embedding = Column(JSON, nullable=True)  # Mean of the content's chunk vectors (document-stage retrieval)
 
     # Relationships
     content = relationship("CourseContent", back_populates="vector_index")
+
+
+class IndexingJob(Base):
+    """Durable queue entry for RAG indexing, consumed by the indexing worker."""
+
+    __tablename__ = "indexing_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_id = Column(Integer, ForeignKey("course_contents.id"), nullable=False, index=True)
+    status = Column(Enum(IndexingJobStatus), nullable=False, default=IndexingJobStatus.QUEUED, index=True)
+    priority = Column(Integer, default=0, nullable=False)  # Higher runs first
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, server_default=func.now(), nullable=False)  # Retry backoff
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    source_path = Column(String, nullable=True)  # Upload spool file; the worker downloads when it is missing
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    # Relationships
+    content = relationship("CourseContent", back_populates="indexing_jobs")
+
+
+def _embedding_column_type(connection):
+    return connection.execute(
+        text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = 'document_chunks'::regclass AND attname = 'embedding' AND NOT attisdropped"
+        )
+    ).scalar()
+
+
+def ensure_pgvector_schema(connection) -> None:
+    """Give ``document_chunks`` a pgvector embedding column, its HNSW index and the full-text index.
+
+    Idempotent; used by init_db.py when VECTOR_STORE_BACKEND=pgvector,
+    including on a database first set up for another backend. Chunks are
+    deleted when the JSON column is replaced: only the pgvector store writes
+    them, and re-indexing recreates them.
+    """
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    column_type = _embedding_column_type(connection)
+    if column_type is not None and not column_type.startswith("vector"):
+        connection.execute(text("DELETE FROM document_chunks"))
+        connection.execute(text("ALTER TABLE document_chunks DROP COLUMN embedding"))
+        column_type = None
+    if column_type is None:
+        connection.execute(text(f"ALTER TABLE document_chunks ADD COLUMN embedding vector({EMBEDDING_DIM}) NOT NULL"))
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_document_chunks_embedding_hnsw "
+            "ON document_chunks USING hnsw (embedding vector_cosine_ops)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_document_chunks_chunk_text_fts "
+            "ON document_chunks USING gin (to_tsvector('simple', chunk_text))"
+        )
+    )
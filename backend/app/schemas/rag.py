@@ -9,6 +9,7 @@ class QuestionRequest(BaseModel):
     question: str = Field(..., min_length=2, max_length=1000, description="Student's question")
     thread_id: Optional[str] = Field(default=None, description="Existing thread id")
     thread_title: Optional[str] = Field(default=None, description="Optional thread title for new thread")
+    content_id: Optional[int] = Field(default=None, description="Only answer from this content item of the course")
 
 
 class QuestionResponse(BaseModel):
@@ -18,6 +19,7 @@ class QuestionResponse(BaseModel):
     sources: List[Dict[str, Any]] = Field(default_factory=list, description="Source materials used")
     response_time_ms: int = Field(..., description="Response time in milliseconds")
     thread_id: Optional[str] = Field(default=None, description="Thread id")
+    cache_hit: Optional[str] = Field(default=None, description="exact or semantic when served from cache")
 
 
 class QueryHistoryResponse(BaseModel):
@@ -64,3 +66,5 @@ class IndexStatusResponse(BaseModel):
     chunks_created: int
     last_updated: Optional[str] = None
     error_message: Optional[str] = None
+    job_status: Optional[str] = None
+    attempts: int = 0
@@ -0,0 +1,112 @@
+"""
+Memory-adaptive sizing for embedding batches.
+
+Larger encode batches are much faster per chunk but their activations scale
+with batch size. ``AdaptiveBatchSizer`` records the process RSS once the
+model is loaded, before the first batch (``start``), and treats the memory
+between that baseline and the ceiling as the batch budget. After every batch
+it doubles the batch while the RSS growth above the baseline leaves headroom
+in that budget and halves it under pressure (growth near the budget, RSS at
+the ceiling or no budget left at all, or the system running out of available
+memory).
+
+The ceiling defaults to 90% of the container's cgroup memory limit, or of
+total RAM when there is none, so large hosts get high throughput and the
+512 MB free tier stays safe without hand tuning.
+"""
+import threading
+from typing import Dict, Optional
+import psutil
+from app.core.config import settings
+
+MB = 1024 * 1024
+CEILING_FRACTION = 0.9  # Of the detected memory limit, when EMBEDDING_MEMORY_CEILING_MB is unset
+CGROUP_LIMIT_FILES = (
+    "/sys/fs/cgroup/memory.max",  # cgroup v2
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",  # cgroup v1
+)
+
+
+def detect_memory_limit() -> int:
+    """Container memory limit in bytes (cgroup v2 or v1), else total physical memory."""
+    total = psutil.virtual_memory().total
+    for path in CGROUP_LIMIT_FILES:
+        try:
+            with open(path) as fh:
+                value = fh.read().strip()
+        except OSError:
+            continue
+        # "max" (v2) or a huge number (v1) means unlimited
+        if value.isdigit() and 0 < int(value) < total:
+            return int(value)
+    return total
+
+
+def default_memory_ceiling() -> int:
+    if settings.EMBEDDING_MEMORY_CEILING_MB > 0:
+        return settings.EMBEDDING_MEMORY_CEILING_MB * MB
+    return int(detect_memory_limit() * CEILING_FRACTION)
+
+
+class AdaptiveBatchSizer:
+    """Multiplicative grow/shrink controller for the embed batch size."""
+
+    def __init__(
+        self,
+        initial: Optional[int] = None,
+        min_size: int = 1,
+        max_size: Optional[int] = None,
+        memory_ceiling_mb: Optional[int] = None,
+        min_available_mb: Optional[int] = None,
+        grow_below: float = 0.6,
+        shrink_above: float = 0.85,
+    ):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size or settings.EMBEDDING_MAX_BATCH_SIZE)
+        initial = initial or settings.INGESTION_EMBED_BATCH_SIZE
+        self._size = min(max(initial, self.min_size), self.max_size)
+        self.ceiling_bytes = memory_ceiling_mb * MB if memory_ceiling_mb else default_memory_ceiling()
+        self.min_available_bytes = (min_available_mb or settings.EMBEDDING_MIN_AVAILABLE_MB) * MB
+        self.grow_below = grow_below
+        self.shrink_above = shrink_above
+        self.baseline_rss: Optional[int] = None
+        self.peak_rss = 0
+        self._process = psutil.Process()
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def start(self) -> None:
+        """Record the baseline RSS; call once the model is loaded, before the first batch."""
+        with self._lock:
+            if self.baseline_rss is None:
+                self.baseline_rss = self._process.memory_info().rss
+
+    def observe(self) -> int:
+        """Sample memory after a batch and return the batch size to use next."""
+        rss = self._process.memory_info().rss
+        available = psutil.virtual_memory().available
+        with self._lock:
+            if self.baseline_rss is None:
+                self.baseline_rss = rss  # start() was skipped; the first batch is counted as baseline
+            self.peak_rss = max(self.peak_rss, rss)
+            budget = self.ceiling_bytes - self.baseline_rss
+            used = rss - self.baseline_rss
+            # No budget left (the loaded model alone reaches the ceiling, as on the
+            # 512 MB tier) is pressure too
+            pressure = rss >= self.ceiling_bytes or budget <= 0 or used > budget * self.shrink_above
+            if available < self.min_available_bytes or pressure:
+                self._size = max(self.min_size, self._size // 2)
+            elif used < budget * self.grow_below and available > self.min_available_bytes * 2:
+                self._size = min(self.max_size, self._size * 2)
+            return self._size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batch_size": self._size,
+            "peak_rss_mb": self.peak_rss // MB,
+            "baseline_rss_mb": (self.baseline_rss or 0) // MB,
+            "ceiling_mb": self.ceiling_bytes // MB,
+        }
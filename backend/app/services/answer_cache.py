@@ -0,0 +1,271 @@
+"""
+In-process caches for the AI assistant's repeat questions.
+
+- ``get_query_embedding_cache``: normalized question -> query embedding, so a
+  repeated question skips ``model.encode``.
+- ``AnswerCache``: per course, normalized question -> generated answer and
+  sources, so a repeated question also skips retrieval and the Groq call.
+- ``SemanticAnswerCache``: per course, question embedding -> answer, served
+  for paraphrases whose cosine similarity passes ``SEMANTIC_CACHE_THRESHOLD``.
+
+Answers are tagged with the course's index version (see
+``RAGService._course_index_version``), which is derived from ``vector_indices``
+in the database. Re-indexing any of the course's content changes the version
+in every API process, and that course's cached answers are dropped on the
+next lookup.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_question(question: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question."""
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", question.strip().lower()))
+
+
+class LRUCache:
+    """Thread-safe LRU with an optional time-to-live and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class AnswerCache:
+    """Exact-question answer cache, one LRU per course, tagged with the index version."""
+
+    def __init__(self, max_per_course: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_per_course = max_per_course or settings.ANSWER_CACHE_MAX_PER_COURSE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ANSWER_CACHE_TTL_SECONDS
+        self._courses: Dict[int, Tuple[str, LRUCache]] = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _course_cache(self, course_id: int, index_version: str) -> LRUCache:
+        with self._lock:
+            current = self._courses.get(course_id)
+            if current is None or current[0] != index_version:
+                if current is not None:
+                    self.invalidations += 1
+                current = (index_version, LRUCache(self.max_per_course, self.ttl_seconds))
+                self._courses[course_id] = current
+            return current[1]
+
+    def get(self, course_id: int, index_version: str, question: str) -> Optional[Dict[str, Any]]:
+        entry = self._course_cache(course_id, index_version).get(normalize_question(question))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, course_id: int, index_version: str, question: str, entry: Dict[str, Any]) -> None:
+        self._course_cache(course_id, index_version).put(normalize_question(question), entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            caches = [cache for _, cache in self._courses.values()]
+            hits, misses = self.hits, self.misses
+        return {
+            "courses": len(caches),
+            "entries": sum(len(cache) for cache in caches),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+class _SemanticCourseCache:
+    """Question embeddings of one course, LRU-ordered, with a lazily stacked matrix."""
+
+    def __init__(self, index_version: str):
+        self.index_version = index_version
+        self.entries: "OrderedDict[str, Tuple[float, np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> Tuple[List[str], np.ndarray]:
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.stack([self.entries[key][1] for key in self._keys])
+        return self._keys, self._matrix
+
+    def changed(self) -> None:
+        self._matrix = None
+
+
+class SemanticAnswerCache:
+    """Nearest prior question of a course, if it is close enough to reuse its answer.
+
+    Uses the same index-version tagging as ``AnswerCache``. Lookups are one
+    matmul over at most ``SEMANTIC_CACHE_MAX_PER_COURSE`` unit vectors.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_per_course: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.max_per_course = max(1, max_per_course or settings.SEMANTIC_CACHE_MAX_PER_COURSE)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ANSWER_CACHE_TTL_SECONDS
+        self._courses: Dict[int, _SemanticCourseCache] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(embedding: Any) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _course(self, course_id: int, index_version: str) -> _SemanticCourseCache:
+        course = self._courses.get(course_id)
+        if course is None or course.index_version != index_version:
+            if course is not None:
+                self.invalidations += 1
+            course = _SemanticCourseCache(index_version)
+            self._courses[course_id] = course
+        return course
+
+    def _expire(self, course: _SemanticCourseCache) -> None:
+        if not self.ttl_seconds:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, (stored_at, _, _) in course.entries.items() if stored_at < cutoff]
+        for key in expired:
+            del course.entries[key]
+        if expired:
+            course.changed()
+
+    def get(self, course_id: int, index_version: str, embedding: Any) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Cached entry of the most similar prior question and its similarity, or None."""
+        with self._lock:
+            course = self._course(course_id, index_version)
+            self._expire(course)
+            if not course.entries:
+                self.misses += 1
+                return None
+            keys, matrix = course.matrix()
+            scores = matrix @ self._unit(embedding)
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            course.entries.move_to_end(keys[best])
+            self.hits += 1
+            return course.entries[keys[best]][2], similarity
+
+    def put(self, course_id: int, index_version: str, question: str, embedding: Any, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            course = self._course(course_id, index_version)
+            course.entries[normalize_question(question)] = (time.monotonic(), self._unit(embedding), entry)
+            course.entries.move_to_end(normalize_question(question))
+            while len(course.entries) > self.max_per_course:
+                course.entries.popitem(last=False)
+            course.changed()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "courses": len(self._courses),
+                "entries": sum(len(course.entries) for course in self._courses.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+_QUERY_EMBEDDINGS: Optional[LRUCache] = None
+_ANSWERS: Optional[AnswerCache] = None
+_SEMANTIC_ANSWERS: Optional[SemanticAnswerCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_query_embedding_cache() -> LRUCache:
+    """Process-wide normalized question -> embedding LRU."""
+    global _QUERY_EMBEDDINGS
+    if _QUERY_EMBEDDINGS is None:
+        with _CACHE_LOCK:
+            if _QUERY_EMBEDDINGS is None:
+                _QUERY_EMBEDDINGS = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+    return _QUERY_EMBEDDINGS
+
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide exact answer cache."""
+    global _ANSWERS
+    if _ANSWERS is None:
+        with _CACHE_LOCK:
+            if _ANSWERS is None:
+                _ANSWERS = AnswerCache()
+    return _ANSWERS
+
+
+def get_semantic_answer_cache() -> SemanticAnswerCache:
+    """Process-wide semantic (paraphrase) answer cache."""
+    global _SEMANTIC_ANSWERS
+    if _SEMANTIC_ANSWERS is None:
+        with _CACHE_LOCK:
+            if _SEMANTIC_ANSWERS is None:
+                _SEMANTIC_ANSWERS = SemanticAnswerCache()
+    return _SEMANTIC_ANSWERS
@@ -0,0 +1,198 @@
+"""
+Text chunking for RAG indexing.
+
+``split_text_into_chunks`` is the default character-sized chunker. It packs
+headed sections (or paragraphs) into ~``chunk_size`` characters and starts
+each new chunk with the last sentences of the previous one. It makes one
+pass over the text: each piece is split into sentences once, and the
+trailing sentences needed for overlap are kept in a bounded deque instead of
+being re-split out of the finished chunk.
+
+``TokenChunker`` sizes chunks in the embedding model's own word-pieces
+rather than in characters. all-MiniLM-L6-v2 truncates its input at
+``max_seq_length`` (256) tokens, so a 900-character chunk of dense text
+loses its tail: that text is embedded but never influences the vector.
+Packing sentences up to the model's limit means every token of every chunk
+counts.
+"""
+import copy
+import re
+from collections import deque
+from typing import Any, List, Optional, Tuple
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+# Markdown headings, "Chapter." / "1." style lines
+HEADING = re.compile(r"(?m)^((?:#{1,6}\s+|[A-Z][a-z]*\.\s+|[0-9]+\.\s+).+)$")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = frozenset(".!?")
+MIN_CHUNK_CHARS = 100  # Shorter chunks are dropped
+SPECIAL_TOKENS = 2  # [CLS] and [SEP] count against max_seq_length
+
+
+class _ChunkBuilder:
+    """Text of the chunk being built plus its trailing sentences (for overlap).
+
+    Sentences are kept as fragment lists: a piece that does not start a new
+    sentence (the chunk so far ends without . ! ?) extends the last one
+    without copying it.
+    """
+
+    def __init__(self, separator: str, overlap_sentences: int):
+        self.separator = separator
+        self.overlap_sentences = overlap_sentences
+        # One extra slot tells whether there are more sentences than the overlap takes
+        self._maxlen = overlap_sentences + 1 if overlap_sentences > 0 else None
+        self.reset("")
+
+    def reset(self, overlap_text: str) -> None:
+        self.parts: List[str] = [overlap_text] if overlap_text else []
+        self.sentences: deque = deque(
+            ([sentence] for sentence in SENTENCE_BOUNDARY.split(overlap_text) if overlap_text),
+            maxlen=self._maxlen,
+        )
+        self.ends_sentence = bool(overlap_text) and overlap_text[-1] in SENTENCE_END
+
+    def append(self, piece: str, separated: bool) -> None:
+        sentences = SENTENCE_BOUNDARY.split(piece)
+        if separated:
+            self.parts.append(self.separator)
+        self.parts.append(piece)
+        if separated and not self.ends_sentence:
+            # No boundary before the separator: the piece continues the last sentence
+            if self.sentences:
+                self.sentences[-1].extend((self.separator, sentences[0]))
+            else:
+                self.sentences.append([self.separator, sentences[0]])
+            sentences = sentences[1:]
+        self.sentences.extend([sentence] for sentence in sentences)
+        self.ends_sentence = piece[-1] in SENTENCE_END
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def overlap_text(self) -> str:
+        """Last ``overlap_sentences`` sentences, or "" when the chunk has no more than that."""
+        if len(self.sentences) <= self.overlap_sentences:
+            return ""
+        tail = list(self.sentences)[-self.overlap_sentences:] if self.overlap_sentences else self.sentences
+        return " ".join("".join(fragments) for fragments in tail)
+
+
+def split_text_into_chunks(text: str, chunk_size: int = 1000, overlap_sentences: int = 2) -> List[str]:
+    """Split cleaned text into structure-aware chunks of about ``chunk_size`` characters."""
+    sections = HEADING.split(text)
+    if len(sections) > 1:
+        # Document has structure - chunk by sections (headings and bodies alike)
+        pieces = [section.strip() for section in sections]
+        separator = "\n\n"
+    else:
+        pieces = [paragraph.strip() for paragraph in PARAGRAPH_BREAK.split(text)]
+        separator = "\n\n"
+        if not any(pieces):
+            pieces = [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text)]
+            separator = " "
+
+    chunks = []
+    builder = _ChunkBuilder(separator, overlap_sentences)
+    started = False
+    length = 0
+    for piece in pieces:
+        if not piece:
+            continue
+        if started and length + len(piece) + len(separator) > chunk_size:
+            chunks.append(builder.text().strip())
+            overlap_text = builder.overlap_text()
+            builder.reset(overlap_text)
+            builder.append(piece, separated=True)
+            length = len(overlap_text) + len(separator) + len(piece)
+        else:
+            builder.append(piece, separated=started)
+            length += len(piece) + len(separator)
+        started = True
+    if started:
+        chunks.append(builder.text().strip())
+    return [chunk for chunk in chunks if len(chunk) > MIN_CHUNK_CHARS]
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of each non-blank sentence, whitespace trimmed."""
+    spans = []
+    start = 0
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        spans.append((start, boundary.start()))
+        start = boundary.end()
+    spans.append((start, len(text)))
+    trimmed = []
+    for start, end in spans:
+        segment = text[start:end]
+        stripped = segment.strip()
+        if stripped:
+            offset = start + len(segment) - len(segment.lstrip())
+            trimmed.append((offset, offset + len(stripped)))
+    return trimmed
+
+
+class TokenChunker:
+    """Packs whole sentences into chunks of at most ``max_tokens`` model tokens.
+
+    Consecutive chunks share up to ``overlap_tokens`` tokens of trailing
+    sentences. A sentence longer than a chunk is cut into token windows
+    (with the same overlap) using the tokenizer's character offsets. All
+    sentences of a text are tokenized in one batched call.
+    """
+
+    def __init__(self, tokenizer: Any, max_tokens: int, overlap_tokens: int = 32):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    @classmethod
+    def for_model(cls, model: Any, max_tokens: Optional[int] = None, overlap_tokens: int = 32) -> "TokenChunker":
+        """Chunker using a SentenceTransformer's tokenizer and sequence limit."""
+        limit = model.max_seq_length - SPECIAL_TOKENS
+        # Own copy: fast tokenizers raise "Already borrowed" when the embed stage uses the same one concurrently
+        tokenizer = copy.deepcopy(model.tokenizer)
+        return cls(tokenizer, min(max_tokens, limit) if max_tokens else limit, overlap_tokens)
+
+    def _units(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start, end, tokens) pieces of ``text``, none longer than a chunk."""
+        spans = sentence_spans(text)
+        if not spans:
+            return []
+        encoded = self.tokenizer(
+            [text[start:end] for start, end in spans],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+        )
+        units = []
+        step = self.max_tokens - self.overlap_tokens
+        for (start, end), offsets in zip(spans, encoded["offset_mapping"]):
+            if len(offsets) <= self.max_tokens:
+                units.append((start, end, len(offsets)))
+                continue
+            for first in range(0, len(offsets), step):
+                window = offsets[first:first + self.max_tokens]
+                units.append((start + window[0][0], start + window[-1][1], len(window)))
+                if first + self.max_tokens >= len(offsets):
+                    break
+        return units
+
+    def split(self, text: str) -> List[str]:
+        chunks = []
+        current: deque = deque()
+        current_tokens = 0
+        for unit in self._units(text):
+            if current and current_tokens + unit[2] > self.max_tokens:
+                chunks.append(text[current[0][0]:current[-1][1]])
+                # Keep trailing sentences as overlap, as long as the next unit still fits
+                while current and (
+                    current_tokens > self.overlap_tokens or current_tokens + unit[2] > self.max_tokens
+                ):
+                    current_tokens -= current.popleft()[2]
+            current.append(unit)
+            current_tokens += unit[2]
+        if current:
+            chunks.append(text[current[0][0]:current[-1][1]])
+        return [chunk for chunk in chunks if len(chunk) > MIN_CHUNK_CHARS]
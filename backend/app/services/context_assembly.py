@@ -0,0 +1,107 @@
+"""
+Prompt context assembly for RAG answers.
+
+Vector search returns the chunks nearest to the question, and with sentence
+overlap between neighbouring chunks these often repeat each other. Sending all
+of them to the LLM inflates prompt tokens, which costs money and adds
+latency. ``select_context`` re-ranks the candidates with maximal marginal
+relevance (MMR): each pick trades similarity to the question against
+similarity to chunks already picked. It drops near-duplicates and chunks
+below a relevance floor, and stops when the token budget is full.
+"""
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+
+# Llama-family tokenizers average roughly four characters per English token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class ContextSelection:
+    chunks: List[Dict[str, Any]]
+    candidate_tokens: int  # What the plain top-k join would have sent
+    selected_tokens: int
+    dropped_duplicates: int
+    dropped_low_similarity: int
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def select_context(
+    candidates: Sequence[Dict[str, Any]],
+    embeddings: Optional[np.ndarray],
+    relevance: Optional[Sequence[float]] = None,
+    keyword_matches: Optional[Sequence[bool]] = None,
+    max_chunks: Optional[int] = None,
+    token_budget: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    min_similarity: Optional[float] = None,
+    duplicate_similarity: Optional[float] = None,
+) -> ContextSelection:
+    """Pick chunks for the prompt from best-first ``candidates``.
+
+    ``candidates`` carry ``text`` and ``similarity`` (to the question);
+    ``embeddings`` holds their vectors row by row. ``relevance`` ranks them
+    for MMR when it differs from similarity (fused hybrid scores, scaled to
+    0..1). The floor applies to similarity, except for ``keyword_matches``:
+    an exact term hit is evidence of its own. Without embeddings only the
+    floor and the token budget apply.
+    """
+    max_chunks = max_chunks or settings.RAG_MAX_CONTEXT_CHUNKS
+    token_budget = token_budget or settings.RAG_CONTEXT_TOKEN_BUDGET
+    mmr_lambda = settings.RAG_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    min_similarity = settings.RAG_MIN_SIMILARITY if min_similarity is None else min_similarity
+    duplicate_similarity = settings.RAG_DUPLICATE_SIMILARITY if duplicate_similarity is None else duplicate_similarity
+
+    candidate_tokens = sum(estimate_tokens(c["text"]) for c in candidates[:max_chunks])
+    similarity = np.array([c["similarity"] for c in candidates], dtype=np.float32)
+    relevance = similarity if relevance is None else np.asarray(relevance, dtype=np.float32)
+    tokens = np.array([estimate_tokens(c["text"]) for c in candidates])
+    eligible = similarity >= min_similarity
+    if keyword_matches is not None:
+        eligible |= np.asarray(keyword_matches, dtype=bool)
+    if len(candidates):
+        eligible[int(np.argmax(relevance))] = True  # Never answer from nothing
+    dropped_low = int(len(candidates) - eligible.sum())
+
+    pairwise = None
+    if embeddings is not None and len(candidates) > 1:
+        unit = _unit_rows(np.asarray(embeddings, dtype=np.float32))
+        pairwise = unit @ unit.T
+
+    selected: List[int] = []
+    redundancy = np.zeros(len(candidates), dtype=np.float32)  # Max similarity to anything selected
+    used_tokens = 0
+    dropped_duplicates = 0
+    while len(selected) < max_chunks and eligible.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy if selected else relevance.copy()
+        scores[~eligible] = -np.inf
+        pick = int(np.argmax(scores))
+        eligible[pick] = False
+        if selected and pairwise is not None and redundancy[pick] >= duplicate_similarity:
+            dropped_duplicates += 1
+            continue
+        if used_tokens + tokens[pick] > token_budget and selected:
+            continue  # A shorter candidate may still fit
+        selected.append(pick)
+        used_tokens += int(tokens[pick])
+        if pairwise is not None:
+            redundancy = np.maximum(redundancy, pairwise[pick])
+
+    return ContextSelection(
+        chunks=[candidates[i] for i in selected],
+        candidate_tokens=candidate_tokens,
+        selected_tokens=used_tokens,
+        dropped_duplicates=dropped_duplicates,
+        dropped_low_similarity=dropped_low,
+    )
@@ -0,0 +1,103 @@
+"""
+Document-stage retrieval for large courses.
+
+Each indexed ``CourseContent`` stores a summary embedding: the normalized mean
+of its chunk vectors, kept in ``vector_indices.summary_embedding``. For a
+course with many documents, a question is first matched against these few
+hundred summaries. The chunk search then runs only inside the best
+``RAG_DOCUMENT_TOP_K`` documents, so its cost follows the documents picked
+rather than the size of the course. The stage is skipped on backends whose
+scoped queries still scan the whole course (``VectorStore.scoped_scan``;
+Chroma), where it would cost recall and save nothing: numpy scores only the
+picked documents' rows and pgvector scans them through the content_id index.
+See benchmarks/bench_document_stage.py.
+
+Summaries are loaded once per course index version (see
+``RAGService._course_index_version``) and kept in memory as one matrix.
+"""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.course import CourseContent
+from app.models.rag import VectorIndex
+
+
+def summary_embedding(vectors: Any) -> Optional[List[float]]:
+    """Normalized mean of a document's chunk vectors (JSON-ready)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.size == 0:
+        return None
+    mean = vectors.reshape(len(vectors), -1).mean(axis=0)
+    norm = float(np.linalg.norm(mean))
+    return (mean / norm if norm else mean).tolist()
+
+
+class _CourseSummaries:
+    def __init__(self, content_ids: List[int], vectors: np.ndarray, unsummarized: List[int]):
+        self.content_ids = np.asarray(content_ids, dtype=np.int64)
+        self.vectors = vectors
+        self.unsummarized = unsummarized  # Indexed before summaries existed; always searched
+
+
+class DocumentSummaries:
+    """Per-course summary matrices, reloaded when the index version changes."""
+
+    def __init__(self):
+        self._courses: Dict[int, Tuple[str, _CourseSummaries]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(course_id: int) -> _CourseSummaries:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(VectorIndex.content_id, VectorIndex.summary_embedding)
+                .join(CourseContent, CourseContent.id == VectorIndex.content_id)
+                .filter(CourseContent.course_id == course_id, VectorIndex.is_indexed == 2)
+                .all()
+            )
+        finally:
+            db.close()
+        summarized = [(content_id, vector) for content_id, vector in rows if vector]
+        vectors = np.asarray([vector for _, vector in summarized], dtype=np.float32)
+        return _CourseSummaries(
+            [content_id for content_id, _ in summarized],
+            vectors.reshape(len(summarized), -1),
+            [content_id for content_id, vector in rows if not vector],
+        )
+
+    def _course(self, course_id: int, index_version: str) -> _CourseSummaries:
+        with self._lock:
+            cached = self._courses.get(course_id)
+        if cached and cached[0] == index_version:
+            return cached[1]
+        summaries = self._load(course_id)
+        with self._lock:
+            self._courses[course_id] = (index_version, summaries)
+        return summaries
+
+    def pick(self, course_id: int, index_version: str, embedding: Any) -> Optional[List[int]]:
+        """Content ids to search for this question, or None to search the whole course."""
+        summaries = self._course(course_id, index_version)
+        if len(summaries.content_ids) < settings.RAG_DOCUMENT_STAGE_MIN_DOCUMENTS:
+            return None
+        scores = summaries.vectors @ np.asarray(embedding, dtype=np.float32).reshape(-1)
+        k = min(settings.RAG_DOCUMENT_TOP_K, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [int(content_id) for content_id in summaries.content_ids[top]] + summaries.unsummarized
+
+
+_SUMMARIES: Optional[DocumentSummaries] = None
+_SUMMARIES_LOCK = threading.Lock()
+
+
+def get_document_summaries() -> DocumentSummaries:
+    """Process-wide document summary cache."""
+    global _SUMMARIES
+    if _SUMMARIES is None:
+        with _SUMMARIES_LOCK:
+            if _SUMMARIES is None:
+                _SUMMARIES = DocumentSummaries()
+    return _SUMMARIES
@@ -0,0 +1,143 @@
+"""
+Persistent embedding cache keyed by (model id, sha256 of chunk text).
+
+Re-indexing a document that is unchanged, or mostly unchanged, only sends new
+or edited chunks to the embedding model. Entries live in a local SQLite file
+and the least recently used ones are evicted once the cache grows past
+``EMBEDDING_CACHE_MAX_ENTRIES``.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+_CACHE: Optional["EmbeddingCache"] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe SQLite-backed LRU of float32 embedding vectors."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_id TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model_id, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model_id: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        if not hashes:
+            return found
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model_id = ? AND text_hash IN ({placeholders})",
+                    [model_id, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model_id = ? AND text_hash = ?",
+                    [(now, model_id, key) for key in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model_id: str, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        now = time.time()
+        rows = [
+            (model_id, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache instance, or None when disabled."""
+    global _CACHE
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+    return _CACHE
+
+
+def encode_with_cache(model, model_id: str, texts: List[str], batch_size: int = 8) -> np.ndarray:
+    """Encode texts, sending only those missing from the cache to ``model.encode``."""
+    cache = get_embedding_cache()
+    if cache is None:
+        return np.asarray(model.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype=np.float32)
+
+    hashes = [text_hash(text) for text in texts]
+    cached = cache.get_many(model_id, hashes)
+    # Duplicate texts within the batch are encoded once
+    missing: Dict[str, int] = {}
+    for i, key in enumerate(hashes):
+        if key not in cached:
+            missing.setdefault(key, i)
+    if missing:
+        indices = list(missing.values())
+        fresh = model.encode([texts[i] for i in indices], batch_size=batch_size, show_progress_bar=False)
+        fresh = np.asarray(fresh, dtype=np.float32)
+        cache.put_many(model_id, zip(missing.keys(), fresh))
+        cached.update(zip(missing.keys(), fresh))
+    return np.stack([cached[key] for key in hashes])
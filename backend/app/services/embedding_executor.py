@@ -0,0 +1,113 @@
+"""
+Dedicated executor for embedding inference.
+
+``SentenceTransformer.encode`` is CPU-bound and takes tens of milliseconds;
+called from an ``async`` handler it freezes the event loop and every other
+request on the worker stalls behind it. ``EmbeddingExecutor`` runs encodes
+on its own small thread pool (torch releases the GIL while it computes), caps
+how many requests may wait for it, and keeps queue-depth and latency metrics.
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+
+class EmbeddingOverloadedError(RuntimeError):
+    """Raised when the embedding queue is full; callers should shed the request."""
+
+
+class EmbeddingExecutor:
+    """Bounded thread pool for model inference with queue metrics."""
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers or settings.EMBEDDING_EXECUTOR_WORKERS
+        self.max_queue = max_queue or settings.EMBEDDING_EXECUTOR_MAX_QUEUE
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embedding")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._peak_queued = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _call(self, fn: Callable[..., Any], enqueued_at: float) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            wait = started - enqueued_at
+            self._wait_seconds += wait
+            self._max_wait_seconds = max(self._max_wait_seconds, wait)
+        ok = False
+        try:
+            result = fn()
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._run_seconds += time.perf_counter() - started
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Queue ``fn(*args, **kwargs)`` on the pool; raises when the queue is full."""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise EmbeddingOverloadedError("Embedding queue is full")
+            self._queued += 1
+            self._submitted += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+        call = functools.partial(fn, *args, **kwargs)
+        return self._pool.submit(self._call, call, time.perf_counter())
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "active": self._active,
+                "peak_queued": self._peak_queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds / finished * 1000, 3) if finished else 0.0,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 3),
+                "avg_run_ms": round(self._run_seconds / finished * 1000, 3) if finished else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_EXECUTOR: Optional[EmbeddingExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_embedding_executor() -> EmbeddingExecutor:
+    """Process-wide embedding executor."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = EmbeddingExecutor()
+    return _EXECUTOR
@@ -0,0 +1,159 @@
+"""
+Persistent cache of cleaned per-page PDF text, keyed by the file's sha256.
+
+Text extraction is the slowest CPU step of indexing. With this cache, a
+re-index of an unchanged file skips PyPDF2 entirely, and so does a
+re-chunk or an embedding-model migration: the pipeline replays the cached
+pages into the chunk stage. Pages are stored zlib-compressed in a local
+SQLite file. Whole documents are evicted least recently used first once
+their compressed size exceeds ``EXTRACTION_CACHE_MAX_MB``.
+
+Bump ``EXTRACTION_VERSION`` when ``clean_extracted_text`` changes its output,
+so stale entries are missed (and age out) instead of being replayed.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+EXTRACTION_VERSION = 1
+HASH_BLOCK_BYTES = 1024 * 1024
+
+_CACHE: Optional["ExtractionCache"] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(HASH_BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compress_page(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+class ExtractionCache:
+    """Thread-safe SQLite-backed LRU of extracted documents, bounded by compressed size."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # The API and the indexing worker share the file
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # Must precede table creation; lets eviction hand pages back to the filesystem
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_key TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                doc_key TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                text BLOB NOT NULL,
+                PRIMARY KEY (doc_key, page_number)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_documents_last_used ON documents (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(sha256: str) -> str:
+        return f"v{EXTRACTION_VERSION}:{sha256}"
+
+    def get(self, sha256: str) -> Optional[List[Tuple[int, str]]]:
+        """Cached (page_number, cleaned text) pairs in page order, or None on a miss."""
+        key = self._key(sha256)
+        with self._lock:
+            found = self._conn.execute("SELECT page_count FROM documents WHERE doc_key = ?", (key,)).fetchone()
+            if found is None:
+                self.misses += 1
+                return None
+            rows = self._conn.execute(
+                "SELECT page_number, text FROM pages WHERE doc_key = ? ORDER BY page_number", (key,)
+            ).fetchall()
+            if len(rows) != found[0]:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE documents SET last_used = ? WHERE doc_key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return [(page_number, zlib.decompress(blob).decode("utf-8")) for page_number, blob in rows]
+
+    def put(self, sha256: str, pages: List[Tuple[int, bytes]]) -> None:
+        """Store a fully extracted document; ``pages`` hold ``compress_page`` output."""
+        key = self._key(sha256)
+        size = sum(len(blob) for _, blob in pages)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE doc_key = ?", (key,))
+            self._conn.executemany(
+                "INSERT INTO pages (doc_key, page_number, text) VALUES (?, ?, ?)",
+                [(key, page_number, blob) for page_number, blob in pages],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_key, page_count, size_bytes, last_used) VALUES (?, ?, ?, ?)",
+                (key, len(pages), size, time.time()),
+            )
+            evicted = self._evict()
+            self._conn.commit()
+            if evicted:
+                self._conn.execute("PRAGMA incremental_vacuum")
+
+    def _evict(self) -> int:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM documents").fetchone()
+        overflow = total - self.max_bytes
+        if overflow <= 0:
+            return 0
+        victims = []
+        for key, size in self._conn.execute("SELECT doc_key, size_bytes FROM documents ORDER BY last_used ASC"):
+            victims.append((key,))
+            overflow -= size
+            if overflow <= 0:
+                break
+        self._conn.executemany("DELETE FROM pages WHERE doc_key = ?", victims)
+        self._conn.executemany("DELETE FROM documents WHERE doc_key = ?", victims)
+        return len(victims)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            documents, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM documents"
+            ).fetchone()
+        return {"documents": documents, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Process-wide cache instance, or None when disabled."""
+    global _CACHE
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ExtractionCache(
+                settings.EXTRACTION_CACHE_PATH, settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+            )
+    return _CACHE
@@ -1,11 +1,43 @@
+import logging
 import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Optional
 from fastapi import UploadFile
 from app.core.config import settings
+from app.services.http_client import get_http_client
 from app.models.course import ContentType
 from pathlib import Path
 import cloudinary
 import cloudinary.uploader
 
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class _TeeReader:
+    """File-like wrapper that copies every byte read from ``source`` into ``sink``."""
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        self.source = source
+        self.sink = sink
+
+    @property
+    def name(self):
+        return getattr(self.source, "name", None)
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        self.sink.write(data)
+        return data
+
+    def drain(self) -> None:
+        """Copy whatever the consumer left unread."""
+        shutil.copyfileobj(self.source, self.sink, DOWNLOAD_CHUNK_BYTES)
+
 
 def _ensure_cloudinary_configured() -> None:
     if not settings.CLOUDINARY_CLOUD_NAME or not settings.CLOUDINARY_API_KEY or not settings.CLOUDINARY_API_SECRET:
@@ -19,8 +51,17 @@ def _ensure_cloudinary_configured() -> None:
     )
 
 
-async def save_uploaded_file(file: UploadFile, course_id: int, content_type: ContentType) -> str:
-    """Upload an uploaded file to Cloudinary and return its URL."""
+async def save_uploaded_file(
+    file: UploadFile,
+    course_id: int,
+    content_type: ContentType,
+    spool_path: Optional[str] = None,
+) -> str:
+    """Upload an uploaded file to Cloudinary and return its URL.
+
+    With ``spool_path`` the bytes are also written to that local file as they
+    are sent, so indexing can read them without downloading them back.
+    """
     _ensure_cloudinary_configured()
 
     if not file.filename:
@@ -38,6 +79,22 @@ async def save_uploaded_file(file: UploadFile, course_id: int, content_type: Con
             unique_filename=True,
             overwrite=False,
         )
+    elif spool_path:
+        try:
+            with open(spool_path, "wb") as spool:
+                tee = _TeeReader(file.file, spool)
+                result = cloudinary.uploader.upload(
+                    tee,
+                    resource_type="raw",
+                    public_id=public_id,
+                    use_filename=True,
+                    unique_filename=True,
+                    overwrite=False,
+                )
+                tee.drain()
+        except BaseException:
+            discard_upload_spool(spool_path)
+            raise
     else:
         result = cloudinary.uploader.upload(
             file.file,
@@ -50,3 +107,82 @@ async def save_uploaded_file(file: UploadFile, course_id: int, content_type: Con
 
     return result.get("secure_url") or result.get("url")
 
+
+
+@asynccontextmanager
+async def download_to_spool(url: str, max_bytes: Optional[int] = None) -> AsyncIterator[str]:
+    """Stream a remote file to a temporary file on disk and yield its path.
+
+    The size cap is enforced while streaming, so an oversized file is rejected
+    without ever being held in memory. The spool file is removed on exit.
+    """
+    if not (url.startswith("http://") or url.startswith("https://")):
+        raise ValueError("Content URL must be an http/https URL")
+    if max_bytes is None:
+        max_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+
+    fd, spool_path = tempfile.mkstemp(suffix=".spool", dir=settings.INGESTION_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            async with get_http_client().stream("GET", url, timeout=30) as response:
+                response.raise_for_status()
+                declared = response.headers.get("content-length")
+                if declared and int(declared) > max_bytes:
+                    raise ValueError(f"File exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+                received = 0
+                async for block in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    received += len(block)
+                    if received > max_bytes:
+                        raise ValueError(f"File exceeds the {max_bytes // (1024 * 1024)} MB limit")
+                    spool.write(block)
+        yield spool_path
+    finally:
+        try:
+            os.remove(spool_path)
+        except FileNotFoundError:
+            pass
+
+
+def new_upload_spool_path() -> Optional[str]:
+    """Fresh path in ``UPLOAD_SPOOL_DIR`` for an uploaded PDF, or None when upload spooling is off."""
+    if not settings.UPLOAD_SPOOL_DIR:
+        return None
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    return os.path.join(os.path.abspath(settings.UPLOAD_SPOOL_DIR), f"{os.urandom(16).hex()}.pdf")
+
+
+def _in_upload_spool(path: str) -> bool:
+    return bool(settings.UPLOAD_SPOOL_DIR) and (
+        os.path.dirname(os.path.abspath(path)) == os.path.abspath(settings.UPLOAD_SPOOL_DIR)
+    )
+
+
+def discard_upload_spool(path: Optional[str]) -> None:
+    """Remove an upload spool file; paths outside ``UPLOAD_SPOOL_DIR`` are never touched."""
+    if not path or not _in_upload_spool(path):
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_upload_spool(max_age_seconds: Optional[float] = None) -> int:
+    """Delete upload spool files older than ``max_age_seconds`` (left behind by failed requests)."""
+    if not settings.UPLOAD_SPOOL_DIR or not os.path.isdir(settings.UPLOAD_SPOOL_DIR):
+        return 0
+    if max_age_seconds is None:
+        max_age_seconds = settings.UPLOAD_SPOOL_MAX_AGE_HOURS * 3600
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(settings.UPLOAD_SPOOL_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    if removed:
+        logger.info("Removed %d stale upload spool file(s)", removed)
+    return removed
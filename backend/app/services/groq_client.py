@@ -0,0 +1,305 @@
+"""
+Resilient Groq chat-completions client.
+
+- Requests go through the shared pooled client (``get_http_client``), so
+  connections and TLS sessions are reused.
+- Each attempt has its own timeout. 429, 5xx and transport errors are
+  retried with full-jitter exponential backoff, and ``Retry-After`` is
+  honoured.
+- Optional hedging (``GROQ_HEDGE_AFTER_MS``): if the first attempt is still
+  running after that delay, a second identical request is sent and the first
+  successful response wins. It costs extra tokens, so it is off by default.
+- A circuit breaker opens after ``GROQ_BREAKER_FAILURES`` consecutive failed
+  calls. While it is open, calls fail immediately and callers use the
+  fallback answer. After ``GROQ_BREAKER_RESET_SECONDS`` one probe call is let
+  through. Only signs of an unhealthy service count as failures (429, 5xx,
+  timeouts and transport errors); a request Groq rejects with another 4xx
+  (400, 413, ...) fails on its own without tripping the breaker.
+"""
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from app.core.config import settings
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class GroqUnavailableError(Exception):
+    """Groq could not produce a response; callers should fall back."""
+
+
+class CircuitOpenError(GroqUnavailableError):
+    """The breaker is open; the call was not attempted."""
+
+
+class GroqRequestError(GroqUnavailableError):
+    """Groq rejected this request (4xx other than 429); not a sign the service is down."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Groq rejected the request with {status_code}")
+        self.status_code = status_code
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status_code: int, retry_after: Optional[float]):
+        super().__init__(f"Groq returned {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe."""
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_seconds: Optional[float] = None):
+        self.failure_threshold = max(1, failure_threshold or settings.GROQ_BREAKER_FAILURES)
+        self.reset_seconds = reset_seconds if reset_seconds is not None else settings.GROQ_BREAKER_RESET_SECONDS
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probing:
+                return False
+            self._probing = True  # One probe at a time while half-open
+            return True
+
+    def release_probe(self) -> None:
+        """The call was abandoned (cancelled) without an outcome."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    logger.warning("Groq circuit breaker opened after %d failures", self._failures)
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class GroqClient:
+    """Chat completions with retries, optional hedging and a circuit breaker."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+        attempt_timeout: Optional[float] = None,
+        hedge_after_ms: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = (base_url or settings.GROQ_BASE_URL).rstrip("/")
+        self.api_key = api_key
+        self.max_attempts = max(1, max_attempts or settings.GROQ_MAX_ATTEMPTS)
+        attempt_timeout = attempt_timeout or settings.GROQ_ATTEMPT_TIMEOUT_SECONDS
+        self.timeout = httpx.Timeout(attempt_timeout, connect=min(attempt_timeout, settings.HTTP_CONNECT_TIMEOUT_SECONDS))
+        self.hedge_after = (hedge_after_ms if hedge_after_ms is not None else settings.GROQ_HEDGE_AFTER_MS) / 1000
+        self.breaker = breaker or CircuitBreaker()
+        self._counters = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0, "short_circuited": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key or settings.GROQ_API_KEY}",
+            "Content-Type": "application/json"
+        }
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("retry-after")
+        try:
+            return min(float(value), settings.GROQ_RETRY_MAX_SECONDS) if value else None
+        except ValueError:
+            return None
+
+    def _check(self, response: httpx.Response) -> None:
+        if response.status_code in RETRYABLE_STATUS:
+            raise _RetryableStatus(response.status_code, self._retry_after(response))
+        if 400 <= response.status_code < 500:
+            raise GroqRequestError(response.status_code)
+        if response.status_code != 200:
+            raise GroqUnavailableError(f"Groq returned {response.status_code}")
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        if isinstance(error, _RetryableStatus) and error.retry_after is not None:
+            return error.retry_after
+        # Full jitter: spreads retries from many workers instead of synchronizing them
+        return random.uniform(0, min(settings.GROQ_RETRY_MAX_SECONDS, settings.GROQ_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    async def _retrying(self, attempt_fn, payload: Dict[str, Any]):
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_attempts):
+            try:
+                return await attempt_fn(payload)
+            except (_RetryableStatus, httpx.TransportError) as e:
+                last_error = e
+                if attempt == self.max_attempts - 1:
+                    break
+                self._count("retries")
+                await asyncio.sleep(self._backoff(attempt, e))
+        raise GroqUnavailableError(f"Groq failed after {self.max_attempts} attempts: {last_error}") from last_error
+
+    async def _post_once(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self._count("attempts")
+        response = await get_http_client().post(self.url, headers=self._headers(), json=payload, timeout=self.timeout)
+        self._check(response)
+        return response.json()
+
+    async def _hedged_post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.hedge_after <= 0:
+            return await self._post_once(payload)
+
+        primary = asyncio.ensure_future(self._post_once(payload))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if done:
+                return primary.result()
+
+            self._count("hedges")
+            hedge = asyncio.ensure_future(self._post_once(payload))
+            tasks.append(hedge)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def complete(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat completion response body; raises GroqUnavailableError on failure."""
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("Groq circuit breaker is open")
+        try:
+            body = await self._retrying(self._hedged_post, payload)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except GroqRequestError:
+            self._count("failures")
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return body
+
+    async def stream(self, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """Text deltas of a streamed completion.
+
+        Opening the stream is retried; once tokens have been relayed a failure
+        is raised to the caller, since the client already shows partial text.
+        """
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("Groq circuit breaker is open")
+
+        async with AsyncExitStack() as stack:
+            async def open_stream(body: Dict[str, Any]) -> httpx.Response:
+                self._count("attempts")
+                attempt = AsyncExitStack()
+                response = await attempt.enter_async_context(
+                    get_http_client().stream("POST", self.url, headers=self._headers(), json=body, timeout=self.timeout)
+                )
+                try:
+                    self._check(response)
+                except BaseException:
+                    await attempt.aclose()  # Free the connection before retrying
+                    raise
+                stack.push_async_exit(attempt)
+                return response
+
+            try:
+                response = await self._retrying(open_stream, {**payload, "stream": True})
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.release_probe()  # Client went away mid-stream
+                raise
+            except GroqRequestError:
+                self._count("failures")
+                self.breaker.release_probe()
+                raise
+            except Exception:
+                self._count("failures")
+                self.breaker.record_failure()
+                raise
+        self.breaker.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {**counters, "breaker": self.breaker.state, "hedge_after_ms": self.hedge_after * 1000}
+
+
+_CLIENT: Optional[GroqClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_groq_client() -> GroqClient:
+    """Process-wide Groq client (shares breaker state across requests)."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = GroqClient()
+    return _CLIENT
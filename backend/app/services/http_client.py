@@ -0,0 +1,62 @@
+"""
+Shared outbound HTTP client.
+
+Creating an ``httpx.AsyncClient`` per call pays DNS, TCP and TLS setup on
+every Groq request and file download. ``get_http_client`` returns one pooled
+keep-alive client per event loop (the API has one loop; each indexing worker
+slot runs its own), with HTTP/2 when the ``h2`` package is installed.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _http2_available() -> bool:
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP2_ENABLED is set but the h2 package is missing; using HTTP/1.1")
+        return False
+    return True
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(30.0, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Pooled client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(loop)
+        if client is None or client.is_closed:
+            client = _new_client()
+            _CLIENTS[loop] = client
+        return client
+
+
+async def close_http_client() -> None:
+    """Close the running loop's client (application shutdown)."""
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.pop(loop, None)
+    if client is not None:
+        await client.aclose()
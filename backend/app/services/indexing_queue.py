@@ -0,0 +1,178 @@
+import random
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.rag import IndexingJob, IndexingJobStatus, VectorIndex
+from app.services.file_service import discard_upload_spool
+
+# Higher priority jobs are claimed first
+PRIORITY_UPLOAD = 0
+PRIORITY_MANUAL = 10
+
+ACTIVE_STATUSES = (IndexingJobStatus.QUEUED, IndexingJobStatus.RUNNING)
+
+
+def _mark_vector_index(db: Session, content_id: int, is_indexed: int, error_message: Optional[str]) -> None:
+    vector_index = db.query(VectorIndex).filter(VectorIndex.content_id == content_id).first()
+    if vector_index is None:
+        vector_index = VectorIndex(content_id=content_id)
+        db.add(vector_index)
+    vector_index.is_indexed = is_indexed
+    vector_index.error_message = error_message
+    vector_index.last_updated = datetime.utcnow()
+
+
+def enqueue_indexing_job(
+    db: Session,
+    content_id: int,
+    priority: int = PRIORITY_UPLOAD,
+    source_path: Optional[str] = None,
+) -> IndexingJob:
+    """Queue content for indexing. Reuses an already queued/running job for the same content.
+
+    ``source_path`` is a local copy of the file (upload spool) the worker reads
+    instead of downloading it. The job takes ownership of it: a copy that an
+    active job does not need (it already has its own) is deleted here.
+    """
+    existing = (
+        db.query(IndexingJob)
+        .filter(IndexingJob.content_id == content_id)
+        .filter(IndexingJob.status.in_(ACTIVE_STATUSES))
+        .order_by(IndexingJob.id.desc())
+        .first()
+    )
+    if existing:
+        if existing.status == IndexingJobStatus.QUEUED and priority > existing.priority:
+            existing.priority = priority
+            db.commit()
+        if source_path and source_path != existing.source_path:
+            if existing.source_path:
+                discard_upload_spool(source_path)  # Nothing would ever read or remove it
+            else:
+                existing.source_path = source_path
+                db.commit()
+        return existing
+
+    job = IndexingJob(
+        content_id=content_id,
+        status=IndexingJobStatus.QUEUED,
+        priority=priority,
+        max_attempts=settings.INDEXING_MAX_ATTEMPTS,
+        run_after=datetime.utcnow(),
+        source_path=source_path,
+    )
+    db.add(job)
+    _mark_vector_index(db, content_id, is_indexed=1, error_message=None)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_latest_job(db: Session, content_id: int) -> Optional[IndexingJob]:
+    return (
+        db.query(IndexingJob)
+        .filter(IndexingJob.content_id == content_id)
+        .order_by(IndexingJob.id.desc())
+        .first()
+    )
+
+
+def requeue_stale_jobs(db: Session) -> int:
+    """Return jobs whose worker stopped heartbeating to the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.INDEXING_STALE_AFTER_SECONDS)
+    stale_jobs = (
+        db.query(IndexingJob)
+        .filter(IndexingJob.status == IndexingJobStatus.RUNNING)
+        .filter(IndexingJob.heartbeat_at < cutoff)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in stale_jobs:
+        _schedule_retry_or_fail(db, job, "Worker stopped responding")
+    if stale_jobs:
+        db.commit()
+    return len(stale_jobs)
+
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[IndexingJob]:
+    """Atomically claim the highest priority runnable job (SKIP LOCKED on Postgres)."""
+    now = datetime.utcnow()
+    job = (
+        db.query(IndexingJob)
+        .filter(IndexingJob.status == IndexingJobStatus.QUEUED)
+        .filter(IndexingJob.run_after <= now)
+        .order_by(IndexingJob.priority.desc(), IndexingJob.id.asc())
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = IndexingJobStatus.RUNNING
+    job.attempts += 1
+    job.worker_id = worker_id
+    job.started_at = now
+    job.heartbeat_at = now
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def heartbeat(db: Session, job_ids: Iterable[int], worker_id: str) -> None:
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    (
+        db.query(IndexingJob)
+        .filter(IndexingJob.id.in_(job_ids))
+        .filter(IndexingJob.worker_id == worker_id)
+        .filter(IndexingJob.status == IndexingJobStatus.RUNNING)
+        .update({IndexingJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+    )
+    db.commit()
+
+
+def mark_succeeded(db: Session, job: IndexingJob) -> None:
+    job.status = IndexingJobStatus.SUCCEEDED
+    job.finished_at = datetime.utcnow()
+    job.last_error = None
+    db.commit()
+
+
+def mark_failed(db: Session, job: IndexingJob, error: str, retry: bool = True) -> None:
+    """Record a failed attempt, scheduling a retry with jittered exponential backoff when allowed."""
+    if retry:
+        _schedule_retry_or_fail(db, job, error)
+    else:
+        _fail(db, job, error)
+    db.commit()
+
+
+def _schedule_retry_or_fail(db: Session, job: IndexingJob, error: str) -> None:
+    if job.attempts >= job.max_attempts:
+        _fail(db, job, error)
+        return
+
+    backoff = settings.INDEXING_RETRY_BACKOFF_SECONDS * (2 ** max(job.attempts - 1, 0))
+    backoff *= random.uniform(0.8, 1.2)
+    job.status = IndexingJobStatus.QUEUED
+    job.worker_id = None
+    job.heartbeat_at = None
+    job.last_error = error
+    job.run_after = datetime.utcnow() + timedelta(seconds=backoff)
+    _mark_vector_index(
+        db,
+        job.content_id,
+        is_indexed=1,
+        error_message=f"Attempt {job.attempts} failed, retrying: {error}",
+    )
+
+
+def _fail(db: Session, job: IndexingJob, error: str) -> None:
+    job.status = IndexingJobStatus.FAILED
+    job.finished_at = datetime.utcnow()
+    job.worker_id = None
+    job.last_error = error
+    _mark_vector_index(db, job.content_id, is_indexed=0, error_message=error)
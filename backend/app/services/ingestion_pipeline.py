@@ -0,0 +1,258 @@
+"""
+Staged PDF ingestion pipeline.
+
+    extract (process pool) -> chunk -> embed (thread) -> store (thread)
+
+Stages are connected by bounded asyncio queues, so at most ``queue_depth``
+items are buffered between any two stages and memory stays proportional to
+the queue depth rather than to the size of the document. Page extraction
+fans out over a process pool while earlier pages are already being embedded
+and written to the vector store. When an ``ExtractionCache`` is given and
+already holds the file, the extract stage replays the cached pages instead.
+
+This module is imported by the extraction worker processes, so it must stay
+free of heavy imports (torch, chromadb).
+"""
+import asyncio
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+import PyPDF2
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+from app.services.adaptive_batching import AdaptiveBatchSizer
+from app.services.extraction_cache import ExtractionCache, compress_page, file_sha256
+
+logger = logging.getLogger(__name__)
+
+# (page_number, cleaned page text) -> chunk dicts with "text" and "metadata"
+ChunkPageFn = Callable[[int, str], List[Dict[str, Any]]]
+# texts -> embedding matrix
+EmbedFn = Callable[[List[str]], Any]
+# (chunks, embeddings) -> None
+StoreFn = Callable[[List[Dict[str, Any]], Any], None]
+
+HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+BLANK_LINE_RUN = re.compile(r"\n{3,}")
+SPACE_RUN = re.compile(r"[ \t]{2,}")
+
+_SENTINEL = None
+_EXTRACTION_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def clean_extracted_text(text: str) -> str:
+    """Normalize PDF extracted text for better chunking."""
+    # Fix hyphenated line breaks (e.g., "inter-\nnational")
+    text = HYPHEN_BREAK.sub(r"\1\2", text)
+    # Normalize newlines and spacing
+    text = text.replace("\r", "\n")
+    text = BLANK_LINE_RUN.sub("\n\n", text)
+    text = SPACE_RUN.sub(" ", text)
+    # Trim each line and rejoin
+    lines = [line.strip() for line in text.split("\n")]
+    text = "\n".join([line for line in lines if line != ""])
+    # Breaks that only became "-\n" once blank lines and \r were dropped (the
+    # chunker used to catch these by cleaning a second time)
+    text = HYPHEN_BREAK.sub(r"\1\2", text)
+    return text.strip()
+
+
+@contextmanager
+def open_pdf_reader(pdf_path: str) -> Iterator[PyPDF2.PdfReader]:
+    """Open a PDF through a read-only memory map.
+
+    PdfReader copies a file path into a BytesIO; a memory map instead lets the
+    OS page the file in on demand and share it between extraction workers.
+    """
+    with open(pdf_path, "rb") as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield PyPDF2.PdfReader(mapped)
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    with open_pdf_reader(pdf_path) as reader:
+        return len(reader.pages)
+
+
+def _extract_pages(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extract and clean pages [start, end). Runs inside an extraction worker process."""
+    with open_pdf_reader(pdf_path) as reader:
+        return [
+            (page_index + 1, clean_extracted_text(reader.pages[page_index].extract_text() or ""))
+            for page_index in range(start, end)
+        ]
+
+
+def _default_extract_workers() -> int:
+    if settings.INGESTION_EXTRACT_WORKERS > 0:
+        return settings.INGESTION_EXTRACT_WORKERS
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Process-wide pool for page extraction (spawned, so workers never inherit torch state)."""
+    global _EXTRACTION_POOL
+    if _EXTRACTION_POOL is None:
+        _EXTRACTION_POOL = ProcessPoolExecutor(
+            max_workers=_default_extract_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _EXTRACTION_POOL
+
+
+@dataclass
+class IngestionStats:
+    pages: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    final_batch_size: int = 0
+    peak_rss_mb: int = 0
+    extraction_cached: bool = False
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+
+class IngestionPipeline:
+    """Runs one PDF through the extract → chunk → embed → store stages."""
+
+    def __init__(
+        self,
+        pdf_path: str,
+        chunk_page: ChunkPageFn,
+        embed: EmbedFn,
+        store: StoreFn,
+        pages_per_task: Optional[int] = None,
+        queue_depth: Optional[int] = None,
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
+        pool: Optional[ProcessPoolExecutor] = None,
+        extraction_cache: Optional[ExtractionCache] = None,
+    ):
+        self.pdf_path = pdf_path
+        self.chunk_page = chunk_page
+        self.embed = embed
+        self.store = store
+        self.pages_per_task = pages_per_task or settings.INGESTION_PAGES_PER_TASK
+        self.queue_depth = queue_depth or settings.INGESTION_QUEUE_DEPTH
+        self.batch_sizer = batch_sizer or AdaptiveBatchSizer()
+        self.pool = pool
+        self.extraction_cache = extraction_cache
+        self.stats = IngestionStats()
+        self._extracted: List[Tuple[int, bytes]] = []  # Compressed pages for the extraction cache
+
+    async def run(self) -> IngestionStats:
+        started = time.perf_counter()
+        pages_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        chunks_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        store_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+
+        tasks = [
+            asyncio.create_task(self._extract_stage(pages_queue)),
+            asyncio.create_task(self._chunk_stage(pages_queue, chunks_queue)),
+            asyncio.create_task(self._embed_stage(chunks_queue, store_queue)),
+            asyncio.create_task(self._store_stage(store_queue)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        self.stats.seconds = time.perf_counter() - started
+        self.stats.final_batch_size = self.batch_sizer.size
+        self.stats.peak_rss_mb = self.batch_sizer.stats()["peak_rss_mb"]
+        return self.stats
+
+    async def _extract_stage(self, out: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        pdf_hash = None
+        if self.extraction_cache is not None:
+            pdf_hash = await loop.run_in_executor(None, file_sha256, self.pdf_path)
+            cached = await loop.run_in_executor(None, self.extraction_cache.get, pdf_hash)
+            if cached is not None:
+                self.stats.extraction_cached = True
+                for start in range(0, len(cached), self.pages_per_task):
+                    pages = cached[start:start + self.pages_per_task]
+                    self.stats.pages += len(pages)
+                    await out.put(pages)
+                await out.put(_SENTINEL)
+                return
+
+        pool = self.pool or get_extraction_pool()
+        try:
+            page_count = await loop.run_in_executor(None, count_pdf_pages, self.pdf_path)
+        except Exception as e:
+            raise ValidationError(f"Failed to process PDF: {str(e)}")
+
+        # Sliding window of in-flight page ranges, drained in page order
+        in_flight: List[Awaitable[List[Tuple[int, str]]]] = []
+        for start in range(0, page_count, self.pages_per_task):
+            end = min(start + self.pages_per_task, page_count)
+            in_flight.append(loop.run_in_executor(pool, _extract_pages, self.pdf_path, start, end))
+            if len(in_flight) >= self.queue_depth:
+                await self._forward_pages(in_flight.pop(0), out)
+        while in_flight:
+            await self._forward_pages(in_flight.pop(0), out)
+        await out.put(_SENTINEL)
+        if pdf_hash is not None:
+            try:
+                await loop.run_in_executor(None, self.extraction_cache.put, pdf_hash, self._extracted)
+            except Exception as e:
+                logger.warning("Could not cache extracted pages of %s: %s", self.pdf_path, e)
+            self._extracted = []
+
+    async def _forward_pages(self, future: Awaitable[List[Tuple[int, str]]], out: asyncio.Queue) -> None:
+        try:
+            pages = await future
+        except Exception as e:
+            raise ValidationError(f"Failed to process PDF: {str(e)}")
+        self.stats.pages += len(pages)
+        if self.extraction_cache is not None:
+            self._extracted.extend((page_number, compress_page(text)) for page_number, text in pages)
+        await out.put(pages)
+
+    async def _chunk_stage(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        batch: List[Dict[str, Any]] = []
+        while (pages := await inp.get()) is not _SENTINEL:
+            for page_number, text in pages:
+                if not text.strip():
+                    continue
+                batch.extend(self.chunk_page(page_number, text))
+                while len(batch) >= self.batch_sizer.size:
+                    size = self.batch_sizer.size
+                    await out.put(batch[:size])
+                    batch = batch[size:]
+        if batch:
+            await out.put(batch)
+        await out.put(_SENTINEL)
+
+    async def _embed_stage(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while (chunks := await inp.get()) is not _SENTINEL:
+            self.batch_sizer.start()  # No-op after the first batch
+            texts = [chunk["text"] for chunk in chunks]
+            embeddings = await loop.run_in_executor(None, self.embed, texts)
+            self.batch_sizer.observe()
+            await out.put((chunks, embeddings))
+        await out.put(_SENTINEL)
+
+    async def _store_stage(self, inp: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while (item := await inp.get()) is not _SENTINEL:
+            chunks, embeddings = item
+            await loop.run_in_executor(None, self.store, chunks, embeddings)
+            self.stats.chunks += len(chunks)
@@ -0,0 +1,342 @@
+"""
+Per-course BM25 inverted index for hybrid retrieval.
+
+Embeddings miss exact terms (formula names, code identifiers, course jargon)
+that a keyword match finds immediately. The indexer records the term counts
+of every chunk of a content item in ``content_<id>.json``. It then compiles
+the whole course into ``postings.npz``, which holds:
+
+- ``terms``: sorted vocabulary
+- ``offsets``: start of each term's postings (CSR layout)
+- ``docs`` / ``weights``: chunk row and precomputed BM25 weight per posting
+- ``ids`` / ``contents``: chunk id and content id of each row
+
+Because the weights are computed up front, scoring a query is one slice and
+one scatter-add per query term.
+
+Ranked lists from BM25 and vector search are combined with reciprocal rank
+fusion (``reciprocal_rank_fusion``).
+
+These files live on the local disk of the process that indexed the content,
+like the Chroma and numpy stores. With ``VECTOR_STORE_BACKEND=pgvector`` the
+vectors are shared by every API node, so the keyword side must be shared
+too: ``PgLexicalIndex`` ranks ``document_chunks`` with PostgreSQL full-text
+search (GIN index on ``to_tsvector('simple', chunk_text)``) instead.
+"""
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+import numpy as np
+from app.core.config import settings
+from app.services.vector_store import directory_bytes
+
+# Words plus dotted/underscored identifiers (np.linalg, max_seq_length); parts are indexed too
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._][a-z0-9]+)*")
+SPLIT_PATTERN = re.compile(r"[._]")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it of on or that the this to was what when "
+    "where which who why will with".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "." in token or "_" in token:
+            tokens.extend(part for part in SPLIT_PATTERN.split(token) if part not in STOPWORDS)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: Optional[int] = None) -> Dict[str, float]:
+    """Fused score per id: sum of ``1 / (k + rank)`` over the lists it appears in."""
+    k = k or settings.RAG_RRF_K
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+class ContentTerms:
+    """Term counts of one content item's chunks, collected while it is indexed."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.counts: List[Dict[str, int]] = []
+
+    def add(self, chunk_id: str, text: str) -> None:
+        self.ids.append(chunk_id)
+        self.counts.append(dict(Counter(tokenize(text))))
+
+
+class _CoursePostings:
+    def __init__(self, terms, offsets, docs, weights, ids, contents):
+        self.term_index = {term: i for i, term in enumerate(terms.tolist())}
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        self.ids = ids.tolist()
+        self.contents = contents
+
+
+class LexicalIndex:
+    """BM25 postings per course under ``root/course_<id>/``."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._readers: Dict[int, Tuple[int, _CoursePostings]] = {}  # course id -> (mtime_ns, postings)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _course_dir(self, course_id: int) -> str:
+        return os.path.join(self.root, f"course_{course_id}")
+
+    def _postings_path(self, course_id: int) -> str:
+        return os.path.join(self._course_dir(course_id), "postings.npz")
+
+    @contextmanager
+    def _file_lock(self, course_id: int) -> Iterator[None]:
+        course_dir = self._course_dir(course_id)
+        os.makedirs(course_dir, exist_ok=True)
+        with open(os.path.join(course_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def replace_content(self, course_id: int, content_id: int, terms: ContentTerms) -> None:
+        """Store a content item's chunks and recompile the course postings."""
+        with self._file_lock(course_id):
+            self._write_content(course_id, content_id, terms)
+            self._compile(course_id)
+
+    def _write_content(self, course_id: int, content_id: int, terms: ContentTerms) -> None:
+        path = os.path.join(self._course_dir(course_id), f"content_{content_id}.json")
+        with open(path + ".tmp", "w") as fh:
+            json.dump({"ids": terms.ids, "counts": terms.counts}, fh, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def delete_content(self, course_id: int, content_id: int) -> None:
+        with self._file_lock(course_id):
+            try:
+                os.remove(os.path.join(self._course_dir(course_id), f"content_{content_id}.json"))
+            except FileNotFoundError:
+                return
+            self._compile(course_id)
+
+    def delete_course(self, course_id: int) -> None:
+        course_dir = self._course_dir(course_id)
+        if not os.path.isdir(course_dir):
+            return
+        with self._file_lock(course_id):
+            for name in os.listdir(course_dir):
+                if name != ".lock":
+                    os.remove(os.path.join(course_dir, name))
+        shutil.rmtree(course_dir, ignore_errors=True)
+        with self._lock:
+            self._readers.pop(course_id, None)
+
+    def inventory(self) -> Dict[int, Set[int]]:
+        """Content ids with stored terms, per course id."""
+        stored: Dict[int, Set[int]] = {}
+        for name in os.listdir(self.root):
+            if not (name.startswith("course_") and name[len("course_"):].isdigit()):
+                continue
+            try:
+                entries = os.listdir(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue  # Course deleted meanwhile
+            stored[int(name[len("course_"):])] = {
+                int(entry[len("content_"):-len(".json")])
+                for entry in entries
+                if entry.startswith("content_") and entry.endswith(".json")
+            }
+        return stored
+
+    def _compile(self, course_id: int) -> None:
+        """Rebuild ``postings.npz`` from every content file (caller holds the file lock)."""
+        course_dir = self._course_dir(course_id)
+        ids: List[str] = []
+        counts: List[Dict[str, int]] = []
+        contents: List[int] = []
+        for name in sorted(os.listdir(course_dir)):
+            if name.startswith("content_") and name.endswith(".json"):
+                with open(os.path.join(course_dir, name)) as fh:
+                    stored = json.load(fh)
+                ids.extend(stored["ids"])
+                counts.extend(stored["counts"])
+                contents.extend([int(name[len("content_"):-len(".json")])] * len(stored["ids"]))
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = np.zeros(len(ids), dtype=np.float32)
+        for row, chunk_counts in enumerate(counts):
+            lengths[row] = sum(chunk_counts.values())
+            for term, count in chunk_counts.items():
+                postings.setdefault(term, []).append((row, count))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        docs = np.zeros(sum(len(postings[term]) for term in terms), dtype=np.int32)
+        weights = np.zeros(len(docs), dtype=np.float32)
+        average_length = float(lengths.mean()) if len(ids) else 1.0
+        position = 0
+        for i, term in enumerate(terms):
+            rows, tfs = zip(*postings[term])
+            rows = np.asarray(rows, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = math.log(1 + (len(ids) - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / max(average_length, 1.0))
+            docs[position:position + len(rows)] = rows
+            weights[position:position + len(rows)] = idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+            position += len(rows)
+            offsets[i + 1] = position
+
+        path = self._postings_path(course_id)
+        with open(path + ".tmp", "wb") as fh:
+            np.savez(
+                fh,
+                terms=np.asarray(terms, dtype=str),
+                offsets=offsets,
+                docs=docs,
+                weights=weights,
+                ids=np.asarray(ids, dtype=str),
+                contents=np.asarray(contents, dtype=np.int64),
+            )
+        os.replace(path + ".tmp", path)  # Readers reload on the new mtime
+
+    def _load(self, course_id: int) -> Optional[_CoursePostings]:
+        path = self._postings_path(course_id)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._readers.get(course_id)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with np.load(path, allow_pickle=False) as stored:
+            postings = _CoursePostings(
+                stored["terms"], stored["offsets"], stored["docs"], stored["weights"], stored["ids"], stored["contents"]
+            )
+        with self._lock:
+            self._readers[course_id] = (mtime, postings)
+        return postings
+
+    def search(
+        self, course_id: int, query: str, top_k: int, content_ids: Optional[Sequence[int]] = None
+    ) -> List[Tuple[str, float]]:
+        """Best BM25 matches as (chunk id, score), best first; only within ``content_ids`` when given."""
+        postings = self._load(course_id)
+        if postings is None or not postings.ids or top_k <= 0:
+            return []
+        scores = np.zeros(len(postings.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            i = postings.term_index.get(term)
+            if i is not None:
+                start, end = postings.offsets[i], postings.offsets[i + 1]
+                scores[postings.docs[start:end]] += postings.weights[start:end]  # Rows are unique per term
+        if content_ids is not None:
+            scores[~np.isin(postings.contents, np.asarray(content_ids, dtype=np.int64))] = 0
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+        k = min(top_k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(postings.ids[row], float(scores[row])) for row in top]
+
+    def storage_bytes(self) -> int:
+        return directory_bytes(self.root)
+
+
+class PgLexicalIndex:
+    """Keyword search over ``document_chunks`` for the pgvector backend.
+
+    Chunk text is already stored next to the vectors, so writes and deletes
+    are no-ops here: the vector store's own writes keep the index current on
+    every node. Ranking is ``ts_rank_cd`` rather than BM25; fusion only uses
+    the order.
+    """
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from app.core.database import engine
+        self.engine = engine
+
+    def replace_content(self, course_id: int, content_id: int, terms: ContentTerms) -> None:
+        pass
+
+    def delete_content(self, course_id: int, content_id: int) -> None:
+        pass
+
+    def delete_course(self, course_id: int) -> None:
+        pass
+
+    def inventory(self) -> Dict[int, Set[int]]:
+        return {}  # Nothing stored apart from the vector store's rows
+
+    def storage_bytes(self) -> int:
+        return 0  # The GIN index is counted in the table's pg_total_relation_size
+
+    def search(
+        self, course_id: int, query: str, top_k: int, content_ids: Optional[Sequence[int]] = None
+    ) -> List[Tuple[str, float]]:
+        """Best full-text matches as (chunk id, score), best first; only within ``content_ids`` when given."""
+        terms = sorted(set(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+        params = [" or ".join(terms), course_id]
+        scope = ""
+        if content_ids is not None:
+            scope = "AND content_id = ANY(%s)"
+            params.append([int(content_id) for content_id in content_ids])
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            # The expression must match ix_document_chunks_chunk_text_fts to use the GIN index
+            cursor.execute(
+                f"""
+                SELECT chunk_id, ts_rank_cd(to_tsvector('simple', chunk_text), query) AS score
+                FROM document_chunks, websearch_to_tsquery('simple', %s) AS query
+                WHERE course_id = %s {scope} AND to_tsvector('simple', chunk_text) @@ query
+                ORDER BY score DESC
+                LIMIT %s
+                """,
+                (*params, top_k),
+            )
+            rows = cursor.fetchall()
+            connection.commit()
+        finally:
+            connection.close()
+        return [(chunk_id, float(score)) for chunk_id, score in rows]
+
+
+_INDEX: Optional[Union[LexicalIndex, PgLexicalIndex]] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_lexical_index() -> Union[LexicalIndex, PgLexicalIndex]:
+    """Process-wide keyword index: in PostgreSQL for pgvector, else BM25 files under ``LEXICAL_INDEX_PATH``."""
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                if settings.VECTOR_STORE_BACKEND == "pgvector":
+                    _INDEX = PgLexicalIndex()
+                else:
+                    _INDEX = LexicalIndex(settings.LEXICAL_INDEX_PATH)
+    return _INDEX
@@ -0,0 +1,148 @@
+"""
+Micro-batching of concurrent query embeddings.
+
+When a whole class asks at once, encoding each question separately wastes
+most of the model's throughput: a batch of 32 short questions costs little
+more than one. ``QueryBatcher`` collects questions that arrive within
+``QUERY_BATCH_WINDOW_MS`` of the first one (or until ``QUERY_BATCH_MAX_SIZE``
+are waiting), encodes them in one call on the embedding executor, and hands
+each caller its own vector. At most one batch per executor worker is in
+flight; while it encodes, the next batch keeps filling, so batch size grows
+with load on its own.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.services.embedding_executor import EmbeddingExecutor, EmbeddingOverloadedError, get_embedding_executor
+
+EncodeBatchFn = Callable[[List[str]], Sequence[Any]]
+
+
+def _settle(future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """Resolve a caller's future unless it was cancelled (client disconnect) in the meantime."""
+    # A cancel can land between any check and the set, so the set itself is guarded
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class QueryBatcher:
+    """Gathers concurrent ``embed`` calls into batched encodes."""
+
+    def __init__(
+        self,
+        encode_batch: EncodeBatchFn,
+        window_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        executor: Optional[EmbeddingExecutor] = None,
+    ):
+        self.encode_batch = encode_batch
+        self.window = (window_ms if window_ms is not None else settings.QUERY_BATCH_WINDOW_MS) / 1000
+        self.max_batch = max(1, max_batch or settings.QUERY_BATCH_MAX_SIZE)
+        self.executor = executor or get_embedding_executor()
+        self.max_pending = self.max_batch * self.executor.max_queue
+        self._pending: List[Tuple[str, Future, float]] = []
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(self.executor.max_workers)
+        self._batches = 0
+        self._queries = 0
+        self._largest_batch = 0
+        self._wait_seconds = 0.0
+        self._thread = threading.Thread(target=self._collect, name="query-batcher", daemon=True)
+        self._thread.start()
+
+    async def embed(self, text: str) -> Any:
+        """Embedding for one query, encoded together with its concurrent peers."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                raise EmbeddingOverloadedError("Query embedding queue is full")
+            self._pending.append((text, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def _collect(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Hold the batch open for the window, unless it fills first
+                deadline = self._pending[0][2] + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            # Wait for a free encode slot; questions keep piling into the next batch meanwhile
+            self._slots.acquire()
+            with self._cond:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[str, Future, float]]) -> None:
+        now = time.perf_counter()
+        with self._cond:
+            self._batches += 1
+            self._queries += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._wait_seconds += sum(now - enqueued_at for _, _, enqueued_at in batch)
+
+        texts = [text for text, _, _ in batch]
+        try:
+            encoded = self.executor.submit(self.encode_batch, texts)
+        except Exception as exc:
+            self._slots.release()
+            for _, future, _ in batch:
+                _settle(future, error=exc)
+            return
+
+        def deliver(done: Future) -> None:
+            self._slots.release()
+            error = done.exception()
+            results = None if error is not None else done.result()
+            for i, (_, future, _) in enumerate(batch):
+                _settle(future, None if results is None else results[i], error)
+
+        encoded.add_done_callback(deliver)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "pending": len(self._pending),
+                "batches": self._batches,
+                "queries": self._queries,
+                "avg_batch_size": round(self._queries / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "avg_batch_wait_ms": round(self._wait_seconds / self._queries * 1000, 3) if self._queries else 0.0,
+            }
+
+
+_BATCHER: Optional[QueryBatcher] = None
+_BATCHER_LOCK = threading.Lock()
+
+
+def get_query_batcher(encode_batch: EncodeBatchFn) -> QueryBatcher:
+    """Process-wide batcher; ``encode_batch`` is only used on first call."""
+    global _BATCHER
+    if _BATCHER is None:
+        with _BATCHER_LOCK:
+            if _BATCHER is None:
+                _BATCHER = QueryBatcher(encode_batch)
+    return _BATCHER
+
+
+def query_batcher_stats() -> Optional[Dict[str, Any]]:
+    return _BATCHER.stats() if _BATCHER is not None else None
@@ -1,19 +1,38 @@
 import asyncio
 import os
+import time
 import json
-import httpx
-import psutil  # Add memory monitoring
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from pathlib import Path
-import PyPDF2
-import io
+from contextlib import asynccontextmanager, AsyncExitStack
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.models.course import CourseContent, ContentType
 from app.models.rag import StudentQuery, VectorIndex, RagThread
 from sqlalchemy.sql import func
 from app.core.exceptions import ValidationError, NotFoundError
+from app.services.chunking import TokenChunker, split_text_into_chunks
+from app.services.context_assembly import estimate_tokens, select_context
+from app.services.document_summaries import get_document_summaries, summary_embedding
+from app.services.lexical_index import ContentTerms, get_lexical_index, reciprocal_rank_fusion
+from app.services.answer_cache import (
+    get_answer_cache,
+    get_query_embedding_cache,
+    get_semantic_answer_cache,
+    normalize_question,
+)
+from app.services.embedding_cache import encode_with_cache
+from app.services.extraction_cache import get_extraction_cache
+from app.services.embedding_executor import EmbeddingOverloadedError, get_embedding_executor
+from app.services.query_batcher import get_query_batcher
+from app.services.single_flight import get_single_flight
+from app.services.file_service import download_to_spool
+from app.services.groq_client import CircuitOpenError, get_groq_client
+from app.services.ingestion_pipeline import IngestionPipeline, clean_extracted_text
+from app.services.vector_diff import ChunkDiff
+from app.services.vector_store import get_vector_store
 import logging
+import numpy as np
 
 # Memory optimization settings - must be set BEFORE model imports
 _CACHE_ROOT = os.path.abspath(os.getenv("MODEL_CACHE_DIR", "./model_cache"))
@@ -30,25 +49,24 @@ os.environ.setdefault("DISABLE_OPENVINO", "1")
 os.environ.setdefault("TORCH_CUDA_ARCH_LIST", "")
 os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
 
-import chromadb
-from chromadb.config import Settings as ChromaSettings
 from sentence_transformers import SentenceTransformer
 
 # Global singleton for embedding model - TRULY shared across all instances
 _GLOBAL_EMBEDDING_MODEL = None
+_GLOBAL_TOKEN_CHUNKER = None
+# Always use smallest model for 512MB limit
+EMBEDDING_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+logger = logging.getLogger(__name__)
 
 
 class RAGService:
-    """Service for RAG (Retrieval-Augmented Generation) functionality using Groq + Sentence Transformers + ChromaDB."""
+    """Service for RAG (Retrieval-Augmented Generation) functionality using Groq + Sentence Transformers + a pluggable vector store."""
     
     def __init__(self, db: Session):
         self.db = db
-        # Initialize ChromaDB client with persistence
-        self.chroma_client = chromadb.PersistentClient(
-            path="./chroma_db",
-            settings=ChromaSettings(anonymized_telemetry=False),
-        )
-        self.collection = self.chroma_client.get_or_create_collection("course_content")
+        # Shared process-wide vector store (ChromaDB or memory-mapped NumPy)
+        self.vector_store = get_vector_store()
         
         # Load sentence transformer model once (TRUE global singleton) with memory optimization
         global _GLOBAL_EMBEDDING_MODEL
@@ -60,14 +78,23 @@ class RAGService:
         global _GLOBAL_EMBEDDING_MODEL
         if _GLOBAL_EMBEDDING_MODEL is None:
             # Load model only when first requested
-            # Always use smallest model for 512MB limit
-            model_name = 'sentence-transformers/all-MiniLM-L6-v2'
-            
-            model_path = cls._ensure_local_model(model_name)
+            model_path = cls._ensure_local_model(EMBEDDING_MODEL_NAME)
             _GLOBAL_EMBEDDING_MODEL = SentenceTransformer(model_path)
         
         return _GLOBAL_EMBEDDING_MODEL
 
+    @classmethod
+    def get_token_chunker(cls) -> TokenChunker:
+        """Chunker sized by the embedding model's tokenizer (CHUNKING_MODE=tokens)."""
+        global _GLOBAL_TOKEN_CHUNKER
+        if _GLOBAL_TOKEN_CHUNKER is None:
+            _GLOBAL_TOKEN_CHUNKER = TokenChunker.for_model(
+                cls.get_embedding_model(),
+                max_tokens=settings.CHUNK_MAX_TOKENS,
+                overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+            )
+        return _GLOBAL_TOKEN_CHUNKER
+
     @staticmethod
     def _ensure_local_model(model_name: str) -> str:
         """Download only required model files (exclude ONNX/OpenVINO) and return local path."""
@@ -80,8 +107,8 @@ class RAGService:
             )
         return local_dir
         
-    async def process_uploaded_content(self, content_id: int) -> Dict[str, Any]:
-        """Process uploaded content for RAG indexing."""
+    async def process_uploaded_content(self, content_id: int, source_path: Optional[str] = None) -> Dict[str, Any]:
+        """Process uploaded content for RAG indexing (from ``source_path`` when it is still on disk)."""
         content = self.db.query(CourseContent).filter(CourseContent.id == content_id).first()
         if not content:
             raise NotFoundError("Content not found")
@@ -106,23 +133,21 @@ class RAGService:
         
         try:
             if content.type == ContentType.PDF:
-                chunks = await self._process_pdf_content(content)
+                chunk_count, summary = await self._index_pdf_content(content, source_path)
             else:
                 raise ValidationError(f"Only PDF content is supported for RAG processing. Content type: {content.type}")
             
-            # Generate embeddings and store chunks
-            await self._store_chunks_with_embeddings(content_id, content.course_id, chunks)
-            
             # Update index status
             vector_index.is_indexed = 2
-            vector_index.chunk_count = len(chunks)
+            vector_index.chunk_count = chunk_count
+            vector_index.summary_embedding = summary
             vector_index.last_updated = func.now()
             self.db.commit()
             
             return {
                 "content_id": content_id,
                 "status": "indexed",
-                "chunks_created": len(chunks)
+                "chunks_created": chunk_count
             }
             
         except Exception as e:
@@ -131,69 +156,118 @@ class RAGService:
             self.db.commit()
             raise
     
-    async def _process_pdf_content(self, content: CourseContent) -> List[Dict[str, Any]]:
-        """Extract and chunk PDF content."""
-        try:
-            # Download PDF from Cloudinary
-            pdf_content = await self._download_file_from_url(content.url)
-            
-            # Extract text from PDF
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-            text_chunks = []
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                text = page.extract_text() or ""
-                text = self._clean_extracted_text(text)
-                if text.strip():
-                    # Split page into smaller chunks (sentence-based, ~900 chars)
-                    chunks = self._split_text_into_chunks(
-                        text,
-                        chunk_size=900,
-                        overlap_sentences=2,
-                    )
-                    
-                    for i, chunk in enumerate(chunks):
-                        text_chunks.append({
-                            "text": chunk,
-                            "metadata": {
-                                "page_number": page_num + 1,
-                                "chunk_index": i,
-                                "content_title": content.title
-                            }
-                        })
-            
-            return text_chunks
-            
-        except Exception as e:
-            raise ValidationError(f"Failed to process PDF: {str(e)}")
+    async def _index_pdf_content(
+        self, content: CourseContent, source_path: Optional[str] = None
+    ) -> Tuple[int, Optional[List[float]]]:
+        """Stream a local copy of a PDF through the staged ingestion pipeline.
+
+        Only chunks whose content-derived id is not already stored are embedded
+        and upserted; ids that disappeared from the document are deleted last.
+        Returns the chunk count and the document's summary embedding.
+        """
+        async with self._pdf_source(content, source_path) as pdf_path:
+            diff = ChunkDiff(content.id, self.vector_store.get_content_metadata(content.course_id, content.id))
+            terms = ContentTerms()
+            # Loaded up front so the batch sizer's baseline RSS includes the model
+            await asyncio.to_thread(self.get_embedding_model)
+            pipeline = IngestionPipeline(
+                pdf_path=pdf_path,
+                chunk_page=lambda page_number, text: self._new_chunks(
+                    diff, terms, self._chunk_page(content, page_number, text)
+                ),
+                embed=self._embed_texts,
+                store=lambda chunks, embeddings: self._store_chunk_batch(
+                    content.id, content.course_id, chunks, embeddings
+                ),
+                extraction_cache=get_extraction_cache(),
+            )
+            try:
+                stats = await pipeline.run()
+            except BaseException:
+                # A buffered partial run must not be written by the course's next flush
+                self.vector_store.discard(content.course_id, content.id)
+                raise
+
+        removed_ids = diff.removed_ids()
+        self.vector_store.delete(content.course_id, removed_ids)
+        if diff.metadata_updates:
+            self.vector_store.update_metadata(
+                content.course_id,
+                [chunk_id for chunk_id, _ in diff.metadata_updates],
+                [
+                    self._chunk_vector_metadata(content.id, content.course_id, metadata)
+                    for _, metadata in diff.metadata_updates
+                ],
+            )
+        self.vector_store.flush(content.course_id)
+        if settings.LEXICAL_INDEX_ENABLED:
+            get_lexical_index().replace_content(content.course_id, content.id, terms)
+        stored = self.vector_store.fetch(content.course_id, list(diff.seen))
+        summary = summary_embedding([hit.embedding for hit in stored])
+
+        logger.info(
+            "Indexed content %s: %d pages%s, %d chunks (%d added, %d unchanged, %d removed) "
+            "in %.1fs (%.1f pages/s, final batch %d, peak RSS %d MB)",
+            content.id, stats.pages, " (cached text)" if stats.extraction_cached else "",
+            diff.total, diff.added, diff.unchanged, len(removed_ids),
+            stats.seconds, stats.pages_per_sec, stats.final_batch_size, stats.peak_rss_mb,
+        )
+        return diff.total, summary
+
+    @staticmethod
+    def _new_chunks(diff: ChunkDiff, terms: ContentTerms, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Chunks still to embed; every chunk, new or unchanged, goes into the BM25 terms."""
+        new_chunks = diff.filter_new(chunks)
+        for chunk in chunks:
+            terms.add(chunk["id"], chunk["text"])
+        return new_chunks
+
+    def _chunk_page(self, content: CourseContent, page_number: int, text: str) -> List[Dict[str, Any]]:
+        """Split one cleaned page into chunks (sentence-based, ~900 chars or model-token sized)."""
+        if settings.CHUNKING_MODE == "tokens":
+            chunks = self.get_token_chunker().split(text)
+        else:
+            chunks = self._split_text_into_chunks(
+                text,
+                chunk_size=900,
+                overlap_sentences=2,
+            )
+        return [
+            {
+                "text": chunk,
+                "metadata": {
+                    "page_number": page_number,
+                    "chunk_index": i,
+                    "content_title": content.title
+                }
+            }
+            for i, chunk in enumerate(chunks)
+        ]
 
     def _clean_extracted_text(self, text: str) -> str:
         """Normalize PDF extracted text for better chunking."""
-        import re
-
-        # Fix hyphenated line breaks (e.g., "inter-\nnational")
-        text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
-        # Normalize newlines and spacing
-        text = text.replace("\r", "\n")
-        text = re.sub(r"\n{3,}", "\n\n", text)
-        text = re.sub(r"[ \t]{2,}", " ", text)
-        # Trim each line and rejoin
-        lines = [line.strip() for line in text.split("\n")]
-        text = "\n".join([line for line in lines if line != ""])
-        return text.strip()
+        return clean_extracted_text(text)
     
-    async def _download_file_from_url(self, url: str) -> bytes:
-        """Download file from URL or load from local path."""
-        try:
-            if not (url.startswith("http://") or url.startswith("https://")):
-                raise ValidationError("Content URL must be an http/https URL")
+    @asynccontextmanager
+    async def _pdf_source(self, content: CourseContent, source_path: Optional[str]) -> AsyncIterator[str]:
+        """The spooled upload when it is still on this host, otherwise a fresh download."""
+        if source_path and os.path.isfile(source_path):
+            yield source_path
+            return
+        if source_path:
+            logger.info("Upload spool for content %s is gone, downloading from storage", content.id)
+        async with self._download_to_spool(content.url) as pdf_path:
+            yield pdf_path
 
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.content
-        except Exception as e:
-            raise ValidationError(f"Failed to download file: {str(e)}")
+    @asynccontextmanager
+    async def _download_to_spool(self, url: str) -> AsyncIterator[str]:
+        """Download file from URL into a size-capped spool file and yield its path."""
+        async with AsyncExitStack() as stack:
+            try:
+                pdf_path = await stack.enter_async_context(download_to_spool(url))
+            except Exception as e:
+                raise ValidationError(f"Failed to download file: {str(e)}")
+            yield pdf_path
     
     def _split_text_into_chunks(
         self,
@@ -202,160 +276,42 @@ class RAGService:
         overlap: int = 2,
         overlap_sentences: Optional[int] = None,
     ) -> List[str]:
-        """Split text into structure-aware semantic chunks."""
-        import re
-
-        # Determine overlap sentences
+        """Split cleaned text into structure-aware semantic chunks."""
         if overlap_sentences is None:
             overlap_sentences = overlap
-
-        # Clean and normalize text first
-        text = self._clean_extracted_text(text)
-        
-        # Split by document structure (headings, paragraphs)
-        chunks = []
-        
-        # Try to detect headings (Markdown-style) - FIXED regex with closing )
-        heading_pattern = r'(?m)^((?:#{1,6}\s+|[A-Z][a-z]*\.\s+|[0-9]+\.\s+).+)$'
-        sections = re.split(heading_pattern, text)
-        
-        if len(sections) > 1:
-            # Document has structure - chunk by sections
-            current_chunk = ""
-            current_length = 0
-            
-            for section in sections:
-                section = section.strip()
-                if not section:
-                    continue
-                    
-                # If adding this section exceeds chunk size, start new chunk
-                if current_length + len(section) + 2 > chunk_size and current_chunk:
-                    chunks.append(current_chunk.strip())
-                    # Start new chunk with overlap from previous
-                    sentences = re.split(r'(?<=[.!?])\s+', current_chunk)
-                    overlap_text = " ".join(sentences[-overlap_sentences:]) if len(sentences) > overlap_sentences else ""
-                    current_chunk = overlap_text + "\n\n" + section
-                    current_length = len(current_chunk)
-                else:
-                    if current_chunk:
-                        current_chunk += "\n\n" + section
-                    else:
-                        current_chunk = section
-                    current_length += len(section) + 2
-            
-            # Add final chunk
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-                
-        else:
-            # No clear structure - fall back to paragraph-based chunking
-            paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
-            
-            if not paragraphs:
-                # Fallback to sentence-based splitting
-                sentences = [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
-                if not sentences:
-                    return []
-
-                current_chunk = ""
-                current_length = 0
-
-                for sentence in sentences:
-                    if current_length + len(sentence) + 1 > chunk_size and current_chunk:
-                        chunks.append(current_chunk.strip())
-                        sentences_list = re.split(r'(?<=[.!?])\s+', current_chunk)
-                        overlap_text = " ".join(sentences_list[-overlap_sentences:]) if len(sentences_list) > overlap_sentences else ""
-                        current_chunk = overlap_text + " " + sentence
-                        current_length = len(current_chunk)
-                    else:
-                        current_chunk += " " + sentence if current_chunk else sentence
-                        current_length += len(sentence) + 1
-
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-            else:
-                # Paragraph-based chunking with better context preservation
-                current_chunk = ""
-                current_length = 0
-                
-                for paragraph in paragraphs:
-                    if current_length + len(paragraph) + 2 > chunk_size and current_chunk:
-                        chunks.append(current_chunk.strip())
-                        # Start new chunk with overlap
-                        sentences = re.split(r'(?<=[.!?])\s+', current_chunk)
-                        overlap_text = " ".join(sentences[-overlap_sentences:]) if len(sentences) > overlap_sentences else ""
-                        current_chunk = overlap_text + "\n\n" + paragraph
-                        current_length = len(current_chunk)
-                    else:
-                        if current_chunk:
-                            current_chunk += "\n\n" + paragraph
-                        else:
-                            current_chunk = paragraph
-                        current_length += len(paragraph) + 2
-
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-
-        # Filter out very short chunks and clean up
-        final_chunks = []
-        for chunk in chunks:
-            chunk = chunk.strip()
-            if len(chunk) > 100:  # Minimum chunk size
-                final_chunks.append(chunk)
-
-        return final_chunks
+        return split_text_into_chunks(text, chunk_size=chunk_size, overlap_sentences=overlap_sentences)
     
-    async def _store_chunks_with_embeddings(self, content_id: int, course_id: int, chunks: List[Dict[str, Any]]) -> None:
-        """Generate embeddings and store chunks in ChromaDB with proper metadata."""
-        try:
-            # Generate embeddings using singleton model
-            model = self.get_embedding_model()
-            texts = [chunk_data["text"] for chunk_data in chunks]
-            
-            # Clear existing content from ChromaDB to avoid duplicates - FIXED deletion
-            try:
-                # First, try to get existing chunks for this content_id
-                existing_results = self.collection.get(
-                    where={"content_id": {"$eq": str(content_id)}}
-                )
+    @staticmethod
+    def _chunk_vector_metadata(content_id: int, course_id: int, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **metadata,
+            "course_id": str(course_id),
+            "content_id": str(content_id),
+        }
 
-                if existing_results and existing_results.get("ids"):
-                    # Delete old chunks for this content_id
-                    self.collection.delete(ids=existing_results["ids"])
-            except:
-                pass  # Collection might not exist yet
-            
-            # Store in ChromaDB in smaller batches to reduce memory
-            batch_size = 8  # Reduced from 16 for 512MB limit
-            for start in range(0, len(chunks), batch_size):
-                end = min(start + batch_size, len(chunks))
-                batch_texts = texts[start:end]
-                batch_embeddings = model.encode(batch_texts, batch_size=8, show_progress_bar=False)  # Match batch_size
-                batch_ids = [f"{content_id}_{i}" for i in range(start, end)]
-                batch_metadatas = [
-                    {
-                        **chunks[i]["metadata"],
-                        "course_id": str(course_id),
-                        "content_id": str(content_id),
-                    }
-                    for i in range(start, end)
-                ]
-
-                self.collection.add(
-                    documents=batch_texts,
-                    embeddings=batch_embeddings.tolist(),
-                    metadatas=batch_metadatas,
-                    ids=batch_ids,
-                )
-                
-                # Log memory usage per batch
-                current_memory = psutil.virtual_memory().available / (1024 * 1024 * 1024)
-            
-            print(f"Stored {len(chunks)} chunks in ChromaDB for content {content_id}")
-            
-        except Exception as e:
-            raise
+    def _embed_texts(self, texts: List[str]):
+        """Encode a batch of chunk texts (pipeline embed stage); cached chunks skip the model."""
+        model = self.get_embedding_model()
+        return encode_with_cache(model, EMBEDDING_MODEL_NAME, texts, batch_size=len(texts))
+
+    def _store_chunk_batch(
+        self,
+        content_id: int,
+        course_id: int,
+        chunks: List[Dict[str, Any]],
+        embeddings,
+    ) -> None:
+        """Upsert one embedded batch into the vector store (pipeline store stage)."""
+        self.vector_store.upsert(
+            course_id,
+            ids=[chunk["id"] for chunk in chunks],
+            documents=[chunk["text"] for chunk in chunks],
+            embeddings=embeddings,
+            metadatas=[
+                self._chunk_vector_metadata(content_id, course_id, chunk["metadata"])
+                for chunk in chunks
+            ],
+        )
     
     def _generate_embedding(self, text: str) -> List[float]:
         """Generate embedding using singleton Sentence Transformers model."""
@@ -388,6 +344,37 @@ class RAGService:
         
         return embedding[:384]
     
+    def _course_index_version(self, course_id: int) -> str:
+        """Fingerprint of a course's index state, shared by every process via vector_indices.
+
+        Changes whenever indexing of any of the course's content starts, finishes
+        or fails, and when content is added or removed.
+        """
+        count, last_updated, chunks, states = (
+            self.db.query(
+                func.count(VectorIndex.id),
+                func.max(VectorIndex.last_updated),
+                func.coalesce(func.sum(VectorIndex.chunk_count), 0),
+                func.coalesce(func.sum(VectorIndex.is_indexed), 0),
+            )
+            .join(CourseContent, CourseContent.id == VectorIndex.content_id)
+            .filter(CourseContent.course_id == course_id)
+            .one()
+        )
+        return f"{count}:{last_updated.isoformat() if last_updated else '-'}:{chunks}:{states}"
+
+    def _check_content_scope(self, course_id: int, content_id: Optional[int]) -> None:
+        """A scoped question must name content of the same course."""
+        if content_id is None:
+            return
+        exists = (
+            self.db.query(CourseContent.id)
+            .filter(CourseContent.id == content_id, CourseContent.course_id == course_id)
+            .first()
+        )
+        if exists is None:
+            raise NotFoundError("Content not found in this course")
+
     def _get_or_create_thread(
         self,
         student_id: int,
@@ -424,6 +411,181 @@ class RAGService:
         self.db.refresh(thread)
         return thread
 
+    GREETING_ANSWER = "Hi! Ask me a specific question from the course materials and I’ll answer it."
+    NO_CONTEXT_ANSWER = "I couldn't find relevant information in your course materials to answer this question. Please try rephrasing or contact your teacher."
+    ERROR_ANSWER = "I'm having trouble processing your question right now. Please try again later."
+
+    @staticmethod
+    def _is_small_talk(question: str) -> bool:
+        normalized = question.strip().lower()
+        return len(normalized.split()) <= 2 or normalized in {"hi", "hello", "hey", "thanks", "thank you"}
+
+    async def _prepare_answer(
+        self, course_id: int, question: str, index_version: str, content_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Cache lookups and retrieval shared by the plain and streaming ask paths.
+
+        Returns a plan with either ``cached`` (a prior answer entry) or the
+        ``relevant_chunks`` and ``context`` to generate one from. Questions
+        scoped to one ``content_id`` bypass the answer caches.
+        """
+        # Repeat questions are answered from cache until the course is re-indexed
+        plan: Dict[str, Any] = {
+            "index_version": index_version,
+            "content_id": content_id,
+            "cached": None,
+            "cache_hit": None,
+            "cache_similarity": None,
+            "question_embedding": None,
+            "relevant_chunks": [],
+            "context": "",
+        }
+        if settings.ANSWER_CACHE_ENABLED and content_id is None:
+            cached = get_answer_cache().get(course_id, plan["index_version"], question)
+            if cached is not None:
+                plan.update(cached=cached, cache_hit="exact", cache_similarity=1.0)
+                return plan
+
+        # Paraphrases of earlier questions reuse their answer too
+        if settings.SEMANTIC_CACHE_ENABLED and content_id is None:
+            plan["question_embedding"] = await self._embed_query(question)
+            match = get_semantic_answer_cache().get(course_id, plan["index_version"], plan["question_embedding"])
+            if match is not None:
+                plan.update(cached=match[0], cache_hit="semantic", cache_similarity=match[1])
+                return plan
+
+        # Retrieve relevant chunks
+        relevant_chunks = await self._retrieve_relevant_chunks(
+            course_id,
+            question,
+            top_k=settings.RAG_MAX_CONTEXT_CHUNKS,
+            question_embedding=plan["question_embedding"],
+            index_version=index_version,
+            content_id=content_id,
+        )
+        plan["relevant_chunks"] = relevant_chunks
+        # Plain context for the LLM
+        plan["context"] = "\n\n---\n\n".join(chunk["text"] for chunk in relevant_chunks)
+        return plan
+
+    @staticmethod
+    def _plan_sources(plan: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], float]:
+        if plan["cached"] is not None:
+            return plan["cached"]["sources"], plan["cached"]["confidence"]
+        chunks = plan["relevant_chunks"]
+        # Simple confidence calculation
+        return [chunk["metadata"] for chunk in chunks], min(len(chunks) / 2.0, 1.0)
+
+    def _remember_answer(self, course_id: int, question: str, plan: Dict[str, Any], answer: str, llm_latency_ms: int) -> None:
+        """Cache a freshly generated LLM answer for exact and paraphrased repeats."""
+        if plan["content_id"] is not None:
+            return  # Scoped answers would shadow course-wide ones
+        sources, confidence = self._plan_sources(plan)
+        entry = {"answer": answer, "sources": sources, "confidence": confidence, "llm_ms": llm_latency_ms}
+        if settings.ANSWER_CACHE_ENABLED:
+            get_answer_cache().put(course_id, plan["index_version"], question, entry)
+        if settings.SEMANTIC_CACHE_ENABLED and plan["question_embedding"] is not None:
+            get_semantic_answer_cache().put(
+                course_id, plan["index_version"], question, plan["question_embedding"], entry
+            )
+
+    def _record_query(
+        self,
+        student_id: int,
+        course_id: int,
+        thread: RagThread,
+        question: str,
+        answer: str,
+        plan: Dict[str, Any],
+        response_time_ms: int,
+        llm_latency_ms: Optional[int] = None,
+        first_token_ms: Optional[int] = None,
+    ) -> StudentQuery:
+        """Store query and response in the student's thread."""
+        sources, confidence = self._plan_sources(plan)
+        cached = plan["cached"]
+        query_record = StudentQuery(
+            student_id=student_id,
+            course_id=course_id,
+            thread_id=thread.id,
+            question=question,
+            answer=answer,
+            context_chunks=sources,
+            confidence_score=confidence,
+            response_time_ms=response_time_ms,
+            first_token_ms=first_token_ms,
+            cache_hit=plan["cache_hit"],
+            cache_similarity=plan["cache_similarity"],
+            llm_latency_ms=llm_latency_ms,
+            saved_llm_ms=cached.get("llm_ms") if cached is not None else None,
+        )
+        self.db.add(query_record)
+        thread.updated_at = func.now()
+        self.db.commit()
+        return query_record
+
+    async def _compute_answer(
+        self, course_id: int, question: str, index_version: str, content_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Plan plus generated answer; the unit of work coalesced across identical questions.
+
+        Must not touch ``self.db``: callers that joined the flight have their own sessions.
+        """
+        plan = await self._prepare_answer(course_id, question, index_version, content_id)
+        outcome: Dict[str, Any] = {"plan": plan, "answer": None, "llm_latency_ms": None}
+        if plan["cached"] is not None:
+            outcome["answer"] = plan["cached"]["answer"]
+        elif plan["relevant_chunks"]:
+            # Generate answer using LLM with plain context
+            llm_started = time.time()
+            answer, generated = await self._generate_answer(question, plan["context"])
+            outcome["answer"] = answer
+            outcome["llm_latency_ms"] = int((time.time() - llm_started) * 1000)
+            logger.info(
+                "Answered for course %s: ~%d context tokens from %d chunks, LLM %d ms",
+                course_id, estimate_tokens(plan["context"]), len(plan["relevant_chunks"]), outcome["llm_latency_ms"],
+            )
+
+            # Only real LLM answers are worth repeating; fallback text is not
+            if generated:
+                self._remember_answer(course_id, question, plan, answer, outcome["llm_latency_ms"])
+        return outcome
+
+    async def _answer_events(
+        self, course_id: int, question: str, index_version: str, content_id: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Streaming counterpart of ``_compute_answer``: ("plan", plan), ("token", text)..., ("llm", ms)."""
+        plan = await self._prepare_answer(course_id, question, index_version, content_id)
+        yield "plan", plan
+        if plan["cached"] is not None:
+            yield "token", plan["cached"]["answer"]
+            return
+        if not plan["relevant_chunks"]:
+            return
+
+        parts: List[str] = []
+        llm_started = time.time()
+        generated = True
+        try:
+            async for text in self._groq_stream(question, plan["context"]):
+                parts.append(text)
+                yield "token", text
+        except Exception as e:
+            logger.warning("Groq stream failed after %d parts: %s", len(parts), e)
+            generated = False
+        if not parts:
+            generated = False
+            parts.append(self._fallback_answer(question, plan["context"]))
+            yield "token", parts[0]
+        llm_latency_ms = int((time.time() - llm_started) * 1000)
+        logger.info(
+            "Streamed for course %s: ~%d context tokens from %d chunks, LLM %d ms",
+            course_id, estimate_tokens(plan["context"]), len(plan["relevant_chunks"]), llm_latency_ms,
+        )
+        if generated:
+            self._remember_answer(course_id, question, plan, "".join(parts), llm_latency_ms)
+        yield "llm", llm_latency_ms
+
     async def answer_student_question(
         self,
         student_id: int,
@@ -431,12 +593,12 @@ class RAGService:
         question: str,
         thread_id: Optional[str] = None,
         thread_title: Optional[str] = None,
+        content_id: Optional[int] = None,
     ) -> Dict[str, Any]:
-        """Answer student question using RAG."""
-        import time
+        """Answer student question using RAG, optionally only from one content item."""
         start_time = time.time()
+        self._check_content_scope(course_id, content_id)
 
-        normalized = question.strip().lower()
         thread = self._get_or_create_thread(
             student_id=student_id,
             course_id=course_id,
@@ -444,9 +606,9 @@ class RAGService:
             thread_title=thread_title,
             seed_question=question,
         )
-        if len(normalized.split()) <= 2 or normalized in {"hi", "hello", "hey", "thanks", "thank you"}:
+        if self._is_small_talk(question):
             return {
-                "answer": "Hi! Ask me a specific question from the course materials and I’ll answer it.",
+                "answer": self.GREETING_ANSWER,
                 "confidence": 0.0,
                 "sources": [],
                 "response_time_ms": int((time.time() - start_time) * 1000),
@@ -454,54 +616,139 @@ class RAGService:
             }
         
         try:
-            # Retrieve relevant chunks
-            relevant_chunks = await self._retrieve_relevant_chunks(course_id, question)
-            
-            if not relevant_chunks:
+            # Identical questions in flight share one retrieval + generation
+            index_version = self._course_index_version(course_id)
+            outcome = await get_single_flight().do(
+                ("answer", course_id, content_id, normalize_question(question), index_version),
+                lambda: self._compute_answer(course_id, question, index_version, content_id),
+            )
+            plan = outcome["plan"]
+
+            if outcome["answer"] is None:
                 return {
-                    "answer": "I couldn't find relevant information in your course materials to answer this question. Please try rephrasing or contact your teacher.",
+                    "answer": self.NO_CONTEXT_ANSWER,
                     "confidence": 0.0,
                     "sources": []
                 }
             
-            # Generate answer using LLM with plain context
-            context_blocks = [chunk["text"] for chunk in relevant_chunks]
-            context = "\n\n---\n\n".join(context_blocks)
-            answer = await self._generate_answer(question, context)
-            
             # Calculate response time
             response_time = int((time.time() - start_time) * 1000)
-            
-            # Store query and response
-            query_record = StudentQuery(
-                student_id=student_id,
-                course_id=course_id,
-                thread_id=thread.id,
-                question=question,
-                answer=answer,
-                context_chunks=[chunk["metadata"] for chunk in relevant_chunks],
-                confidence_score=min(len(relevant_chunks) / 2.0, 1.0),  # Simple confidence calculation
-                response_time_ms=response_time
+            # Every student gets their own record, even when the answer was shared
+            query_record = self._record_query(
+                student_id,
+                course_id,
+                thread,
+                question,
+                outcome["answer"],
+                plan,
+                response_time,
+                llm_latency_ms=outcome["llm_latency_ms"],
             )
-            self.db.add(query_record)
-            thread.updated_at = func.now()
-            self.db.commit()
             
             return {
-                "answer": answer,
+                "answer": outcome["answer"],
                 "confidence": query_record.confidence_score,
-                "sources": [chunk["metadata"] for chunk in relevant_chunks],
+                "sources": query_record.context_chunks,
                 "response_time_ms": response_time,
                 "thread_id": thread.id,
+                "cache_hit": plan["cache_hit"],
             }
             
         except Exception as e:
             return {
-                "answer": "I'm having trouble processing your question right now. Please try again later.",
+                "answer": self.ERROR_ANSWER,
                 "confidence": 0.0,
                 "sources": []
             }
 
+    async def stream_student_answer(
+        self,
+        student_id: int,
+        course_id: int,
+        question: str,
+        thread_id: Optional[str] = None,
+        thread_title: Optional[str] = None,
+        content_id: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Answer student question as a stream of (event, data) pairs.
+
+        Emits ``meta`` (thread_id, sources) first, then ``token`` events as the
+        LLM produces text, then ``done`` with timings once the StudentQuery is
+        stored. Time to first token is what the student actually waits for.
+        """
+        start_time = time.time()
+        self._check_content_scope(course_id, content_id)
+        thread = self._get_or_create_thread(
+            student_id=student_id,
+            course_id=course_id,
+            thread_id=thread_id,
+            thread_title=thread_title,
+            seed_question=question,
+        )
+
+        def elapsed_ms() -> int:
+            return int((time.time() - start_time) * 1000)
+
+        if self._is_small_talk(question):
+            yield "meta", {"thread_id": thread.id, "sources": [], "confidence": 0.0, "cache_hit": None}
+            yield "token", {"text": self.GREETING_ANSWER}
+            yield "done", {"response_time_ms": elapsed_ms(), "first_token_ms": None}
+            return
+
+        plan = None
+        parts: List[str] = []
+        first_token_ms = None
+        llm_latency_ms = None
+        try:
+            # Identical questions in flight share one retrieval + token stream
+            index_version = self._course_index_version(course_id)
+            events = get_single_flight().stream(
+                ("stream", course_id, content_id, normalize_question(question), index_version),
+                lambda: self._answer_events(course_id, question, index_version, content_id),
+            )
+            async for kind, value in events:
+                if kind == "plan":
+                    plan = value
+                    sources, confidence = self._plan_sources(plan)
+                    yield "meta", {"thread_id": thread.id, "sources": sources, "confidence": confidence, "cache_hit": plan["cache_hit"]}
+                elif kind == "token":
+                    if first_token_ms is None:
+                        first_token_ms = elapsed_ms()
+                    parts.append(value)
+                    yield "token", {"text": value}
+                elif kind == "llm":
+                    llm_latency_ms = value
+        except Exception:
+            if plan is None:
+                yield "meta", {"thread_id": thread.id, "sources": [], "confidence": 0.0, "cache_hit": None}
+            if not parts:
+                yield "token", {"text": self.ERROR_ANSWER}
+                yield "done", {"response_time_ms": elapsed_ms(), "first_token_ms": None}
+                return
+
+        if not parts:
+            yield "token", {"text": self.NO_CONTEXT_ANSWER}
+            yield "done", {"response_time_ms": elapsed_ms(), "first_token_ms": None}
+            return
+
+        response_time = elapsed_ms()
+        self._record_query(
+            student_id,
+            course_id,
+            thread,
+            question,
+            "".join(parts),
+            plan,
+            response_time,
+            llm_latency_ms=llm_latency_ms,
+            first_token_ms=first_token_ms,
+        )
+        logger.info(
+            "Streamed answer for course %s: first token %s ms, total %d ms (cache: %s)",
+            course_id, first_token_ms, response_time, plan["cache_hit"] or "miss",
+        )
+        yield "done", {"response_time_ms": response_time, "first_token_ms": first_token_ms}
+
     def list_threads(self, student_id: int, course_id: Optional[int] = None) -> List[Dict[str, Any]]:
         query = self.db.query(RagThread).filter(RagThread.student_id == student_id)
         if course_id:
@@ -556,60 +803,149 @@ class RAGService:
             for q in queries
         ]
     
-    async def _retrieve_relevant_chunks(self, course_id: int, question: str, top_k: int = 8) -> List[Dict[str, Any]]:
-        """Retrieve most relevant chunks using ChromaDB vector search."""
+    async def _retrieve_relevant_chunks(
+        self,
+        course_id: int,
+        question: str,
+        top_k: int = 8,
+        question_embedding: Any = None,
+        index_version: Optional[str] = None,
+        content_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Retrieve most relevant chunks using hybrid vector + BM25 search.
+
+        With ``content_id`` only that document is searched; otherwise large
+        courses (``index_version`` given) search only the documents whose
+        summaries best match the question.
+        """
         try:
-            # Generate question embedding using singleton model
-            model = self.get_embedding_model()
-            question_embedding = model.encode(question)
+            if question_embedding is None:
+                question_embedding = await self._embed_query(question)
             
             try:
-                results = self.collection.query(
-                    query_embeddings=question_embedding.tolist(),
-                    n_results=top_k * 2,  # Get more results for filtering
-                    where={"course_id": {"$eq": str(course_id)}}  # Proper ChromaDB syntax for exact match
+                hits, fused, keyword_ids = await asyncio.to_thread(
+                    self._hybrid_search,
+                    course_id,
+                    question,
+                    question_embedding,
+                    top_k * 2,  # Get more results for filtering
+                    index_version,
+                    content_id,
                 )
-                
-                # Convert ChromaDB results to our format - FIXED PARSING with better error handling
-                scored_chunks = []
-                if (results and 
-                    isinstance(results, dict) and 
-                    'documents' in results and 
-                    'metadatas' in results and 
-                    'distances' in results and
-                    results['documents'] and 
-                    results['metadatas'][0] and 
-                    results['distances'][0]):
-                    
-                    for i in range(len(results['documents'][0])):
-                        similarity = 1 - results['distances'][0][i]  # Convert distance to similarity
-                        document = results['documents'][0][i]
-                        metadata = results['metadatas'][0][i] if results['metadatas'][0] else {}
-                        
-                        scored_chunks.append({
-                            "chunk": {
-                                "chunk_text": document,
-                                "chunk_metadata": metadata
-                            },
-                            "similarity": similarity,
-                            "text": document,
-                            "metadata": metadata
-                        })
-                else:
-                    pass
-                    
             except Exception as e:
                 return []
             
-            # Sort by similarity and return top_k
-            scored_chunks.sort(key=lambda x: x["similarity"], reverse=True)
-            final_chunks = scored_chunks[:top_k]
+            scored_chunks = [
+                {
+                    "chunk": {
+                        "chunk_text": hit.text,
+                        "chunk_metadata": hit.metadata
+                    },
+                    "similarity": hit.similarity,
+                    "text": hit.text,
+                    "metadata": hit.metadata
+                }
+                for hit in hits
+            ]
             
-            return final_chunks
+            # Diverse, relevant chunks within the prompt token budget
+            started = time.perf_counter()
+            embeddings = None
+            if hits and all(hit.embedding is not None for hit in hits):
+                embeddings = np.stack([hit.embedding for hit in hits])
+            top_fused = max(fused, default=0.0) or 1.0
+            selection = select_context(
+                scored_chunks,
+                embeddings,
+                relevance=[score / top_fused for score in fused],
+                keyword_matches=[hit.id in keyword_ids for hit in hits],
+                max_chunks=top_k,
+            )
+            logger.info(
+                "Context for course %s: %d -> %d chunks, ~%d -> ~%d prompt tokens "
+                "(%d near-duplicates, %d below similarity floor) in %.2f ms",
+                course_id, min(len(scored_chunks), top_k), len(selection.chunks),
+                selection.candidate_tokens, selection.selected_tokens,
+                selection.dropped_duplicates, selection.dropped_low_similarity,
+                (time.perf_counter() - started) * 1000,
+            )
+            return selection.chunks
             
+        except EmbeddingOverloadedError:
+            raise  # Surface as "try again later" rather than "nothing relevant"
         except Exception as e:
             return []
     
+    def _hybrid_search(
+        self,
+        course_id: int,
+        question: str,
+        question_embedding: Any,
+        limit: int,
+        index_version: Optional[str] = None,
+        content_id: Optional[int] = None,
+    ) -> Tuple[List[Any], List[float], set]:
+        """Vector hits fused with BM25 hits by reciprocal rank, best first.
+
+        Returns the hits, their fused scores and the ids BM25 matched.
+        Chunks only BM25 found are fetched from the vector store so they carry
+        text, similarity and vectors like the rest.
+        """
+        content_ids = None
+        if content_id is not None:
+            content_ids = [content_id]
+        elif index_version is not None and self.vector_store.scoped_scan:
+            # Skipped where the scope would not shrink the scan (Chroma): it would only cost recall
+            content_ids = get_document_summaries().pick(course_id, index_version, question_embedding)
+        hits = self.vector_store.query(
+            course_id, question_embedding, limit, True, content_ids  # Chunk vectors for MMR
+        )
+        hits.sort(key=lambda hit: hit.similarity, reverse=True)
+        if not settings.LEXICAL_INDEX_ENABLED:
+            return hits, [hit.similarity for hit in hits], set()
+
+        started = time.perf_counter()
+        lexical = get_lexical_index().search(course_id, question, limit, content_ids)
+        lexical_ms = (time.perf_counter() - started) * 1000
+        by_id = {hit.id: hit for hit in hits}
+        missing = [chunk_id for chunk_id, _ in lexical if chunk_id not in by_id]
+        for hit in self.vector_store.fetch(course_id, missing, question_embedding):
+            by_id[hit.id] = hit
+
+        fused = reciprocal_rank_fusion([[hit.id for hit in hits], [chunk_id for chunk_id, _ in lexical]])
+        ranked = sorted((chunk_id for chunk_id in fused if chunk_id in by_id), key=fused.get, reverse=True)
+        logger.info(
+            "Hybrid search for course %s in %s documents: %d vector, %d BM25 (%d BM25-only) hits; BM25 %.3f ms",
+            course_id, "all" if content_ids is None else len(content_ids),
+            len(hits), len(lexical), len(missing), lexical_ms,
+        )
+        keyword_ids = {chunk_id for chunk_id, _ in lexical}
+        return [by_id[chunk_id] for chunk_id in ranked], [fused[chunk_id] for chunk_id in ranked], keyword_ids
+
+    async def _embed_query(self, question: str):
+        """Encode a question on the embedding executor, keeping the event loop free."""
+        cache = get_query_embedding_cache()
+        key = normalize_question(question)
+        embedding = cache.get(key)
+        if embedding is not None:
+            return embedding
+        if settings.QUERY_BATCHING_ENABLED:
+            embedding = await get_query_batcher(self._encode_queries).embed(question)
+        else:
+            embedding = await get_embedding_executor().run(self._encode_query, question)
+        cache.put(key, embedding)
+        return embedding
+
+    @classmethod
+    def _encode_query(cls, question: str):
+        # Runs on the executor thread, so the first-use model load is off the loop too
+        return cls.get_embedding_model().encode(question)
+
+    @classmethod
+    def _encode_queries(cls, questions: List[str]):
+        """One batched encode for concurrently asked questions (query batcher)."""
+        return cls.get_embedding_model().encode(questions, batch_size=len(questions))
+
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors."""
         try:
@@ -627,18 +963,19 @@ class RAGService:
         except Exception as e:
             return 0.0
     
-    async def _generate_answer(self, question: str, context: str) -> str:
-        """Generate answer using Groq."""
+    async def _generate_answer(self, question: str, context: str) -> Tuple[str, bool]:
+        """Generate answer using Groq; the flag is False when the fallback text was used."""
         try:
-            return await self._groq_generate(question, context)
+            answer = await self._groq_generate(question, context)
         except Exception as e:
-            return self._fallback_answer(question, context)
+            answer = None
+        if answer is None:
+            return self._fallback_answer(question, context), False
+        return answer, True
     
-    async def _groq_generate(self, question: str, context: str) -> str:
-        """Generate answer using Groq with improved prompt."""
-        if not settings.GROQ_API_KEY:
-            return self._fallback_answer(question, context)
-        
+    @staticmethod
+    def _groq_request(question: str, context: str) -> Dict[str, Any]:
+        """Chat completion body for a tutoring answer."""
         prompt = f"""You are an expert AI tutor helping students learn from course materials.
 
 CONTEXT from course materials:
@@ -656,33 +993,40 @@ INSTRUCTIONS:
 
 Answer:"""
 
-        try:
-            async with httpx.AsyncClient(timeout=60) as client:
-                response = await client.post(
-                    "https://api.groq.com/openai/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {settings.GROQ_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "llama-3.1-8b-instant",
-                        "messages": [
-                            {"role": "system", "content": "You are an expert AI tutor that answers questions based only on provided course materials."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "max_tokens": 500,
-                        "temperature": 0.2  # Lower for more factual answers
-                    }
-                )
+        return {
+            "model": "llama-3.1-8b-instant",
+            "messages": [
+                {"role": "system", "content": "You are an expert AI tutor that answers questions based only on provided course materials."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 500,
+            "temperature": 0.2  # Lower for more factual answers
+        }
 
-            if response.status_code == 200:
-                answer = response.json()["choices"][0]["message"]["content"]
-                return answer
-            else:
-                return self._fallback_answer(question, context)
-                
+    async def _groq_generate(self, question: str, context: str) -> Optional[str]:
+        """Generate answer using Groq with improved prompt; None when Groq is unavailable."""
+        if not settings.GROQ_API_KEY:
+            return None
+
+        try:
+            body = await get_groq_client().complete(self._groq_request(question, context))
+            return body["choices"][0]["message"]["content"]
+        except CircuitOpenError:
+            return None
         except Exception as e:
-            return self._fallback_answer(question, context)
+            logger.warning("Groq generation failed, using fallback answer: %s", e)
+            return None
+
+    async def _groq_stream(self, question: str, context: str) -> AsyncIterator[str]:
+        """Relay Groq's streamed completion as text deltas; yields nothing when Groq is unavailable."""
+        if not settings.GROQ_API_KEY:
+            return
+
+        try:
+            async for delta in get_groq_client().stream(self._groq_request(question, context)):
+                yield delta
+        except CircuitOpenError:
+            return
 
     def _fallback_answer(self, question: str, context: str) -> str:
         """Fallback answer when AI services are unavailable."""
@@ -0,0 +1,134 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+When dozens of students ask the same question within a second, only the
+first caller (the leader) runs retrieval and generation. Everyone else with
+the same key joins that flight and receives the same result.
+
+- ``SingleFlight.do`` shares the result of a coroutine.
+- ``SingleFlight.stream`` shares the items of an async generator. A caller
+  that joins late first replays what has already been produced, then
+  follows live.
+
+The shared work runs as its own task, so a leader that disconnects does not
+cancel it for the callers that joined.
+"""
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Broadcast:
+    """Buffer of items produced by one async generator, readable by many."""
+
+    def __init__(self, on_done: Callable[["_Broadcast"], None]):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._on_done = on_done
+        self._changed = asyncio.Condition()
+        self.task: Optional[asyncio.Future] = None
+
+    async def pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for item in source:
+                async with self._changed:
+                    self.items.append(item)
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            # Stop accepting joiners before readers see the end
+            self._on_done(self)
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.items) > position or self.done)
+                available = self.items[position:]
+                finished = self.done
+            for item in available:
+                yield item
+            position += len(available)
+            if finished and position >= len(self.items):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key (per event loop)."""
+
+    def __init__(self):
+        self._flights: Dict[Tuple[int, Hashable], Any] = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.joined = 0
+
+    def _slot(self, key: Hashable) -> Tuple[int, Hashable]:
+        return id(asyncio.get_running_loop()), key
+
+    def _track(self, slot: Tuple[int, Hashable], factory: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            flight = self._flights.get(slot)
+            if flight is not None:
+                self.joined += 1
+                return flight, False
+            flight = factory()
+            self._flights[slot] = flight
+            self.started += 1
+            return flight, True
+
+    def _forget(self, slot: Tuple[int, Hashable], flight: Any) -> None:
+        with self._lock:
+            if self._flights.get(slot) is flight:
+                del self._flights[slot]
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``work()``, shared with every concurrent caller using ``key``."""
+        slot = self._slot(key)
+        task, _ = self._track(slot, lambda: asyncio.ensure_future(work()))
+        task.add_done_callback(lambda _: self._forget(slot, task))
+        # Shield: one caller going away must not cancel the others' answer
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Hashable, work: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Items of ``work()``, shared with every concurrent caller using ``key``."""
+        slot = self._slot(key)
+
+        def start() -> _Broadcast:
+            broadcast = _Broadcast(on_done=lambda done: self._forget(slot, done))
+            broadcast.task = asyncio.ensure_future(broadcast.pump(work()))  # Keep a reference
+            return broadcast
+
+        broadcast, _ = self._track(slot, start)
+        async for item in broadcast.subscribe():
+            yield item
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.started + self.joined
+            return {
+                "in_flight": len(self._flights),
+                "started": self.started,
+                "joined": self.joined,
+                "coalesced_rate": round(self.joined / total, 4) if total else 0.0,
+            }
+
+
+_SINGLE_FLIGHT: Optional[SingleFlight] = None
+_SINGLE_FLIGHT_LOCK = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide coalescer for RAG answers."""
+    global _SINGLE_FLIGHT
+    if _SINGLE_FLIGHT is None:
+        with _SINGLE_FLIGHT_LOCK:
+            if _SINGLE_FLIGHT is None:
+                _SINGLE_FLIGHT = SingleFlight()
+    return _SINGLE_FLIGHT
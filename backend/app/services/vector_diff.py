@@ -0,0 +1,60 @@
+"""
+Content-derived chunk ids and re-index diffing.
+
+Chunk ids are derived from the chunk text rather than its position, so an
+edit to one paragraph leaves every other id untouched. ``ChunkDiff`` compares
+the chunks produced by a re-index with what is already stored and reports
+which ones must be embedded and upserted, which are unchanged, and which must
+be deleted.
+"""
+import hashlib
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+
+def stable_chunk_id(content_id: int, text: str, occurrence: int = 0) -> str:
+    """Id for the ``occurrence``-th chunk of a document with exactly this text."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+    return f"{content_id}_{digest}_{occurrence}"
+
+
+class ChunkDiff:
+    """Tracks one re-index of a document against its currently stored chunk ids."""
+
+    def __init__(self, content_id: int, existing: Dict[str, Dict[str, Any]]):
+        self.content_id = content_id
+        self.existing = existing  # chunk id -> stored metadata
+        self.seen: Dict[str, None] = {}
+        self.added = 0
+        self.metadata_updates: List[Tuple[str, Dict[str, Any]]] = []
+        self._occurrences: Counter = Counter()
+
+    def filter_new(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Assign ids to ``chunks`` and return only those not already stored."""
+        new_chunks = []
+        for chunk in chunks:
+            text = chunk["text"]
+            chunk_id = stable_chunk_id(self.content_id, text, self._occurrences[text])
+            self._occurrences[text] += 1
+            chunk["id"] = chunk_id
+            self.seen[chunk_id] = None
+
+            stored_metadata = self.existing.get(chunk_id)
+            if stored_metadata is None:
+                self.added += 1
+                new_chunks.append(chunk)
+            elif any(stored_metadata.get(key) != value for key, value in chunk["metadata"].items()):
+                # Same text, moved page or renamed document: refresh metadata only
+                self.metadata_updates.append((chunk_id, chunk["metadata"]))
+        return new_chunks
+
+    @property
+    def total(self) -> int:
+        return len(self.seen)
+
+    @property
+    def unchanged(self) -> int:
+        return self.total - self.added
+
+    def removed_ids(self) -> List[str]:
+        return [chunk_id for chunk_id in self.existing if chunk_id not in self.seen]
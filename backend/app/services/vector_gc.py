@@ -0,0 +1,150 @@
+"""
+Garbage collection of chunks whose content item or course was deleted.
+
+Deleting ``CourseContent`` / ``Course`` rows leaves their chunks in the vector
+store and the BM25 index, where they bloat the index and can still be
+retrieved. Two mechanisms remove them:
+
+- Deletion hooks: the API schedules ``purge_content_vectors`` /
+  ``purge_course_vectors`` once the rows are gone, either inline
+  (``VECTOR_DELETE_MODE=sync``) or after the response is sent (``background``).
+- ``reconcile``: run by the indexing worker every
+  ``VECTOR_RECONCILE_INTERVAL_HOURS`` and on demand with
+  ``python -m app.worker --reconcile``. It diffs what the stores hold against
+  ``course_contents`` and ``vector_indices``, purges every content item without
+  both rows, compacts the store and reports what was reclaimed. This catches
+  hooks lost to a crash and chunks an in-flight indexing job wrote after its
+  content was deleted.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from fastapi import BackgroundTasks
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.models.course import Course, CourseContent
+from app.models.rag import VectorIndex
+from app.services.lexical_index import get_lexical_index
+from app.services.vector_store import VectorStore, get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+def purge_content_vectors(course_id: int, content_id: int) -> None:
+    """Delete a content item's chunks from the vector store and the BM25 index."""
+    get_vector_store().delete_content(course_id, content_id)
+    get_lexical_index().delete_content(course_id, content_id)
+
+
+def purge_course_vectors(course_id: int) -> None:
+    """Delete every chunk of a course from the vector store and the BM25 index."""
+    get_vector_store().delete_course(course_id)
+    get_lexical_index().delete_course(course_id)
+
+
+def _run_purge(purge: Callable[..., None], *args: int) -> None:
+    try:
+        purge(*args)
+    except Exception:
+        logger.exception("%s%s failed; the next reconciliation removes the chunks", purge.__name__, args)
+
+
+async def schedule_purge(background_tasks: BackgroundTasks, purge: Callable[..., None], *args: int) -> None:
+    """Run a deletion hook now or once the response is sent, per ``VECTOR_DELETE_MODE``."""
+    if settings.VECTOR_DELETE_MODE == "sync":
+        await run_in_threadpool(_run_purge, purge, *args)
+    else:
+        background_tasks.add_task(_run_purge, purge, *args)
+
+
+@dataclass
+class ReconcileReport:
+    dry_run: bool = False
+    courses_scanned: int = 0
+    contents_scanned: int = 0
+    orphan_courses: List[int] = field(default_factory=list)
+    orphan_contents: List[Tuple[int, int]] = field(default_factory=list)  # (course id, content id)
+    chunks_removed: int = 0
+    bytes_before: Optional[int] = None
+    bytes_after: Optional[int] = None
+    seconds: float = 0.0
+
+    @property
+    def bytes_reclaimed(self) -> Optional[int]:
+        if self.bytes_before is None or self.bytes_after is None:
+            return None
+        return self.bytes_before - self.bytes_after
+
+    def summary(self) -> str:
+        verb = "would remove" if self.dry_run else "removed"
+        text = (
+            f"Vector reconciliation: scanned {self.courses_scanned} courses / {self.contents_scanned} content items, "
+            f"{verb} {self.chunks_removed} chunks of {len(self.orphan_contents)} deleted content items "
+            f"and {len(self.orphan_courses)} deleted courses in {self.seconds:.1f}s"
+        )
+        if self.bytes_reclaimed is not None:
+            text += f", reclaimed {self.bytes_reclaimed / (1024 * 1024):.2f} MB"
+        return text
+
+
+def _storage_bytes(store: VectorStore, lexical) -> Optional[int]:
+    stored = store.storage_bytes()
+    return None if stored is None else stored + lexical.storage_bytes()
+
+
+def _live_contents(db: Session) -> Tuple[Set[int], Dict[int, Set[int]]]:
+    """Existing course ids, and per course the content ids that have a ``vector_indices`` row."""
+    courses = {course_id for (course_id,) in db.query(Course.id)}
+    contents: Dict[int, Set[int]] = {}
+    rows = db.query(CourseContent.course_id, CourseContent.id).join(
+        VectorIndex, VectorIndex.content_id == CourseContent.id
+    )
+    for course_id, content_id in rows:
+        contents.setdefault(course_id, set()).add(content_id)
+    return courses, contents
+
+
+def reconcile(db: Session, dry_run: bool = False) -> ReconcileReport:
+    """Purge chunks without a live content row, compact the store and report."""
+    started = time.perf_counter()
+    store = get_vector_store()
+    lexical = get_lexical_index()
+    report = ReconcileReport(dry_run=dry_run, bytes_before=_storage_bytes(store, lexical))
+
+    # Stores are listed before the tables are read: every chunk seen was written
+    # for a row that already existed, so content being indexed right now is never
+    # mistaken for an orphan
+    stored = store.inventory()
+    for course_id, content_ids in lexical.inventory().items():
+        contents = stored.setdefault(course_id, {})
+        for content_id in content_ids:
+            contents.setdefault(content_id, 0)
+    db.rollback()  # Fresh snapshot
+    live_courses, live_contents = _live_contents(db)
+
+    report.courses_scanned = len(stored)
+    for course_id, contents in sorted(stored.items()):
+        report.contents_scanned += len(contents)
+        if course_id not in live_courses:
+            report.orphan_courses.append(course_id)
+            report.chunks_removed += sum(contents.values())
+            if not dry_run:
+                purge_course_vectors(course_id)
+            continue
+        live = live_contents.get(course_id, set())
+        for content_id, count in sorted(contents.items()):
+            if content_id in live:
+                continue
+            report.orphan_contents.append((course_id, content_id))
+            report.chunks_removed += count
+            if not dry_run:
+                purge_content_vectors(course_id, content_id)
+
+    if not dry_run:
+        store.compact()
+        report.bytes_after = _storage_bytes(store, lexical)
+    report.seconds = time.perf_counter() - started
+    logger.info(report.summary())
+    return report
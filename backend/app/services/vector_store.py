@@ -0,0 +1,873 @@
+"""
+Vector storage backends for RAG chunks.
+
+``RAGService`` talks to a ``VectorStore`` rather than to ChromaDB directly.
+Three implementations are available, selected with ``VECTOR_STORE_BACKEND``:
+
+- ``chroma``: ChromaDB collections laid out per ``CHROMA_SHARDING``. Metadata
+  filters are applied while walking the HNSW graph, so scoping a query to a
+  few documents does not make it cheaper (``scoped_scan`` is False).
+- ``numpy``: one float32 matrix per course in a memory-mapped ``.npy`` file
+  plus a JSON sidecar of ids, texts and metadata, searched exactly with a
+  single matmul and ``argpartition``. For the few thousand chunks a typical
+  course holds this is faster and lighter than an HNSW graph
+  (see benchmarks/bench_vector_store.py for the crossover point).
+- ``pgvector``: ``document_chunks`` in PostgreSQL is the system of record;
+  batches are bulk-loaded with COPY and searched through the HNSW cosine
+  index, so vectors share backups and transactions with the rest of the data.
+
+Similarities are cosine similarities; embeddings from all-MiniLM-L6-v2 are
+unit-normalized by the model.
+"""
+import csv
+import fcntl
+import io
+import json
+import os
+import re
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+
+INVENTORY_PAGE_SIZE = 5000
+COURSE_DIR = re.compile(r"course_(\d+)$")
+# Chunk count per content id, per course id
+Inventory = Dict[int, Dict[int, int]]
+
+
+def directory_bytes(path: str) -> int:
+    """Total size of the regular files under ``path``."""
+    total = 0
+    for directory, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+    return total
+
+
+@dataclass
+class VectorHit:
+    id: str
+    text: str
+    metadata: Dict[str, Any]
+    similarity: float
+    embedding: Optional[np.ndarray] = None  # Only with include_embeddings=True
+
+
+class VectorStore(ABC):
+    """Per-course storage of chunk embeddings, texts and metadata."""
+
+    # Whether ``query(content_ids=...)`` only scans those documents' vectors,
+    # rather than searching the whole course and filtering the results
+    scoped_scan = True
+
+    @abstractmethod
+    def upsert(
+        self,
+        course_id: int,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        embeddings: Any,
+        metadatas: Sequence[Dict[str, Any]],
+    ) -> None:
+        ...
+
+    @abstractmethod
+    def update_metadata(self, course_id: int, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, course_id: int, ids: Sequence[str]) -> None:
+        ...
+
+    @abstractmethod
+    def delete_content(self, course_id: int, content_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def get_content_metadata(self, course_id: int, content_id: int) -> Dict[str, Dict[str, Any]]:
+        """Map of chunk id -> metadata for every stored chunk of a content item."""
+
+    @abstractmethod
+    def query(
+        self,
+        course_id: int,
+        embedding: Any,
+        top_k: int,
+        include_embeddings: bool = False,
+        content_ids: Optional[Sequence[int]] = None,
+    ) -> List[VectorHit]:
+        """Most similar chunks of a course, best first; only within ``content_ids`` when given."""
+
+    @abstractmethod
+    def fetch(self, course_id: int, ids: Sequence[str], embedding: Any = None) -> List[VectorHit]:
+        """Stored chunks by id with their vectors; unknown ids are skipped.
+
+        Similarity is against ``embedding`` when given, else 0.
+        """
+
+    @abstractmethod
+    def delete_course(self, course_id: int) -> None:
+        """Remove every stored chunk of a course."""
+
+    @abstractmethod
+    def inventory(self) -> Inventory:
+        """Stored chunk counts per course and content item, across the whole store."""
+
+    def flush(self, course_id: int) -> None:
+        """Persist buffered writes for a course. No-op for stores that write through."""
+
+    def discard(self, course_id: int, content_id: int) -> None:
+        """Drop a content item's buffered, not yet flushed writes (failed indexing run).
+
+        No-op for stores that write through.
+        """
+
+    def compact(self) -> None:
+        """Reclaim space left behind by deletions. No-op where the backend does this itself."""
+
+    def storage_bytes(self) -> Optional[int]:
+        """Space the store takes, or None when it cannot be measured."""
+        return None
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB collections, sharded per ``CHROMA_SHARDING``."""
+
+    # A content_id $in filter still walks the course's whole HNSW graph
+    scoped_scan = False
+
+    @staticmethod
+    def _collection(course_id: int):
+        from app.core.chroma import get_course_collection
+
+        return get_course_collection(course_id)
+
+    @staticmethod
+    def _content_filter(content_id: int) -> Dict[str, Any]:
+        return {"content_id": {"$eq": str(content_id)}}
+
+    def upsert(self, course_id, ids, documents, embeddings, metadatas) -> None:
+        self._collection(course_id).upsert(
+            ids=list(ids),
+            documents=list(documents),
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            metadatas=list(metadatas),
+        )
+
+    def update_metadata(self, course_id, ids, metadatas) -> None:
+        self._collection(course_id).update(ids=list(ids), metadatas=list(metadatas))
+
+    def delete(self, course_id, ids) -> None:
+        if ids:
+            self._collection(course_id).delete(ids=list(ids))
+
+    def delete_content(self, course_id, content_id) -> None:
+        self._collection(course_id).delete(where=self._content_filter(content_id))
+
+    def delete_course(self, course_id) -> None:
+        from app.core.chroma import collection_name_for_course, course_filter, forget_collection, get_chroma_client
+
+        if settings.CHROMA_SHARDING != "course":
+            self._collection(course_id).delete(where=course_filter(course_id))
+            return
+        # A course's own collection is dropped whole, HNSW files included; opening
+        # it first moves any of its vectors left in the legacy collection into it
+        self._collection(course_id)
+        name = collection_name_for_course(course_id)
+        try:
+            get_chroma_client().delete_collection(name)
+        except ValueError:
+            pass  # Never created
+        forget_collection(name)
+
+    @staticmethod
+    def _layout_collections() -> List[Tuple[str, Optional[int]]]:
+        """(name, course id) of the existing collections of the current layout; course id None when shared."""
+        from app.core.chroma import collection_name_for_course, get_chroma_client
+
+        names = [getattr(collection, "name", collection) for collection in get_chroma_client().list_collections()]
+        if settings.CHROMA_SHARDING == "course":
+            prefix = f"{settings.CHROMA_COLLECTION}_course_"
+            return [
+                (name, int(name[len(prefix):]))
+                for name in names
+                if name.startswith(prefix) and name[len(prefix):].isdigit()
+            ]
+        if settings.CHROMA_SHARDING == "hash":
+            shards = {collection_name_for_course(shard) for shard in range(settings.CHROMA_HASH_SHARDS)}
+        else:
+            shards = {settings.CHROMA_COLLECTION}
+        return [(name, None) for name in names if name in shards]
+
+    def inventory(self) -> Inventory:
+        from app.core.chroma import get_collection
+
+        stored: Inventory = {}
+        for name, course_id in self._layout_collections():
+            if course_id is not None:
+                stored.setdefault(course_id, {})
+            collection = get_collection(name)
+            offset = 0
+            while True:
+                page = collection.get(include=["metadatas"], limit=INVENTORY_PAGE_SIZE, offset=offset)
+                metadatas = page.get("metadatas") or []
+                for metadata in metadatas:
+                    metadata = metadata or {}
+                    if "content_id" not in metadata:
+                        continue
+                    course = int(metadata.get("course_id", course_id if course_id is not None else -1))
+                    contents = stored.setdefault(course, {})
+                    content_id = int(metadata["content_id"])
+                    contents[content_id] = contents.get(content_id, 0) + 1
+                if len(metadatas) < INVENTORY_PAGE_SIZE:
+                    break
+                offset += len(metadatas)
+        return stored
+
+    def storage_bytes(self) -> Optional[int]:
+        return directory_bytes(settings.CHROMA_PATH)
+
+    def get_content_metadata(self, course_id, content_id) -> Dict[str, Dict[str, Any]]:
+        results = self._collection(course_id).get(
+            where=self._content_filter(content_id),
+            include=["metadatas"],
+        )
+        ids = results.get("ids") or []
+        metadatas = results.get("metadatas") or [{}] * len(ids)
+        return {chunk_id: metadata or {} for chunk_id, metadata in zip(ids, metadatas)}
+
+    def query(self, course_id, embedding, top_k, include_embeddings=False, content_ids=None) -> List[VectorHit]:
+        from app.core.chroma import course_filter
+
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
+        filters = [course_filter(course_id)]  # Only needed when courses share a collection
+        if content_ids is not None:
+            filters.append({"content_id": {"$in": [str(content_id) for content_id in content_ids]}})
+        filters = [condition for condition in filters if condition]
+        results = self._collection(course_id).query(
+            query_embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
+            n_results=top_k,
+            where=filters[0] if len(filters) == 1 else ({"$and": filters} if filters else None),
+            include=include,
+        )
+        if not results or not results.get("ids") or not results["ids"][0]:
+            return []
+
+        hits = []
+        for i, chunk_id in enumerate(results["ids"][0]):
+            # Collections use squared L2; for unit vectors cosine = 1 - d / 2
+            distance = results["distances"][0][i]
+            hits.append(
+                VectorHit(
+                    id=chunk_id,
+                    text=results["documents"][0][i],
+                    metadata=results["metadatas"][0][i] or {},
+                    similarity=1.0 - distance / 2.0,
+                    embedding=np.asarray(results["embeddings"][0][i], dtype=np.float32) if include_embeddings else None,
+                )
+            )
+        return hits
+
+    def fetch(self, course_id, ids, embedding=None) -> List[VectorHit]:
+        if not ids:
+            return []
+        results = self._collection(course_id).get(ids=list(ids), include=["documents", "metadatas", "embeddings"])
+        if not results.get("ids"):
+            return []
+        vectors = np.asarray(results["embeddings"], dtype=np.float32)
+        if embedding is None:
+            similarities = np.zeros(len(vectors))
+        else:
+            similarities = vectors @ np.asarray(embedding, dtype=np.float32).reshape(-1)
+        return [
+            VectorHit(
+                id=chunk_id,
+                text=results["documents"][i],
+                metadata=results["metadatas"][i] or {},
+                similarity=float(similarities[i]),
+                embedding=vectors[i],
+            )
+            for i, chunk_id in enumerate(results["ids"])
+        ]
+
+
+class _CourseMatrix:
+    """One course: float32 matrix plus sidecar rows (ids, texts, metadata)."""
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        self.vectors = vectors
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self._content_rows: Optional[Dict[str, np.ndarray]] = None
+
+    def content_rows(self, content_ids: Sequence[int]) -> np.ndarray:
+        """Row numbers of the given content items' chunks (grouped once per loaded matrix)."""
+        if self._content_rows is None:
+            grouped: Dict[str, List[int]] = {}
+            for row, metadata in enumerate(self.metadatas):
+                grouped.setdefault(metadata.get("content_id"), []).append(row)
+            self._content_rows = {key: np.asarray(rows, dtype=np.int64) for key, rows in grouped.items()}
+        parts = [self._content_rows.get(str(content_id)) for content_id in content_ids]
+        parts = [rows for rows in parts if rows is not None]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def empty(cls) -> "_CourseMatrix":
+        return cls(np.zeros((0, 0), dtype=np.float32), [], [], [])
+
+    def copy(self) -> "_CourseMatrix":
+        return _CourseMatrix(
+            np.array(self.vectors, dtype=np.float32),
+            list(self.ids),
+            list(self.documents),
+            [dict(metadata) for metadata in self.metadatas],
+        )
+
+    def upsert(self, ids, documents, vectors: np.ndarray, metadatas) -> None:
+        if self.vectors.shape[0] == 0:
+            self.vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        appended = []
+        for chunk_id, document, vector, metadata in zip(ids, documents, vectors, metadatas):
+            row = self.row_of.get(chunk_id)
+            if row is None:
+                self.row_of[chunk_id] = len(self.ids)
+                self.ids.append(chunk_id)
+                self.documents.append(document)
+                self.metadatas.append(dict(metadata))
+                appended.append(vector)
+            elif row >= self.vectors.shape[0]:
+                # Repeated id within this batch
+                appended[row - self.vectors.shape[0]] = vector
+                self.documents[row] = document
+                self.metadatas[row] = dict(metadata)
+            else:
+                self.vectors[row] = vector
+                self.documents[row] = document
+                self.metadatas[row] = dict(metadata)
+        if appended:
+            self.vectors = np.vstack([self.vectors, np.stack(appended)])
+
+    def update_metadata(self, ids, metadatas) -> None:
+        for chunk_id, metadata in zip(ids, metadatas):
+            row = self.row_of.get(chunk_id)
+            if row is not None:
+                self.metadatas[row] = dict(metadata)
+
+    def keep_rows(self, keep: List[bool]) -> "_CourseMatrix":
+        rows = [row for row, kept in enumerate(keep) if kept]
+        return _CourseMatrix(
+            self.vectors[rows],
+            [self.ids[row] for row in rows],
+            [self.documents[row] for row in rows],
+            [self.metadatas[row] for row in rows],
+        )
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact search over a memory-mapped float32 matrix per course.
+
+    Mutations are buffered per course and applied by ``flush`` to the latest
+    persisted generation under a file lock, producing ``vectors.<gen>.npy`` and
+    ``chunks.<gen>.json``. The ``CURRENT`` pointer file is swapped atomically,
+    so readers in other processes never see a half-written course and pick up
+    the new generation on their next query. Once ``flush_rows`` upserted rows
+    are buffered for a course they are flushed right away, so a large
+    document never sits in memory whole; like the write-through backends,
+    chunks written before a failure stay and are reused by the retry.
+    """
+
+    def __init__(self, root: str, flush_rows: Optional[int] = None):
+        self.root = root
+        self.flush_rows = max(1, flush_rows or settings.NUMPY_STORE_FLUSH_ROWS)
+        self._readers: Dict[int, tuple] = {}  # course id -> (generation, matrix)
+        self._pending: Dict[int, List[tuple]] = {}  # course id -> buffered operations
+        self._pending_rows: Dict[int, int] = {}  # course id -> upserted rows buffered
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+
+    def _course_dir(self, course_id: int) -> str:
+        return os.path.join(self.root, f"course_{course_id}")
+
+    def _current_generation(self, course_id: int) -> Optional[int]:
+        try:
+            with open(os.path.join(self._course_dir(course_id), "CURRENT")) as fh:
+                return int(fh.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _load(self, course_id: int) -> _CourseMatrix:
+        """Latest persisted matrix for a course (memory-mapped, cached per generation)."""
+        generation = self._current_generation(course_id)
+        if generation is None:
+            return _CourseMatrix.empty()
+        cached = self._readers.get(course_id)
+        if cached and cached[0] == generation:
+            return cached[1]
+
+        course_dir = self._course_dir(course_id)
+        vectors = np.load(os.path.join(course_dir, f"vectors.{generation}.npy"), mmap_mode="r")
+        with open(os.path.join(course_dir, f"chunks.{generation}.json")) as fh:
+            sidecar = json.load(fh)
+        matrix = _CourseMatrix(vectors, sidecar["ids"], sidecar["documents"], sidecar["metadatas"])
+        self._readers[course_id] = (generation, matrix)
+        return matrix
+
+    @contextmanager
+    def _file_lock(self, course_id: int) -> Iterator[None]:
+        course_dir = self._course_dir(course_id)
+        os.makedirs(course_dir, exist_ok=True)
+        with open(os.path.join(course_dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def _buffer(self, course_id: int, operation: tuple) -> None:
+        with self._lock:
+            self._pending.setdefault(course_id, []).append(operation)
+
+    def upsert(self, course_id, ids, documents, embeddings, metadatas) -> None:
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        with self._lock:
+            self._buffer(course_id, ("upsert", list(ids), list(documents), vectors, list(metadatas)))
+            self._pending_rows[course_id] = self._pending_rows.get(course_id, 0) + len(ids)
+            if self._pending_rows[course_id] >= self.flush_rows:
+                self.flush(course_id)
+
+    def update_metadata(self, course_id, ids, metadatas) -> None:
+        self._buffer(course_id, ("update", list(ids), list(metadatas)))
+
+    def delete(self, course_id, ids) -> None:
+        if ids:
+            self._buffer(course_id, ("delete", set(ids)))
+
+    def delete_content(self, course_id, content_id) -> None:
+        self._buffer(course_id, ("delete_content", str(content_id)))
+        self.flush(course_id)
+
+    def discard(self, course_id, content_id) -> None:
+        content_id = str(content_id)
+        with self._lock:
+            kept = []
+            for operation in self._pending.get(course_id, []):
+                if operation[0] == "upsert":
+                    _, ids, documents, vectors, metadatas = operation
+                    rows = [i for i, metadata in enumerate(metadatas) if metadata.get("content_id") != content_id]
+                    if not rows:
+                        continue
+                    if len(rows) < len(ids):
+                        operation = (
+                            "upsert",
+                            [ids[i] for i in rows],
+                            [documents[i] for i in rows],
+                            vectors[rows],
+                            [metadatas[i] for i in rows],
+                        )
+                elif operation[0] == "update" and all(
+                    metadata.get("content_id") == content_id for metadata in operation[2]
+                ):
+                    continue
+                kept.append(operation)
+            if kept:
+                self._pending[course_id] = kept
+                self._pending_rows[course_id] = sum(len(op[1]) for op in kept if op[0] == "upsert")
+            else:
+                self._pending.pop(course_id, None)
+                self._pending_rows.pop(course_id, None)
+
+    def delete_course(self, course_id) -> None:
+        course_dir = self._course_dir(course_id)
+        with self._lock:
+            self._pending.pop(course_id, None)
+            self._pending_rows.pop(course_id, None)
+            self._readers.pop(course_id, None)
+            if not os.path.isdir(course_dir):
+                return
+            with self._file_lock(course_id):
+                # Readers holding the old mmap keep working after unlink
+                for name in os.listdir(course_dir):
+                    if name != ".lock":
+                        os.remove(os.path.join(course_dir, name))
+            shutil.rmtree(course_dir, ignore_errors=True)
+
+    def _course_ids(self) -> List[int]:
+        return [
+            int(match.group(1))
+            for match in (COURSE_DIR.match(name) for name in os.listdir(self.root))
+            if match
+        ]
+
+    def inventory(self) -> Inventory:
+        stored: Inventory = {}
+        for course_id in self._course_ids():
+            with self._lock:
+                matrix = self._load(course_id)
+            counts = Counter(metadata.get("content_id") for metadata in matrix.metadatas)
+            stored[course_id] = {int(content_id): count for content_id, count in counts.items() if content_id}
+        return stored
+
+    def compact(self) -> None:
+        """Remove generation files a crashed writer left next to the current one."""
+        for course_id in self._course_ids():
+            course_dir = self._course_dir(course_id)
+            with self._lock, self._file_lock(course_id):
+                generation = self._current_generation(course_id)
+                keep = {".lock", "CURRENT", f"vectors.{generation}.npy", f"chunks.{generation}.json"}
+                for name in os.listdir(course_dir):
+                    if name not in keep:
+                        os.remove(os.path.join(course_dir, name))
+
+    def storage_bytes(self) -> Optional[int]:
+        return directory_bytes(self.root)
+
+    def get_content_metadata(self, course_id, content_id) -> Dict[str, Dict[str, Any]]:
+        """Persisted chunks only; buffered writes become visible after ``flush``."""
+        with self._lock:
+            matrix = self._load(course_id)
+        return {
+            chunk_id: metadata
+            for chunk_id, metadata in zip(matrix.ids, matrix.metadatas)
+            if metadata.get("content_id") == str(content_id)
+        }
+
+    @staticmethod
+    def _apply(matrix: _CourseMatrix, operation: tuple) -> _CourseMatrix:
+        kind = operation[0]
+        if kind == "upsert":
+            matrix.upsert(*operation[1:])
+        elif kind == "update":
+            matrix.update_metadata(*operation[1:])
+        elif kind == "delete":
+            matrix = matrix.keep_rows([chunk_id not in operation[1] for chunk_id in matrix.ids])
+        elif kind == "delete_content":
+            matrix = matrix.keep_rows([metadata.get("content_id") != operation[1] for metadata in matrix.metadatas])
+        return matrix
+
+    def flush(self, course_id: int) -> None:
+        with self._lock:
+            operations = self._pending.pop(course_id, None)
+            self._pending_rows.pop(course_id, None)
+            if not operations:
+                return
+            with self._file_lock(course_id):
+                # Replay on the newest generation so concurrent writers never lose updates
+                matrix = self._load(course_id).copy()
+                for operation in operations:
+                    matrix = self._apply(matrix, operation)
+                self._write_generation(course_id, matrix)
+
+    def _write_generation(self, course_id: int, matrix: _CourseMatrix) -> None:
+        course_dir = self._course_dir(course_id)
+        previous = self._current_generation(course_id)
+        generation = (previous or 0) + 1
+        np.save(os.path.join(course_dir, f"vectors.{generation}.npy"), np.ascontiguousarray(matrix.vectors))
+        with open(os.path.join(course_dir, f"chunks.{generation}.json"), "w") as fh:
+            json.dump({"ids": matrix.ids, "documents": matrix.documents, "metadatas": matrix.metadatas}, fh)
+        pointer = os.path.join(course_dir, "CURRENT.tmp")
+        with open(pointer, "w") as fh:
+            fh.write(str(generation))
+        os.replace(pointer, os.path.join(course_dir, "CURRENT"))
+        if previous is not None:
+            # Readers holding the old mmap keep working after unlink
+            for name in (f"vectors.{previous}.npy", f"chunks.{previous}.json"):
+                try:
+                    os.remove(os.path.join(course_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def query(self, course_id, embedding, top_k, include_embeddings=False, content_ids=None) -> List[VectorHit]:
+        with self._lock:
+            matrix = self._load(course_id)
+        if matrix.vectors.shape[0] == 0 or top_k <= 0:
+            return []
+
+        query_vector = self._normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        if content_ids is None:
+            rows = None
+            scores = matrix.vectors @ query_vector
+        else:
+            # Scoped search only touches the chosen documents' rows
+            rows = matrix.content_rows(content_ids)
+            scores = matrix.vectors[rows] @ query_vector
+        count = len(scores)
+        if count == 0:
+            return []
+        k = min(top_k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        matrix_rows = top if rows is None else rows[top]
+        return [
+            VectorHit(
+                id=matrix.ids[row],
+                text=matrix.documents[row],
+                metadata=matrix.metadatas[row],
+                similarity=float(scores[position]),
+                embedding=np.asarray(matrix.vectors[row]) if include_embeddings else None,
+            )
+            for position, row in zip(top, matrix_rows)
+        ]
+
+    def fetch(self, course_id, ids, embedding=None) -> List[VectorHit]:
+        with self._lock:
+            matrix = self._load(course_id)
+        rows = [matrix.row_of[chunk_id] for chunk_id in ids if chunk_id in matrix.row_of]
+        if not rows:
+            return []
+        vectors = np.asarray(matrix.vectors[rows])
+        if embedding is None:
+            similarities = np.zeros(len(rows))
+        else:
+            similarities = vectors @ self._normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        return [
+            VectorHit(
+                id=matrix.ids[row],
+                text=matrix.documents[row],
+                metadata=matrix.metadatas[row],
+                similarity=float(similarity),
+                embedding=vector,
+            )
+            for row, similarity, vector in zip(rows, similarities, vectors)
+        ]
+
+
+def _vector_literal(vector: Sequence[float]) -> str:
+    """pgvector text form: ``[0.1,0.2,...]``."""
+    return "[" + ",".join(repr(float(value)) for value in vector) + "]"
+
+
+class PgVectorStore(VectorStore):
+    """``document_chunks`` rows with a pgvector ``embedding`` column.
+
+    Writes go straight to PostgreSQL: ``upsert`` COPYs a batch into a temp
+    table and merges it with ``INSERT ... ON CONFLICT (chunk_id)``, which is
+    an order of magnitude faster than row-by-row ORM inserts.
+    """
+
+    _COLUMNS = ("chunk_id", "content_id", "course_id", "chunk_text", "chunk_index", "chunk_metadata", "embedding")
+
+    def __init__(self, engine=None, ef_search: Optional[int] = None):
+        if engine is None:
+            from app.core.database import engine
+        self.engine = engine
+        self.ef_search = ef_search or settings.PGVECTOR_EF_SEARCH
+
+    @contextmanager
+    def _cursor(self) -> Iterator[Any]:
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            yield cursor
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def upsert(self, course_id, ids, documents, embeddings, metadatas) -> None:
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for chunk_id, document, vector, metadata in zip(ids, documents, vectors, metadatas):
+            writer.writerow([
+                chunk_id,
+                int(metadata["content_id"]),
+                course_id,
+                document,
+                int(metadata.get("chunk_index", 0)),
+                json.dumps(metadata),
+                _vector_literal(vector),
+            ])
+        buffer.seek(0)
+
+        columns = ", ".join(self._COLUMNS)
+        with self._cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE chunk_upload (LIKE document_chunks INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            cursor.copy_expert(f"COPY chunk_upload ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"""
+                INSERT INTO document_chunks ({columns})
+                SELECT DISTINCT ON (chunk_id) {columns} FROM chunk_upload
+                ON CONFLICT (chunk_id) DO UPDATE SET
+                    chunk_text = EXCLUDED.chunk_text,
+                    chunk_index = EXCLUDED.chunk_index,
+                    chunk_metadata = EXCLUDED.chunk_metadata,
+                    embedding = EXCLUDED.embedding
+                """
+            )
+
+    def update_metadata(self, course_id, ids, metadatas) -> None:
+        if not ids:
+            return
+        with self._cursor() as cursor:
+            cursor.executemany(
+                "UPDATE document_chunks SET chunk_metadata = %s, chunk_index = %s WHERE chunk_id = %s",
+                [
+                    (json.dumps(metadata), int(metadata.get("chunk_index", 0)), chunk_id)
+                    for chunk_id, metadata in zip(ids, metadatas)
+                ],
+            )
+
+    def delete(self, course_id, ids) -> None:
+        if ids:
+            with self._cursor() as cursor:
+                cursor.execute("DELETE FROM document_chunks WHERE chunk_id = ANY(%s)", (list(ids),))
+
+    def delete_content(self, course_id, content_id) -> None:
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM document_chunks WHERE content_id = %s", (content_id,))
+
+    def delete_course(self, course_id) -> None:
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM document_chunks WHERE course_id = %s", (course_id,))
+
+    def inventory(self) -> Inventory:
+        stored: Inventory = {}
+        with self._cursor() as cursor:
+            cursor.execute("SELECT course_id, content_id, COUNT(*) FROM document_chunks GROUP BY course_id, content_id")
+            for course_id, content_id, count in cursor.fetchall():
+                stored.setdefault(course_id, {})[content_id] = count
+        return stored
+
+    def compact(self) -> None:
+        # VACUUM cannot run inside a transaction block
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("VACUUM (ANALYZE) document_chunks")
+
+    def storage_bytes(self) -> Optional[int]:
+        with self._cursor() as cursor:
+            cursor.execute("SELECT pg_total_relation_size('document_chunks')")
+            return int(cursor.fetchone()[0])
+
+    def get_content_metadata(self, course_id, content_id) -> Dict[str, Dict[str, Any]]:
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT chunk_id, chunk_metadata FROM document_chunks WHERE content_id = %s",
+                (content_id,),
+            )
+            return {chunk_id: metadata or {} for chunk_id, metadata in cursor.fetchall()}
+
+    def _query_statement(self, course_id, embedding, top_k, include_embeddings, content_ids) -> Tuple[str, tuple]:
+        vector = _vector_literal(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        if content_ids is None:
+            # Whole course: ORDER BY distance is served by the HNSW index
+            return (
+                """
+                SELECT chunk_id, chunk_text, chunk_metadata, embedding <=> %s::vector AS distance,
+                       CASE WHEN %s THEN embedding::text END
+                FROM document_chunks
+                WHERE course_id = %s
+                ORDER BY distance
+                LIMIT %s
+                """,
+                (vector, include_embeddings, course_id, top_k),
+            )
+        # A few documents: the materialized CTE fetches their rows through the
+        # content_id index and ranks all of them exactly. Ordering the table
+        # itself would let the planner post-filter HNSW candidates instead,
+        # which can return fewer than top_k rows.
+        return (
+            """
+            WITH scoped AS MATERIALIZED (
+                SELECT chunk_id, chunk_text, chunk_metadata, embedding
+                FROM document_chunks
+                WHERE course_id = %s AND content_id = ANY(%s)
+            )
+            SELECT chunk_id, chunk_text, chunk_metadata, embedding <=> %s::vector AS distance,
+                   CASE WHEN %s THEN embedding::text END
+            FROM scoped
+            ORDER BY distance
+            LIMIT %s
+            """,
+            (course_id, [int(content_id) for content_id in content_ids], vector, include_embeddings, top_k),
+        )
+
+    def query(self, course_id, embedding, top_k, include_embeddings=False, content_ids=None) -> List[VectorHit]:
+        if top_k <= 0:
+            return []
+        statement, params = self._query_statement(course_id, embedding, top_k, include_embeddings, content_ids)
+        with self._cursor() as cursor:
+            if content_ids is None:
+                # Candidate list size for the HNSW scan; must be >= top_k for full recall
+                cursor.execute(f"SET LOCAL hnsw.ef_search = {max(int(self.ef_search), int(top_k))}")
+            cursor.execute(statement, params)
+            rows = cursor.fetchall()
+        return [
+            VectorHit(
+                id=chunk_id,
+                text=text,
+                metadata=metadata or {},
+                similarity=1.0 - float(distance),
+                embedding=np.asarray(json.loads(vector), dtype=np.float32) if vector else None,
+            )
+            for chunk_id, text, metadata, distance, vector in rows
+        ]
+
+    def fetch(self, course_id, ids, embedding=None) -> List[VectorHit]:
+        if not ids:
+            return []
+        query_vector = None if embedding is None else _vector_literal(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        with self._cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT chunk_id, chunk_text, chunk_metadata,
+                       CASE WHEN %s::vector IS NULL THEN 1 ELSE embedding <=> %s::vector END, embedding::text
+                FROM document_chunks
+                WHERE course_id = %s AND chunk_id = ANY(%s)
+                """,
+                (query_vector, query_vector, course_id, list(ids)),
+            )
+            rows = cursor.fetchall()
+        return [
+            VectorHit(
+                id=chunk_id,
+                text=text,
+                metadata=metadata or {},
+                similarity=1.0 - float(distance),
+                embedding=np.asarray(json.loads(vector), dtype=np.float32),
+            )
+            for chunk_id, text, metadata, distance, vector in rows
+        ]
+
+
+_STORE: Optional[VectorStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Process-wide vector store for the configured ``VECTOR_STORE_BACKEND``."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                backend = settings.VECTOR_STORE_BACKEND
+                if backend == "chroma":
+                    _STORE = ChromaVectorStore()
+                elif backend == "numpy":
+                    _STORE = NumpyVectorStore(settings.NUMPY_STORE_PATH)
+                elif backend == "pgvector":
+                    _STORE = PgVectorStore()
+                else:
+                    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
+    return _STORE
@@ -0,0 +1,261 @@
+"""
+RAG indexing worker.
+
+Consumes the ``indexing_jobs`` table in a process of its own so that PDF parsing
+and embedding never compete with request handling in the API workers.
+
+Run with ``python -m app.worker [--concurrency N]``. When
+``INDEXING_WORKER_EMBEDDED`` is enabled the API processes supervise one
+embedded worker per host: it holds an exclusive lock on
+``INDEXING_WORKER_LOCK_PATH`` for its lifetime, and every API process checks
+that lock periodically and starts a new worker when it is free (no worker, or
+the last one exited).
+"""
+import argparse
+import asyncio
+import fcntl
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Dict, Optional, TextIO
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.exceptions import NotFoundError
+from app.models.rag import IndexingJobStatus
+from app.services import indexing_queue
+from app.services.file_service import discard_upload_spool, sweep_upload_spool
+from app.services.vector_gc import ReconcileReport, reconcile
+
+RECONCILE_STARTUP_DELAY_SECONDS = 60.0  # First run soon after start, so frequent restarts never starve it
+SUPERVISE_INTERVAL_SECONDS = 10.0  # How often API processes check that the embedded worker is alive
+
+logger = logging.getLogger(__name__)
+
+
+class IndexingWorker:
+    """Pool of job slots sharing one heartbeat thread."""
+
+    def __init__(self, concurrency: int, poll_interval: float, heartbeat_interval: float):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._active_jobs: Dict[int, int] = {}  # slot -> job id
+        self._lock = threading.Lock()
+
+    def stop(self, *_args) -> None:
+        logger.info("Indexing worker %s stopping", self.worker_id)
+        self._stop.set()
+
+    def run(self) -> None:
+        logger.info("Indexing worker %s started with %d slot(s)", self.worker_id, self.concurrency)
+        sweep_upload_spool()
+        threads = [threading.Thread(target=self._heartbeat_loop, name="indexing-heartbeat", daemon=True)]
+        if settings.VECTOR_RECONCILE_INTERVAL_HOURS > 0:
+            threads.append(threading.Thread(target=self._reconcile_loop, name="vector-reconcile", daemon=True))
+        threads += [
+            threading.Thread(target=self._work_loop, args=(slot,), name=f"indexing-slot-{slot}")
+            for slot in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            if not thread.daemon:
+                thread.join()
+
+    def _work_loop(self, slot: int) -> None:
+        # One event loop per slot, reused across jobs
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stop.is_set():
+                if not self._run_one(slot, loop):
+                    self._stop.wait(self.poll_interval)
+        finally:
+            from app.services.http_client import close_http_client
+
+            loop.run_until_complete(close_http_client())
+            loop.close()
+
+    def _run_one(self, slot: int, loop: asyncio.AbstractEventLoop) -> bool:
+        """Claim and run a single job. Returns False when the queue was empty."""
+        # Imported lazily so that the API process never loads the embedding stack
+        from app.services.rag_service import RAGService
+
+        db = SessionLocal()
+        try:
+            indexing_queue.requeue_stale_jobs(db)
+            job = indexing_queue.claim_next_job(db, self.worker_id)
+            if job is None:
+                return False
+
+            with self._lock:
+                self._active_jobs[slot] = job.id
+            logger.info("Indexing content %s (job %s, attempt %s)", job.content_id, job.id, job.attempts)
+            try:
+                loop.run_until_complete(
+                    RAGService(db).process_uploaded_content(job.content_id, source_path=job.source_path)
+                )
+                indexing_queue.mark_succeeded(db, job)
+            except NotFoundError as e:
+                db.rollback()
+                indexing_queue.mark_failed(db, job, str(e), retry=False)
+            except Exception as e:
+                logger.exception("Indexing job %s failed", job.id)
+                db.rollback()
+                indexing_queue.mark_failed(db, job, str(e))
+            if job.status in (IndexingJobStatus.SUCCEEDED, IndexingJobStatus.FAILED):
+                # Retries keep reading the spooled upload
+                discard_upload_spool(job.source_path)
+            return True
+        except Exception:
+            # Job row vanished (content deleted) or the database is unreachable
+            logger.exception("Indexing worker slot %s error", slot)
+            db.rollback()
+            return False
+        finally:
+            with self._lock:
+                self._active_jobs.pop(slot, None)
+            db.close()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                job_ids = list(self._active_jobs.values())
+            if not job_ids:
+                continue
+            db = SessionLocal()
+            try:
+                indexing_queue.heartbeat(db, job_ids, self.worker_id)
+            except Exception:
+                logger.exception("Indexing heartbeat failed")
+            finally:
+                db.close()
+
+
+    def _reconcile_loop(self) -> None:
+        delay = RECONCILE_STARTUP_DELAY_SECONDS
+        while not self._stop.wait(delay):
+            run_reconciliation()
+            delay = settings.VECTOR_RECONCILE_INTERVAL_HOURS * 3600
+
+
+def run_reconciliation(dry_run: bool = False) -> Optional[ReconcileReport]:
+    """One pass of orphaned-vector garbage collection; errors are logged, not raised."""
+    db = SessionLocal()
+    try:
+        return reconcile(db, dry_run=dry_run)
+    except Exception:
+        logger.exception("Vector reconciliation failed")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def _worker_lock_path() -> str:
+    return settings.INDEXING_WORKER_LOCK_PATH or os.path.join(tempfile.gettempdir(), "elearning-indexing-worker.lock")
+
+
+def _try_lock(path: str) -> Optional[TextIO]:
+    """Open ``path`` and take its exclusive lock, or None when another process holds it."""
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+_embedded_worker: Optional[subprocess.Popen] = None
+_supervisor: Optional[threading.Thread] = None
+_supervisor_stop = threading.Event()
+
+
+def _ensure_embedded_worker() -> None:
+    """Start a worker unless this process's worker, or any other on the host, is alive."""
+    global _embedded_worker
+    if _embedded_worker is not None:
+        if _embedded_worker.poll() is None:
+            return
+        logger.warning("Embedded indexing worker exited with code %s", _embedded_worker.returncode)
+        _embedded_worker = None
+    probe = _try_lock(_worker_lock_path())
+    if probe is None:
+        return  # A worker started by another API process holds the lock
+    probe.close()
+    # Two API processes may both get here; the worker that loses the lock exits right away
+    _embedded_worker = subprocess.Popen([sys.executable, "-m", "app.worker", "--embedded"])
+
+
+def _supervise() -> None:
+    while True:
+        try:
+            _ensure_embedded_worker()
+        except Exception:
+            logger.exception("Could not start the embedded indexing worker")
+        if _supervisor_stop.wait(SUPERVISE_INTERVAL_SECONDS):
+            return
+
+
+def start_embedded_worker() -> None:
+    """Keep one indexing worker running on this host, restarting it when it exits."""
+    global _supervisor
+    if _supervisor is not None and _supervisor.is_alive():
+        return
+    _supervisor_stop.clear()
+    _supervisor = threading.Thread(target=_supervise, name="indexing-worker-supervisor", daemon=True)
+    _supervisor.start()
+
+
+def stop_embedded_worker() -> None:
+    global _embedded_worker, _supervisor
+    _supervisor_stop.set()
+    if _supervisor is not None:
+        _supervisor.join(timeout=5)
+        _supervisor = None
+    if _embedded_worker is None:
+        return
+    _embedded_worker.terminate()
+    try:
+        _embedded_worker.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        _embedded_worker.kill()
+    _embedded_worker = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the RAG indexing worker")
+    parser.add_argument("--concurrency", type=int, default=settings.INDEXING_WORKER_CONCURRENCY)
+    parser.add_argument("--reconcile", action="store_true", help="Purge chunks of deleted content once and exit")
+    parser.add_argument("--dry-run", action="store_true", help="With --reconcile: only report what would be purged")
+    parser.add_argument("--embedded", action="store_true", help=argparse.SUPPRESS)  # Started by the API
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    if args.reconcile:
+        report = run_reconciliation(dry_run=args.dry_run)
+        sys.exit(0 if report is not None else 1)
+    if args.embedded:
+        host_lock = _try_lock(_worker_lock_path())  # Held until the process exits
+        if host_lock is None:
+            logger.info("Another embedded indexing worker is running on this host")
+            return
+    worker = IndexingWorker(
+        concurrency=args.concurrency,
+        poll_interval=settings.INDEXING_POLL_INTERVAL_SECONDS,
+        heartbeat_interval=settings.INDEXING_HEARTBEAT_SECONDS,
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
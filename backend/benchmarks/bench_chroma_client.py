@@ -0,0 +1,48 @@
+"""
+Per-request ChromaDB setup cost: new PersistentClient per request vs. the
+shared process-wide handle from app.core.chroma.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chroma_client [--requests 200]
+"""
+import argparse
+import tempfile
+import time
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+from app.core import chroma
+from app.core.config import settings
+
+
+def per_request_client(path: str, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        client = chromadb.PersistentClient(path=path, settings=ChromaSettings(anonymized_telemetry=False))
+        client.get_or_create_collection(settings.CHROMA_COLLECTION)
+    return time.perf_counter() - started
+
+
+def shared_client(requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        chroma.get_chroma_client()
+        chroma.get_collection()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        settings.CHROMA_PATH = path
+        for name, seconds in (
+            ("per-request", per_request_client(path, args.requests)),
+            ("shared", shared_client(args.requests)),
+        ):
+            print(f"{name:<12} {seconds / args.requests * 1000:9.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
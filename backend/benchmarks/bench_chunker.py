@@ -0,0 +1,147 @@
+"""
+Character chunker: previous implementation vs. the single-pass chunker.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunker [--pages 2000] [path/to/lecture.pdf ...]
+
+Golden check: for every page of a synthetic corpus (headed sections, plain
+paragraphs, hyphenated line breaks, \\r line endings, very long pages) and of
+any PDFs given, the old path and the new path must produce identical chunks.
+
+- old path: the old cleaner, then the old chunker, which cleaned again
+- new path: ``clean_extracted_text``, then ``split_text_into_chunks``
+
+Throughput is measured on the cleaned pages, i.e. what the pipeline's chunk
+stage receives.
+"""
+import argparse
+import random
+import re
+import time
+import PyPDF2
+from app.services.chunking import split_text_into_chunks
+from app.services.ingestion_pipeline import clean_extracted_text
+
+WORDS = (
+    "matrix vector gradient descent kernel tensor entropy softmax layer node pointer heap stack queue graph "
+    "edge weight bias loss convolution recursion invariant lemma proof theorem integral derivative"
+).split()
+
+
+def legacy_clean(text: str) -> str:
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    text = text.replace("\r", "\n")
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    lines = [line.strip() for line in text.split("\n")]
+    text = "\n".join([line for line in lines if line != ""])
+    return text.strip()
+
+
+def legacy_split(text: str, chunk_size: int = 900, overlap_sentences: int = 2) -> list:
+    """The chunker as it was before the single-pass rewrite (reference only)."""
+    text = legacy_clean(text)
+    chunks = []
+    heading_pattern = r'(?m)^((?:#{1,6}\s+|[A-Z][a-z]*\.\s+|[0-9]+\.\s+).+)$'
+    sections = re.split(heading_pattern, text)
+
+    def pack(pieces, separator):
+        current_chunk = ""
+        current_length = 0
+        for piece in pieces:
+            if current_length + len(piece) + len(separator) > chunk_size and current_chunk:
+                chunks.append(current_chunk.strip())
+                sentences = re.split(r'(?<=[.!?])\s+', current_chunk)
+                overlap_text = " ".join(sentences[-overlap_sentences:]) if len(sentences) > overlap_sentences else ""
+                current_chunk = overlap_text + separator + piece
+                current_length = len(current_chunk)
+            else:
+                current_chunk = current_chunk + separator + piece if current_chunk else piece
+                current_length += len(piece) + len(separator)
+        if current_chunk.strip():
+            chunks.append(current_chunk.strip())
+
+    if len(sections) > 1:
+        pack([section.strip() for section in sections if section.strip()], "\n\n")
+    else:
+        paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+        if paragraphs:
+            pack(paragraphs, "\n\n")
+        else:
+            pack([s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()], " ")
+    return [chunk.strip() for chunk in chunks if len(chunk.strip()) > 100]
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(3, 30))]
+    if rng.random() < 0.1:
+        i = rng.randrange(len(words))
+        words[i] = words[i][:3] + "-\n" + words[i][3:]  # Hyphenated line break
+    text = " ".join(words).capitalize()
+    return text + rng.choice([".", ".", "?", "!", "", ":"])
+
+
+def _page(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(1, 120 if rng.random() < 0.05 else 25)):
+        kind = rng.random()
+        if kind < 0.08:
+            lines.append(rng.choice(["# ", "## ", f"{rng.randint(1, 9)}. ", "Chapter. "]) + _sentence(rng))
+        elif kind < 0.15:
+            lines.append("")  # Paragraph break
+        elif kind < 0.18:
+            lines.append("   \t ")
+        else:
+            lines.append(" ".join(_sentence(rng) for _ in range(rng.randint(1, 4))))
+    newline = "\r\n" if rng.random() < 0.1 else "\n"
+    return newline.join(lines)
+
+
+def _pdf_pages(paths):
+    for path in paths:
+        for page in PyPDF2.PdfReader(path).pages:
+            yield page.extract_text() or ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    raw_pages = [_page(rng) for _ in range(args.pages)] + list(_pdf_pages(args.pdfs))
+    mismatches = 0
+    chunks = 0
+    for raw in raw_pages:
+        expected = legacy_split(legacy_clean(raw))
+        actual = split_text_into_chunks(clean_extracted_text(raw), chunk_size=900, overlap_sentences=2)
+        chunks += len(expected)
+        if expected != actual:
+            mismatches += 1
+    print(f"golden: {len(raw_pages)} pages, {chunks} chunks, {mismatches} pages differ")
+
+    cleaned = [clean_extracted_text(raw) for raw in raw_pages]
+    total_mb = sum(len(text) for text in cleaned) / 1e6
+    for name, split in (
+        ("old", lambda text: legacy_split(text)),
+        ("single-pass", lambda text: split_text_into_chunks(text, chunk_size=900, overlap_sentences=2)),
+    ):
+        started = time.perf_counter()
+        for text in cleaned:
+            split(text)
+        seconds = time.perf_counter() - started
+        print(f"  {name:<12} {total_mb / seconds:7.1f} MB/s  ({len(cleaned) / seconds:8.0f} pages/s)")
+
+    long_page = clean_extracted_text("\n".join(_sentence(rng) for _ in range(20_000)))
+    for name, split in (
+        ("old", lambda text: legacy_split(text)),
+        ("single-pass", lambda text: split_text_into_chunks(text, chunk_size=900, overlap_sentences=2)),
+    ):
+        started = time.perf_counter()
+        split(long_page)
+        print(f"  {name:<12} one {len(long_page) / 1e6:.1f} MB page without breaks: {time.perf_counter() - started:6.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Character chunks (~900 chars) vs. chunks packed to the model's max_seq_length.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunking path/to/lecture.pdf [more.pdf ...] [--probes 200]
+
+For each mode it reports:
+- chunk count
+- how many chunks exceed the model's token limit, and the share of document
+  tokens the model never sees because of truncation
+- encode time
+- recall@5 for probe questions
+
+The probes are sentences sampled from the documents. A probe is a hit when
+one of the 5 retrieved chunks contains it. Sentences in the truncated tail
+of an oversized chunk are invisible to that chunk's vector, which is what
+this measures. Needs the embedding model in backend/model_cache.
+"""
+import argparse
+import random
+import time
+import numpy as np
+import PyPDF2
+from app.services.chunking import TokenChunker, sentence_spans
+from app.services.ingestion_pipeline import clean_extracted_text
+
+TOP_K = 5
+
+
+def _pages(paths):
+    for path in paths:
+        for page in PyPDF2.PdfReader(path).pages:
+            text = clean_extracted_text(page.extract_text() or "")
+            if text.strip():
+                yield text
+
+
+def _probes(pages, count: int, rng: random.Random):
+    sentences = [
+        text[start:end]
+        for text in pages
+        for start, end in sentence_spans(text)
+        if len(text[start:end].split()) >= 8
+    ]
+    return rng.sample(sentences, min(count, len(sentences)))
+
+
+def _evaluate(name, chunks, model, probes, probe_vectors):
+    limit = model.max_seq_length - 2
+    lengths = [len(ids) for ids in model.tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+    truncated = sum(length > limit for length in lengths)
+    lost = sum(max(0, length - limit) for length in lengths) / max(1, sum(lengths))
+
+    started = time.perf_counter()
+    vectors = model.encode(chunks, batch_size=32, show_progress_bar=False, normalize_embeddings=True)
+    encode_seconds = time.perf_counter() - started
+
+    top = np.argsort(-(probe_vectors @ vectors.T), axis=1)[:, :TOP_K]
+    hits = sum(any(probe in chunks[row] for row in rows) for probe, rows in zip(probes, top))
+    print(
+        f"  {name:<7} chunks {len(chunks):6d}  over limit {truncated:5d}  tokens lost {lost:6.1%}  "
+        f"encode {encode_seconds:6.1f} s  recall@{TOP_K} {hits / max(1, len(probes)):6.1%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--overlap-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    from app.services.rag_service import RAGService
+
+    model = RAGService.get_embedding_model()
+    service = RAGService.__new__(RAGService)
+    pages = list(_pages(args.pdfs))
+    probes = _probes(pages, args.probes, random.Random(0))
+    probe_vectors = model.encode(probes, batch_size=32, show_progress_bar=False, normalize_embeddings=True)
+    print(f"{len(pages)} pages, {len(probes)} probe sentences, max_seq_length {model.max_seq_length}")
+
+    started = time.perf_counter()
+    char_chunks = [
+        chunk for text in pages for chunk in service._split_text_into_chunks(text, chunk_size=900, overlap_sentences=2)
+    ]
+    print(f"  chunking chars  {time.perf_counter() - started:6.2f} s")
+    chunker = TokenChunker.for_model(model, overlap_tokens=args.overlap_tokens)
+    started = time.perf_counter()
+    token_chunks = [chunk for text in pages for chunk in chunker.split(text)]
+    print(f"  chunking tokens {time.perf_counter() - started:6.2f} s")
+
+    _evaluate("chars", char_chunks, model, probes, probe_vectors)
+    _evaluate("tokens", token_chunks, model, probes, probe_vectors)
+
+
+if __name__ == "__main__":
+    main()
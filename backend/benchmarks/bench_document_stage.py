@@ -0,0 +1,160 @@
+"""
+Document-stage retrieval per vector store backend: whole-course search vs.
+search scoped to the documents picked from their summary embeddings.
+
+Usage (from backend/):
+    python -m benchmarks.bench_document_stage [--documents 200] [--chunks 50] [--pg-url postgresql://...]
+
+Each document's chunks are noisy copies of a random topic vector, and
+questions are drawn near one document's topic. For every backend the script
+reports the mean query latency over the whole course and with
+``content_ids`` set to the ``RAG_DOCUMENT_TOP_K`` best documents (the
+summary ranking is included in the scoped time). Chroma is measured when
+chromadb is installed; pgvector when --pg-url points at a database that
+allows ``CREATE EXTENSION vector`` (tables go in a throwaway schema).
+"""
+import argparse
+import tempfile
+import time
+import uuid
+import numpy as np
+from app.core.config import settings
+from app.services.vector_store import NumpyVectorStore, VectorStore
+
+DIM = 384
+QUERIES = 100
+TOP_K = 16
+COURSE_ID = 1
+
+
+def _corpus(documents: int, chunks: int, rng) -> tuple:
+    topics = rng.standard_normal((documents, DIM)).astype(np.float32)
+    vectors = np.repeat(topics, chunks, axis=0) + 0.8 * rng.standard_normal((documents * chunks, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    summaries = vectors.reshape(documents, chunks, DIM).mean(axis=1)
+    summaries /= np.linalg.norm(summaries, axis=1, keepdims=True)
+    queries = topics[rng.integers(0, documents, QUERIES)] + rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, summaries, queries
+
+
+def _fill(store: VectorStore, content_ids, vectors: np.ndarray, chunks: int) -> None:
+    for start in range(0, len(vectors), 1000):
+        batch = vectors[start:start + 1000]
+        ids = [f"chunk_{start + i}" for i in range(len(batch))]
+        metadatas = [
+            {"course_id": str(COURSE_ID), "content_id": str(content_ids[(start + i) // chunks]), "chunk_index": i}
+            for i in range(len(batch))
+        ]
+        store.upsert(COURSE_ID, ids, ["x"] * len(ids), batch, metadatas)
+    store.flush(COURSE_ID)
+
+
+def _pick(summaries: np.ndarray, content_ids, query: np.ndarray):
+    scores = summaries @ query
+    k = min(settings.RAG_DOCUMENT_TOP_K, len(scores))
+    return [content_ids[i] for i in np.argpartition(-scores, k - 1)[:k]]
+
+
+def _measure(store: VectorStore, summaries: np.ndarray, content_ids, queries: np.ndarray) -> tuple:
+    store.query(COURSE_ID, queries[0], TOP_K)  # Warm caches / mmap
+    started = time.perf_counter()
+    for query in queries:
+        store.query(COURSE_ID, query, TOP_K)
+    whole = (time.perf_counter() - started) / len(queries) * 1000
+
+    started = time.perf_counter()
+    for query in queries:
+        store.query(COURSE_ID, query, TOP_K, content_ids=_pick(summaries, content_ids, query))
+    scoped = (time.perf_counter() - started) / len(queries) * 1000
+    return whole, scoped
+
+
+def _pg_store(url: str, documents: int):
+    """PgVectorStore on a throwaway schema holding one course with ``documents`` content items."""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+    from app.core.database import Base
+    from app.models import Course, CourseContent, User
+    from app.models.course import ContentType
+    from app.models.rag import ensure_pgvector_schema
+    from app.services.vector_store import PgVectorStore
+
+    schema = f"bench_document_stage_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(url)
+    with admin.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={schema},public"})
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        ensure_pgvector_schema(connection)
+    with Session(engine) as db:
+        teacher = User(name="Bench", email="bench@example.com", password="x")
+        course = Course(id=COURSE_ID, title="Bench", teacher=teacher)
+        contents = [
+            CourseContent(course=course, type=ContentType.PDF, title=f"doc {i}", url=f"{i}.pdf")
+            for i in range(documents)
+        ]
+        db.add_all(contents)
+        db.commit()
+        content_ids = [content.id for content in contents]
+
+    def drop() -> None:
+        engine.dispose()
+        with admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+    return PgVectorStore(engine=engine), content_ids, drop
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=50, help="chunks per document")
+    parser.add_argument("--pg-url", help="PostgreSQL URL for the pgvector backend")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors, summaries, queries = _corpus(args.documents, args.chunks, rng)
+    print(
+        f"{args.documents} documents x {args.chunks} chunks = {len(vectors)} chunks, "
+        f"top {settings.RAG_DOCUMENT_TOP_K} documents searched when scoped"
+    )
+    print(f"{'backend':>10} {'whole ms':>10} {'scoped ms':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        content_ids = list(range(1, args.documents + 1))
+        stores = [("numpy", lambda: (NumpyVectorStore(f"{tmp}/numpy"), content_ids, None))]
+        try:
+            import chromadb  # noqa: F401
+
+            def chroma():
+                from app.services.vector_store import ChromaVectorStore
+
+                settings.CHROMA_PATH = f"{tmp}/chroma"
+                settings.CHROMA_SHARDING = "course"
+                return ChromaVectorStore(), content_ids, None
+
+            stores.append(("chroma", chroma))
+        except ImportError:
+            print(f"{'chroma':>10} skipped (chromadb not installed)")
+        if args.pg_url:
+            stores.append(("pgvector", lambda: _pg_store(args.pg_url, args.documents)))
+
+        for name, make in stores:
+            store, ids, cleanup = make()
+            try:
+                _fill(store, ids, vectors, args.chunks)
+                whole, scoped = _measure(store, summaries, ids, queries)
+                note = "" if store.scoped_scan else "  (document stage skipped in production: filter does not shrink the scan)"
+                print(f"{name:>10} {whole:>10.3f} {scoped:>10.3f}{note}")
+            finally:
+                if cleanup:
+                    cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Embedding cache benchmark: cold index, unchanged re-index, 10% revised re-index.
+
+Usage (from backend/):
+    python -m benchmarks.bench_embedding_cache path/to/lecture.pdf
+
+Uses a throwaway cache file so the real cache is not touched.
+"""
+import argparse
+import os
+import tempfile
+import time
+from app.core.config import settings
+from app.services import embedding_cache
+from app.services.ingestion_pipeline import clean_extracted_text, open_pdf_reader
+
+
+def _load_chunks(pdf_path: str):
+    from app.services.rag_service import RAGService
+
+    service = RAGService.__new__(RAGService)
+    chunks = []
+    with open_pdf_reader(pdf_path) as reader:
+        for page in reader.pages:
+            text = clean_extracted_text(page.extract_text() or "")
+            if text:
+                chunks.extend(service._split_text_into_chunks(text, chunk_size=900, overlap_sentences=2))
+    return chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    args = parser.parse_args()
+
+    from app.services.rag_service import RAGService, EMBEDDING_MODEL_NAME
+
+    model = RAGService.get_embedding_model()
+    texts = _load_chunks(args.pdf)
+    revised = [text + " (revised)" if i % 10 == 0 else text for i, text in enumerate(texts)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.EMBEDDING_CACHE_PATH = os.path.join(tmp, "bench.sqlite3")
+        embedding_cache._CACHE = None
+
+        for name, batch in (("cold", texts), ("unchanged", texts), ("10% revised", revised)):
+            cache = embedding_cache.get_embedding_cache()
+            misses_before = cache.misses
+            started = time.perf_counter()
+            embedding_cache.encode_with_cache(model, EMBEDDING_MODEL_NAME, batch)
+            seconds = time.perf_counter() - started
+            encoded = cache.misses - misses_before
+            print(f"{name:<12} chunks={len(batch):<6} encoded={encoded:<6} time={seconds:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
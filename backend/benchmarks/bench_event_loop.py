@@ -0,0 +1,104 @@
+"""
+Event-loop responsiveness under RAG load: inline model.encode vs. the
+dedicated embedding executor.
+
+Usage (from backend/):
+    python -m benchmarks.bench_event_loop [--askers 20] [--synthetic]
+
+A "ping" coroutine stands in for the rest of the API: it wakes every 5 ms
+and records how late it was. Meanwhile ``--askers`` concurrent questions are
+encoded either inline on the loop or through ``EmbeddingExecutor``.
+``--synthetic`` replaces the model with a NumPy workload of similar cost
+for machines without the model cache.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import numpy as np
+from app.services.embedding_executor import EmbeddingExecutor
+
+PING_INTERVAL = 0.005
+QUESTION = "Explain how the TCP three-way handshake establishes a connection."
+
+
+def _synthetic_encoder():
+    rng = np.random.default_rng(0)
+    weights = rng.standard_normal((1024, 1024)).astype(np.float32)
+
+    def encode(text: str):
+        x = weights
+        for _ in range(6):
+            x = np.tanh(x @ weights)  # BLAS releases the GIL like torch does
+        return x[0, :384]
+
+    return encode
+
+
+def _model_encoder():
+    from app.services.rag_service import RAGService
+
+    model = RAGService.get_embedding_model()
+    return model.encode
+
+
+async def _ping(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + PING_INTERVAL
+        await asyncio.sleep(PING_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+
+async def _scenario(encode, askers: int, executor: EmbeddingExecutor = None):
+    lags: list = []
+    stop = asyncio.Event()
+    pinger = asyncio.create_task(_ping(stop, lags))
+    await asyncio.sleep(0.05)
+
+    async def ask():
+        started = time.perf_counter()
+        if executor is None:
+            encode(QUESTION)
+        else:
+            await executor.run(encode, QUESTION)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(ask() for _ in range(askers)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await pinger
+    return lags, latencies, elapsed
+
+
+def _p(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def main_async(args) -> None:
+    encode = _synthetic_encoder() if args.synthetic else _model_encoder()
+    encode(QUESTION)  # Warm up
+
+    executor = EmbeddingExecutor(max_workers=args.workers, max_queue=args.askers)
+    print(f"{'mode':<10} {'ping p50':>9} {'ping p99':>9} {'ping max':>9} {'ask p50':>9} {'total s':>8}")
+    for name, pool in (("inline", None), ("executor", executor)):
+        lags, latencies, elapsed = await _scenario(encode, args.askers, pool)
+        print(
+            f"{name:<10} {statistics.median(lags) if lags else 0:9.2f} {_p(lags, 0.99):9.2f} "
+            f"{max(lags) if lags else 0:9.2f} {statistics.median(latencies):9.2f} {elapsed:8.2f}"
+        )
+    print("executor stats:", executor.stats())
+    executor.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--askers", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--synthetic", action="store_true", help="NumPy stand-in instead of the real model")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+GroqClient against the local fake Groq server.
+
+Usage (from backend/):
+    python -m benchmarks.bench_groq_client [--requests 200]
+
+Scenarios:
+  pooling   new AsyncClient per call (old behaviour) vs. the shared pool
+  flaky     20% 503s: success rate without and with jittered retries
+  tail      5% of requests take 1 s: p99 without and with hedging at 150 ms
+  outage    every request fails: the breaker opens and calls short-circuit
+  stream    time to first delta through GroqClient.stream
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from app.core.config import settings
+from app.services.groq_client import CircuitBreaker, GroqClient, GroqUnavailableError
+from app.services.http_client import close_http_client
+from benchmarks.fake_groq import Behaviour, FakeGroq
+
+PAYLOAD = {"model": "llama-3.1-8b-instant", "messages": [{"role": "user", "content": "What is a linked list?"}]}
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def _timed(call):
+    started = time.perf_counter()
+    try:
+        await call()
+        ok = True
+    except GroqUnavailableError:
+        ok = False
+    return ok, (time.perf_counter() - started) * 1000
+
+
+async def _run(call, requests: int, concurrency: int = 10):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await _timed(call)
+
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    latencies = [ms for _, ms in results]
+    return sum(ok for ok, _ in results) / len(results), _pct(latencies, 0.5), _pct(latencies, 0.99)
+
+
+def _report(name, success, p50, p99, extra=""):
+    print(f"  {name:<22} success {success:6.1%}  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  {extra}")
+
+
+async def main_async(args) -> None:
+    server = FakeGroq().start()
+    settings.GROQ_API_KEY = settings.GROQ_API_KEY or "fake"
+    n = args.requests
+
+    print("pooling")
+    server.behaviour = Behaviour(latency_ms=5)
+
+    async def per_call():
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.post(f"{server.base_url}/chat/completions", json=PAYLOAD)
+            response.raise_for_status()
+
+    pooled = GroqClient(base_url=server.base_url, max_attempts=1)
+    _report("client per call", *await _run(per_call, n))
+    _report("shared pool", *await _run(lambda: pooled.complete(PAYLOAD), n))
+
+    print("flaky (20% 503)")
+    server.behaviour = Behaviour(latency_ms=20, error_rate=0.2)
+    for name, attempts in (("no retries", 1), ("3 attempts + jitter", 3)):
+        client = GroqClient(
+            base_url=server.base_url, max_attempts=attempts, breaker=CircuitBreaker(failure_threshold=10_000)
+        )
+        _report(name, *await _run(lambda: client.complete(PAYLOAD), n), extra=f"retries {client.stats()['retries']}")
+
+    print("tail (5% take 1 s)")
+    server.behaviour = Behaviour(latency_ms=30, slow_rate=0.05, slow_ms=1000)
+    for name, hedge in (("no hedging", 0), ("hedge after 150 ms", 150)):
+        client = GroqClient(base_url=server.base_url, hedge_after_ms=hedge)
+        stats_before = server.requests
+        result = await _run(lambda: client.complete(PAYLOAD), n)
+        _report(name, *result, extra=f"upstream requests {server.requests - stats_before}")
+
+    print("outage (100% 500)")
+    server.behaviour = Behaviour(latency_ms=20, error_rate=1.0, error_status=500)
+    client = GroqClient(base_url=server.base_url, breaker=CircuitBreaker(failure_threshold=5, reset_seconds=60))
+    _report("breaker", *await _run(lambda: client.complete(PAYLOAD), n, concurrency=1), extra=str(client.stats()))
+
+    print("stream")
+    server.behaviour = Behaviour(latency_ms=150, token_delay_ms=20)
+    client = GroqClient(base_url=server.base_url)
+    first_token, total = [], []
+    for _ in range(10):
+        started = time.perf_counter()
+        first = None
+        async for _delta in client.stream(PAYLOAD):
+            first = first or (time.perf_counter() - started) * 1000
+        first_token.append(first)
+        total.append((time.perf_counter() - started) * 1000)
+    print(f"  time to first delta p50 {_pct(first_token, 0.5):7.1f} ms, full answer p50 {_pct(total, 0.5):7.1f} ms")
+
+    await close_http_client()
+    server.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
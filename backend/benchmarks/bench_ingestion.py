@@ -0,0 +1,76 @@
+"""
+Ingestion throughput benchmark: sequential baseline vs. staged pipeline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ingestion path/to/lecture.pdf [--embed]
+
+Without ``--embed`` the embed stage is a no-op so extraction and chunking
+are measured on their own; with it the real SentenceTransformer is used.
+The store stage is always a no-op so ChromaDB is left untouched.
+"""
+import argparse
+import asyncio
+import time
+import PyPDF2
+from app.services.ingestion_pipeline import IngestionPipeline, clean_extracted_text
+
+
+def _make_chunker():
+    from app.services.rag_service import RAGService
+
+    service = RAGService.__new__(RAGService)
+
+    def chunk_page(page_number, text):
+        chunks = service._split_text_into_chunks(text, chunk_size=900, overlap_sentences=2)
+        return [{"text": chunk, "metadata": {"page_number": page_number, "chunk_index": i}} for i, chunk in enumerate(chunks)]
+
+    return chunk_page
+
+
+def _make_embedder(enabled: bool):
+    if not enabled:
+        return lambda texts: texts
+    from app.services.rag_service import RAGService
+
+    model = RAGService.get_embedding_model()
+    return lambda texts: model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+
+
+def run_sequential(pdf_path: str, chunk_page, embed) -> tuple:
+    started = time.perf_counter()
+    reader = PyPDF2.PdfReader(pdf_path)
+    chunks = []
+    for page_number, page in enumerate(reader.pages, start=1):
+        text = clean_extracted_text(page.extract_text() or "")
+        if text.strip():
+            chunks.extend(chunk_page(page_number, text))
+    for start in range(0, len(chunks), 8):
+        embed([chunk["text"] for chunk in chunks[start:start + 8]])
+    return len(reader.pages), len(chunks), time.perf_counter() - started
+
+
+def run_pipeline(pdf_path: str, chunk_page, embed) -> tuple:
+    pipeline = IngestionPipeline(pdf_path, chunk_page=chunk_page, embed=embed, store=lambda *_: None)
+    stats = asyncio.run(pipeline.run())
+    return stats.pages, stats.chunks, stats.seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--embed", action="store_true", help="include SentenceTransformer encoding")
+    args = parser.parse_args()
+
+    chunk_page = _make_chunker()
+    embed = _make_embedder(args.embed)
+
+    for name, runner in (("sequential", run_sequential), ("pipeline", run_pipeline)):
+        pages, chunks, seconds = runner(args.pdf, chunk_page, embed)
+        print(
+            f"{name:<11} pages={pages:<5} chunks={chunks:<6} time={seconds:7.2f}s "
+            f"pages/s={pages / seconds:8.1f} chunks/s={chunks / seconds:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
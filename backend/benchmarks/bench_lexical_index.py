@@ -0,0 +1,80 @@
+"""
+BM25 lexical index: compile time, on-disk size and query latency by course size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_lexical_index [--sizes 1000,5000,20000,50000]
+
+Chunks are ~150 words drawn from a Zipf-distributed synthetic vocabulary
+(the 50 most frequent ranks are left out, as stopwords are by the tokenizer)
+and grouped into content items of 200 chunks. "compile s" is the cost of indexing
+one more content item into a course of that size (``replace_content``
+recompiles the whole course). Query latency includes tokenizing the question
+and fusing with a 16-hit vector list.
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.services.lexical_index import ContentTerms, LexicalIndex, reciprocal_rank_fusion
+
+VOCABULARY = 30_000
+STOPWORD_RANKS = 50
+WORDS_PER_CHUNK = 150
+CHUNKS_PER_CONTENT = 200
+QUERIES = 500
+TOP_K = 16
+COURSE_ID = 1
+
+
+def _words(rng: np.random.Generator, count: int) -> str:
+    ranks = rng.zipf(1.1, count * 2)
+    ranks = ranks[(ranks > STOPWORD_RANKS) & (ranks <= VOCABULARY)][:count]
+    return " ".join(f"w{rank}" for rank in ranks)
+
+
+def _content(rng: np.random.Generator, content_id: int) -> ContentTerms:
+    terms = ContentTerms()
+    for i in range(CHUNKS_PER_CONTENT):
+        terms.add(f"{content_id}_{i}", _words(rng, WORDS_PER_CHUNK))
+    return terms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000,50000")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'chunks':>8} {'compile s':>10} {'size MB':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        contents = max(1, size // CHUNKS_PER_CONTENT)
+        with tempfile.TemporaryDirectory() as root:
+            index = LexicalIndex(root)
+            with index._file_lock(COURSE_ID):
+                for content_id in range(contents - 1):
+                    index._write_content(COURSE_ID, content_id, _content(rng, content_id))
+            last = _content(rng, contents - 1)
+            started = time.perf_counter()
+            index.replace_content(COURSE_ID, contents - 1, last)
+            compile_seconds = time.perf_counter() - started
+            size_mb = os.path.getsize(index._postings_path(COURSE_ID)) / 1e6
+
+            vector_ids = [f"0_{i}" for i in range(TOP_K)]
+            queries = [_words(rng, 5) for _ in range(QUERIES)]
+            index.search(COURSE_ID, queries[0], TOP_K)  # Load postings
+            latencies = []
+            for query in queries:
+                query_started = time.perf_counter()
+                lexical = index.search(COURSE_ID, query, TOP_K)
+                reciprocal_rank_fusion([vector_ids, [chunk_id for chunk_id, _ in lexical]], k=60)
+                latencies.append((time.perf_counter() - query_started) * 1000)
+            latencies.sort()
+            print(
+                f"{size:>8} {compile_seconds:>10.2f} {size_mb:>8.1f} "
+                f"{latencies[len(latencies) // 2]:>8.3f} {latencies[int(len(latencies) * 0.99)]:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
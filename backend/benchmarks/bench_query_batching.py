@@ -0,0 +1,88 @@
+"""
+Query embedding throughput with and without micro-batching.
+
+Usage (from backend/):
+    python -m benchmarks.bench_query_batching [--students 200] [--window-ms 5] [--max-batch 32] [--synthetic]
+
+``--students`` questions are fired at once (a class hitting the assistant
+together). "single" encodes each on the embedding executor separately;
+"batched" goes through ``QueryBatcher``. ``--synthetic`` swaps the model for
+a NumPy stand-in with a per-call overhead, for machines without the model.
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from app.services.embedding_executor import EmbeddingExecutor
+from app.services.query_batcher import QueryBatcher
+
+QUESTIONS = [
+    "What is the difference between a process and a thread?",
+    "How does virtual memory map pages to frames?",
+    "Explain the CAP theorem with an example.",
+    "Why is quicksort O(n log n) on average?",
+    "What does the TCP three-way handshake do?",
+]
+
+
+def _synthetic_encoders():
+    rng = np.random.default_rng(0)
+    w1 = rng.standard_normal((384, 1536)).astype(np.float32)
+    w2 = rng.standard_normal((1536, 384)).astype(np.float32)
+
+    def encode_batch(texts):
+        tokens = np.ones((len(texts) * 32, 384), dtype=np.float32)  # ~32 tokens per question
+        for _ in range(6):  # Layers
+            tokens = np.tanh(np.tanh(tokens @ w1) @ w2)
+        time.sleep(0.002)  # Fixed per-call cost (tokenizer, dispatch)
+        return tokens.reshape(len(texts), 32, 384).mean(axis=1)
+
+    return lambda text: encode_batch([text])[0], encode_batch
+
+
+def _model_encoders():
+    from app.services.rag_service import RAGService
+
+    return RAGService._encode_query, RAGService._encode_queries
+
+
+async def _fire(embed, students: int):
+    async def one(i):
+        started = time.perf_counter()
+        await embed(QUESTIONS[i % len(QUESTIONS)])
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(one(i) for i in range(students))))
+    elapsed = time.perf_counter() - started
+    return students / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+async def main_async(args) -> None:
+    encode_one, encode_batch = _synthetic_encoders() if args.synthetic else _model_encoders()
+    encode_batch(QUESTIONS)  # Warm up
+
+    executor = EmbeddingExecutor(max_workers=1, max_queue=args.students)
+    batcher = QueryBatcher(encode_batch, window_ms=args.window_ms, max_batch=args.max_batch, executor=executor)
+
+    print(f"{'mode':<8} {'queries/s':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, embed in (
+        ("single", lambda text: executor.run(encode_one, text)),
+        ("batched", batcher.embed),
+    ):
+        qps, p50, p95 = await _fire(embed, args.students)
+        print(f"{name:<8} {qps:10.1f} {p50:9.1f} {p95:9.1f}")
+    print("batcher stats:", batcher.stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--synthetic", action="store_true", help="NumPy stand-in instead of the real model")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
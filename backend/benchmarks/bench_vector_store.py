@@ -0,0 +1,66 @@
+"""
+Query latency of ChromaDB (HNSW) vs. the NumPy exact-search store by course size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vector_store [--sizes 500,1000,2000,5000,10000,20000,50000]
+
+Random unit vectors stand in for chunk embeddings; both stores live in a
+temporary directory. The crossover is the first size where Chroma wins.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.core.config import settings
+from app.services.vector_store import ChromaVectorStore, NumpyVectorStore
+
+DIM = 384
+QUERIES = 200
+TOP_K = 16
+
+
+def _fill(store, course_id: int, vectors: np.ndarray) -> None:
+    for start in range(0, len(vectors), 1000):
+        batch = vectors[start:start + 1000]
+        ids = [f"c{course_id}_{start + i}" for i in range(len(batch))]
+        metadatas = [{"course_id": str(course_id), "content_id": "1"} for _ in ids]
+        store.upsert(course_id, ids, ["x"] * len(ids), batch, metadatas)
+    store.flush(course_id)
+
+
+def _time_queries(store, course_id: int, queries: np.ndarray) -> float:
+    store.query(course_id, queries[0], TOP_K)  # Warm caches / mmap
+    started = time.perf_counter()
+    for query in queries:
+        store.query(course_id, query, TOP_K)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="500,1000,2000,5000,10000,20000,50000")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.CHROMA_PATH = f"{tmp}/chroma"
+        settings.CHROMA_SHARDING = "course"
+        chroma_store = ChromaVectorStore()
+        numpy_store = NumpyVectorStore(f"{tmp}/numpy")
+
+        print(f"{'chunks':>8} {'chroma ms':>10} {'numpy ms':>10}")
+        for course_id, size in enumerate(sizes, start=1):
+            vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            queries = rng.standard_normal((QUERIES, DIM)).astype(np.float32)
+
+            _fill(chroma_store, course_id, vectors)
+            _fill(numpy_store, course_id, vectors)
+            chroma_ms = _time_queries(chroma_store, course_id, queries)
+            numpy_ms = _time_queries(numpy_store, course_id, queries)
+            print(f"{size:>8} {chroma_ms:>10.3f} {numpy_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
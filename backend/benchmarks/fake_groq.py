@@ -0,0 +1,120 @@
+"""
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint.
+
+    python -m benchmarks.fake_groq [--port 8765] [--latency-ms 80] [--error-rate 0.2]
+
+then point the API at it with GROQ_BASE_URL=http://127.0.0.1:8765/openai/v1.
+Supports ``stream: true`` (SSE deltas). Behaviour can be changed at runtime
+through ``FakeGroq.behaviour`` when used from a benchmark or test.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "A linked list stores elements in nodes that point to the next node, so inserts are O(1) once you hold the node."
+
+
+@dataclass
+class Behaviour:
+    latency_ms: float = 80.0  # Typical completion time
+    slow_rate: float = 0.0  # Share of requests that take slow_ms instead (tail latency)
+    slow_ms: float = 1000.0
+    error_rate: float = 0.0  # Share of requests answered with error_status
+    error_status: int = 503
+    fail_first: int = 0  # The first n requests are answered with error_status
+    slow_first: int = 0  # The first n requests take slow_ms
+    token_delay_ms: float = 5.0  # Gap between streamed deltas
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    server: "FakeGroq"
+
+    def log_message(self, format, *args):  # Quiet
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        behaviour = self.server.behaviour
+        number = self.server.count()
+
+        if number <= behaviour.fail_first or random.random() < behaviour.error_rate:
+            self._send_json(behaviour.error_status, {"error": {"message": "fake failure"}})
+            return
+        slow = number <= behaviour.slow_first or random.random() < behaviour.slow_rate
+        time.sleep((behaviour.slow_ms if slow else behaviour.latency_ms) / 1000)
+
+        if not request.get("stream"):
+            self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": ANSWER}}]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in ANSWER.split(" "):
+            event = {"choices": [{"delta": {"content": word + " "}}]}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(behaviour.token_delay_ms / 1000)
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeGroq(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, behaviour: Behaviour = None):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.behaviour = behaviour or Behaviour()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        pass  # Hedged requests are cancelled client-side; broken pipes are expected
+
+    def count(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/openai/v1"
+
+    def start(self) -> "FakeGroq":
+        threading.Thread(target=self.serve_forever, name="fake-groq", daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+    server = FakeGroq(args.port, Behaviour(args.latency_ms, args.slow_rate, error_rate=args.error_rate, error_status=args.error_status))
+    print(f"Fake Groq listening on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
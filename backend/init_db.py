@@ -2,11 +2,22 @@
 Initialize the database with tables.
 Run this script to create all database tables.
 """
+from sqlalchemy import text
+from app.core.config import settings
 from app.core.database import engine, Base
-from app.models import User, Course, CourseContent, Enrollment, ContentProgress, Exam, Question, Result, NotificationToken, InAppNotification,  StudentQuery, VectorIndex, RagThread
+from app.models import User, Course, CourseContent, Enrollment, ContentProgress, Exam, Question, Result, NotificationToken, InAppNotification,  StudentQuery, VectorIndex, RagThread, IndexingJob
+from app.models.rag import ensure_pgvector_schema
 
 if __name__ == "__main__":
     print("Creating database tables...")
+    # document_chunks.embedding is a pgvector column only for the pgvector backend
+    use_pgvector = engine.dialect.name == "postgresql" and settings.VECTOR_STORE_BACKEND == "pgvector"
+    if use_pgvector:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
     Base.metadata.create_all(bind=engine)
+    if use_pgvector:
+        # Also converts a document_chunks table created for another backend
+        with engine.begin() as connection:
+            ensure_pgvector_schema(connection)
     print("Database tables created successfully!")
-
@@ -0,0 +1,88 @@
+"""
+Move existing ChromaDB vectors between collection layouts.
+
+    python migrate_chroma_shards.py --from global --to course
+
+Every record is copied (embedding, document and metadata) into the collection
+its ``course_id`` maps to under the target layout, then removed from the
+source unless --keep-source is given. Source collections left empty are
+dropped. Run it once after changing CHROMA_SHARDING, with the API and
+indexing worker stopped. Moving away from ``global`` is optional: the sharded
+layouts adopt each course's legacy vectors the first time the course is used,
+and this script just does it for all courses at once.
+"""
+import argparse
+from collections import defaultdict
+from app.core.chroma import collection_name_for_course, forget_collection, get_chroma_client, get_collection
+from app.core.config import settings
+
+LAYOUTS = ("global", "course", "hash")
+
+
+def _source_collections(layout: str):
+    client = get_chroma_client()
+    names = [collection.name for collection in client.list_collections()]
+    if layout == "global":
+        prefix_names = [settings.CHROMA_COLLECTION]
+    else:
+        prefix = f"{settings.CHROMA_COLLECTION}_{'course' if layout == 'course' else 'shard'}_"
+        prefix_names = [name for name in names if name.startswith(prefix)]
+    return [name for name in prefix_names if name in names]
+
+
+def migrate(source_layout: str, target_layout: str, batch_size: int, keep_source: bool) -> None:
+    moved = 0
+    for source_name in _source_collections(source_layout):
+        source = get_collection(source_name)
+        offset = 0
+        while True:
+            page = source.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=batch_size,
+                offset=offset,
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                break
+
+            by_target = defaultdict(list)
+            for i, chunk_id in enumerate(ids):
+                metadata = page["metadatas"][i] or {}
+                course_id = metadata.get("course_id")
+                if course_id is None:
+                    continue
+                target_name = collection_name_for_course(int(course_id), target_layout)
+                if target_name != source_name:
+                    by_target[target_name].append(i)
+
+            for target_name, indices in by_target.items():
+                get_collection(target_name).upsert(
+                    ids=[ids[i] for i in indices],
+                    embeddings=[page["embeddings"][i] for i in indices],
+                    documents=[page["documents"][i] for i in indices],
+                    metadatas=[page["metadatas"][i] for i in indices],
+                )
+                moved += len(indices)
+                if not keep_source:
+                    source.delete(ids=[ids[i] for i in indices])
+
+            # Records that were deleted shift the remaining ones down
+            offset += len(ids) - (0 if keep_source else sum(len(v) for v in by_target.values()))
+            print(f"{source_name}: processed {len(ids)} records, {moved} moved so far")
+
+        if not keep_source and source.count() == 0:
+            get_chroma_client().delete_collection(source_name)
+            forget_collection(source_name)
+            print(f"Dropped empty collection {source_name}")
+
+    print(f"Migration complete: {moved} vectors moved from '{source_layout}' to '{target_layout}' layout")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move ChromaDB vectors between sharding layouts")
+    parser.add_argument("--from", dest="source", choices=LAYOUTS, default="global")
+    parser.add_argument("--to", dest="target", choices=LAYOUTS, default=settings.CHROMA_SHARDING)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--keep-source", action="store_true", help="copy without deleting from the source")
+    args = parser.parse_args()
+    migrate(args.source, args.target, args.batch_size, args.keep_source)
@@ -0,0 +1,89 @@
+"""AdaptiveBatchSizer reacting to synthetic RSS and available-memory readings."""
+from types import SimpleNamespace
+import pytest
+from app.services import adaptive_batching
+from app.services.adaptive_batching import MB, AdaptiveBatchSizer
+
+PLENTY_AVAILABLE = 4096 * MB
+
+
+class FakeMemory:
+    """Stands in for psutil: RSS of the process and memory available system-wide."""
+
+    def __init__(self, rss_mb: float, available_mb: float = PLENTY_AVAILABLE / MB):
+        self.rss = int(rss_mb * MB)
+        self.available = int(available_mb * MB)
+
+    def memory_info(self):
+        return SimpleNamespace(rss=self.rss)
+
+    def virtual_memory(self):
+        return SimpleNamespace(available=self.available)
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    fake = FakeMemory(rss_mb=300)
+    monkeypatch.setattr(adaptive_batching.psutil, "virtual_memory", fake.virtual_memory)
+    return fake
+
+
+def _sizer(memory: FakeMemory, ceiling_mb: int, initial: int = 8) -> AdaptiveBatchSizer:
+    sizer = AdaptiveBatchSizer(
+        initial=initial, max_size=64, memory_ceiling_mb=ceiling_mb, min_available_mb=64
+    )
+    sizer._process = memory
+    sizer.start()
+    return sizer
+
+
+def test_grows_while_growth_leaves_headroom(memory):
+    sizer = _sizer(memory, ceiling_mb=1000)  # 700 MB budget above the 300 MB baseline
+    memory.rss = 400 * MB
+
+    assert [sizer.observe() for _ in range(4)] == [16, 32, 64, 64]
+
+
+def test_shrinks_when_growth_nears_budget(memory):
+    sizer = _sizer(memory, ceiling_mb=1000, initial=32)
+    memory.rss = 950 * MB  # 650 of 700 MB used
+
+    assert [sizer.observe() for _ in range(6)] == [16, 8, 4, 2, 1, 1]
+
+
+def test_holds_between_thresholds(memory):
+    sizer = _sizer(memory, ceiling_mb=1000)
+    memory.rss = 800 * MB  # 500 of 700 MB used: neither grow nor shrink
+
+    assert sizer.observe() == 8
+
+
+def test_zero_budget_is_pressure(memory):
+    # Model alone already at the ceiling, as on the 512 MB tier
+    memory.rss = 470 * MB
+    sizer = _sizer(memory, ceiling_mb=460, initial=16)
+    assert sizer.stats()["baseline_rss_mb"] == 470
+
+    assert [sizer.observe() for _ in range(5)] == [8, 4, 2, 1, 1]
+
+
+def test_rss_at_ceiling_is_pressure(memory):
+    sizer = _sizer(memory, ceiling_mb=1000, initial=16)
+    memory.rss = 1000 * MB
+
+    assert sizer.observe() == 8
+
+
+def test_low_available_memory_shrinks(memory):
+    sizer = _sizer(memory, ceiling_mb=1000)
+    memory.available = 32 * MB
+
+    assert sizer.observe() == 4
+
+
+def test_baseline_taken_once(memory):
+    sizer = _sizer(memory, ceiling_mb=1000)
+    memory.rss = 600 * MB
+    sizer.start()
+
+    assert sizer.stats()["baseline_rss_mb"] == 300
@@ -0,0 +1,35 @@
+"""Single-pass chunker against the previous implementation on the golden corpus.
+
+The corpus and the reference chunker live in ``benchmarks.bench_chunker``,
+which also reports throughput; this runs its golden check as part of the suite.
+"""
+import random
+import pytest
+from app.services.chunking import split_text_into_chunks
+from app.services.ingestion_pipeline import clean_extracted_text
+from benchmarks.bench_chunker import _page, _sentence, legacy_clean, legacy_split
+
+PAGES = 500
+
+
+def _new_path(raw: str) -> list:
+    return split_text_into_chunks(clean_extracted_text(raw), chunk_size=900, overlap_sentences=2)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_golden_corpus_matches_previous_chunker(seed):
+    rng = random.Random(seed)
+    chunks = 0
+    for page_number in range(PAGES):
+        raw = _page(rng)
+        expected = legacy_split(legacy_clean(raw))
+        assert _new_path(raw) == expected, f"page {page_number} differs"
+        chunks += len(expected)
+    assert chunks > PAGES  # The corpus spans chunk boundaries, not just single-chunk pages
+
+
+def test_long_page_without_paragraph_breaks_matches_previous_chunker():
+    rng = random.Random(2)
+    raw = "\n".join(_sentence(rng) for _ in range(2000))
+
+    assert _new_path(raw) == legacy_split(legacy_clean(raw))
@@ -0,0 +1,160 @@
+"""GroqClient retries, circuit breaker and hedging against the local fake Groq server."""
+import asyncio
+import time
+import pytest
+from app.core.config import settings
+from app.services.groq_client import CircuitBreaker, CircuitOpenError, GroqClient, GroqRequestError, GroqUnavailableError
+from app.services.http_client import close_http_client
+from benchmarks.fake_groq import Behaviour, FakeGroq
+
+PAYLOAD = {"model": "llama-3.1-8b-instant", "messages": [{"role": "user", "content": "What is a linked list?"}]}
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "GROQ_RETRY_MAX_SECONDS", 0.05)
+
+
+@pytest.fixture
+def server():
+    fake = FakeGroq(behaviour=Behaviour(latency_ms=5)).start()
+    yield fake
+    fake.shutdown()
+    fake.server_close()
+
+
+def _client(server, **kwargs) -> GroqClient:
+    kwargs.setdefault("hedge_after_ms", 0)
+    return GroqClient(base_url=server.base_url, api_key="test", **kwargs)
+
+
+def _run(*calls):
+    """Await the calls in order on one loop; each result is the response or the raised exception."""
+
+    async def main():
+        results = []
+        try:
+            for call in calls:
+                try:
+                    results.append(await call())
+                except Exception as exc:
+                    results.append(exc)
+        finally:
+            await close_http_client()
+        return results
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_retryable_status_until_success(server, status):
+    server.behaviour = Behaviour(latency_ms=5, fail_first=2, error_status=status)
+    client = _client(server, max_attempts=3)
+
+    (body,) = _run(lambda: client.complete(PAYLOAD))
+
+    assert body["choices"][0]["message"]["content"]
+    assert server.requests == 3
+    assert client.stats()["retries"] == 2
+    assert client.breaker.state == "closed"
+
+
+def test_gives_up_after_max_attempts(server):
+    server.behaviour = Behaviour(latency_ms=5, error_rate=1.0, error_status=502)
+    client = _client(server, max_attempts=3)
+
+    (error,) = _run(lambda: client.complete(PAYLOAD))
+
+    assert isinstance(error, GroqUnavailableError)
+    assert server.requests == 3
+
+
+@pytest.mark.parametrize("status", [400, 413])
+def test_rejected_request_is_not_retried_and_does_not_trip_breaker(server, status):
+    server.behaviour = Behaviour(latency_ms=5, error_rate=1.0, error_status=status)
+    client = _client(server, max_attempts=3, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=60))
+
+    errors = _run(lambda: client.complete(PAYLOAD), lambda: client.complete(PAYLOAD))
+
+    assert all(isinstance(error, GroqRequestError) and error.status_code == status for error in errors)
+    assert server.requests == 2
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_opens_and_short_circuits(server):
+    server.behaviour = Behaviour(latency_ms=5, error_rate=1.0, error_status=503)
+    client = _client(server, max_attempts=1, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60))
+
+    results = _run(*[lambda: client.complete(PAYLOAD)] * 4)
+
+    assert not any(isinstance(error, CircuitOpenError) for error in results[:2])
+    assert all(isinstance(error, CircuitOpenError) for error in results[2:])
+    assert server.requests == 2
+    assert client.breaker.state == "open"
+    assert client.stats()["short_circuited"] == 2
+
+
+def test_timeouts_count_towards_breaker(server):
+    server.behaviour = Behaviour(latency_ms=500)
+    client = _client(
+        server, max_attempts=1, attempt_timeout=0.05, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    )
+
+    (error,) = _run(lambda: client.complete(PAYLOAD))
+
+    assert isinstance(error, GroqUnavailableError)
+    assert client.breaker.state == "open"
+
+
+def test_half_open_probe_closes_on_success_and_reopens_on_failure(server):
+    server.behaviour = Behaviour(latency_ms=5, error_rate=1.0, error_status=503)
+    client = _client(server, max_attempts=1, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=0.2))
+
+    _run(lambda: client.complete(PAYLOAD))
+    assert client.breaker.state == "open"
+    time.sleep(0.25)
+    assert client.breaker.state == "half_open"
+
+    # A failed probe opens the breaker again straight away
+    (error,) = _run(lambda: client.complete(PAYLOAD))
+    assert isinstance(error, GroqUnavailableError) and not isinstance(error, CircuitOpenError)
+    assert client.breaker.state == "open"
+
+    time.sleep(0.25)
+    server.behaviour = Behaviour(latency_ms=5)
+    requests_before = server.requests
+    (body,) = _run(lambda: client.complete(PAYLOAD))
+    assert body["choices"][0]["message"]["content"]
+    assert server.requests == requests_before + 1
+    assert client.breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through(server):
+    server.behaviour = Behaviour(latency_ms=5, error_rate=1.0, error_status=503)
+    client = _client(server, max_attempts=1, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=0.2))
+    _run(lambda: client.complete(PAYLOAD))
+    time.sleep(0.25)
+    server.behaviour = Behaviour(latency_ms=200)
+
+    async def concurrent():
+        return await asyncio.gather(*[client.complete(PAYLOAD) for _ in range(3)], return_exceptions=True)
+
+    (results,) = _run(concurrent)
+
+    assert sum(isinstance(result, CircuitOpenError) for result in results) == 2
+    assert client.breaker.state == "closed"
+
+
+def test_hedge_wins_on_slow_primary(server):
+    server.behaviour = Behaviour(latency_ms=5, slow_first=1, slow_ms=2000)
+    client = _client(server, max_attempts=1, hedge_after_ms=50)
+
+    started = time.perf_counter()
+    (body,) = _run(lambda: client.complete(PAYLOAD))
+    elapsed = time.perf_counter() - started
+
+    assert body["choices"][0]["message"]["content"]
+    assert elapsed < 1.0
+    assert client.stats()["hedges"] == 1
+    assert client.stats()["hedge_wins"] == 1
@@ -0,0 +1,81 @@
+"""Hybrid retrieval: BM25 hits fused with vector hits change the ranking."""
+import numpy as np
+import pytest
+from app.services.lexical_index import ContentTerms, LexicalIndex, reciprocal_rank_fusion
+from app.services.vector_store import NumpyVectorStore
+
+COURSE_ID = 1
+CONTENT_ID = 7
+DIM = 16
+QUESTION = "How does np.linalg.norm normalize a vector?"
+
+# Vector search ranks the generic chunks first; only the last one names the function
+CHUNKS = [
+    ("c0", "Vectors can be scaled so that their length is one."),
+    ("c1", "Normalizing data keeps features on a comparable scale."),
+    ("c2", "Unit vectors point in a direction with length one."),
+    ("c3", "Matrices and vectors are the core objects of linear algebra."),
+    ("c4", "Call np.linalg.norm(v) and divide v by the result."),
+]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    question_vector = np.zeros(DIM, dtype=np.float32)
+    question_vector[0] = 1.0
+    vectors = []
+    for i in range(len(CHUNKS)):
+        vector = np.zeros(DIM, dtype=np.float32)
+        vector[0] = 1.0 - 0.15 * i  # Decreasing similarity to the question
+        vector[i + 1] = 0.5
+        vectors.append(vector)
+
+    vector_store = NumpyVectorStore(str(tmp_path / "vectors"))
+    vector_store.upsert(
+        COURSE_ID,
+        [chunk_id for chunk_id, _ in CHUNKS],
+        [text for _, text in CHUNKS],
+        np.stack(vectors),
+        [{"content_id": str(CONTENT_ID), "chunk_index": i} for i in range(len(CHUNKS))],
+    )
+    vector_store.flush(COURSE_ID)
+
+    lexical = LexicalIndex(str(tmp_path / "lexical"))
+    terms = ContentTerms()
+    for chunk_id, text in CHUNKS:
+        terms.add(chunk_id, text)
+    lexical.replace_content(COURSE_ID, CONTENT_ID, terms)
+    return vector_store, lexical, question_vector
+
+
+def test_fusion_promotes_exact_term_match(stores):
+    vector_store, lexical, question_vector = stores
+    vector_ranking = [hit.id for hit in vector_store.query(COURSE_ID, question_vector, len(CHUNKS))]
+    keyword_ranking = [chunk_id for chunk_id, _ in lexical.search(COURSE_ID, QUESTION, len(CHUNKS))]
+
+    fused = reciprocal_rank_fusion([vector_ranking, keyword_ranking])
+    fused_ranking = sorted(fused, key=fused.get, reverse=True)
+
+    assert vector_ranking == ["c0", "c1", "c2", "c3", "c4"]
+    assert keyword_ranking[0] == "c4"
+    assert fused_ranking[0] == "c4"
+    assert fused_ranking != vector_ranking
+
+
+def test_hybrid_search_reranks_vector_hits(stores, monkeypatch):
+    rag_service = pytest.importorskip("app.services.rag_service")
+    vector_store, lexical, question_vector = stores
+    monkeypatch.setattr(rag_service, "get_lexical_index", lambda: lexical)
+    monkeypatch.setattr(rag_service.settings, "LEXICAL_INDEX_ENABLED", True)
+    service = rag_service.RAGService.__new__(rag_service.RAGService)
+    service.vector_store = vector_store
+
+    hits, scores, keyword_ids = service._hybrid_search(COURSE_ID, QUESTION, question_vector, len(CHUNKS))
+
+    assert hits[0].id == "c4"
+    assert "c4" in keyword_ids
+    assert scores == sorted(scores, reverse=True)
+
+    monkeypatch.setattr(rag_service.settings, "LEXICAL_INDEX_ENABLED", False)
+    vector_only, _, _ = service._hybrid_search(COURSE_ID, QUESTION, question_vector, len(CHUNKS))
+    assert vector_only[0].id == "c0"
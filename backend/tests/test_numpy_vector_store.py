@@ -0,0 +1,82 @@
+"""NumpyVectorStore write buffering: bounded flushes and discarding a failed run."""
+import numpy as np
+import pytest
+from app.services.vector_store import NumpyVectorStore
+
+DIM = 8
+COURSE_ID = 1
+
+
+def _upsert(store, content_id, ids):
+    rng = np.random.default_rng(len(ids))
+    store.upsert(
+        COURSE_ID,
+        ids,
+        [f"text {chunk_id}" for chunk_id in ids],
+        rng.standard_normal((len(ids), DIM)),
+        [{"content_id": str(content_id), "chunk_index": i} for i in range(len(ids))],
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return NumpyVectorStore(str(tmp_path), flush_rows=4)
+
+
+def test_buffered_until_flush(store):
+    _upsert(store, 10, ["a0", "a1"])
+    assert store.inventory() == {}
+
+    store.flush(COURSE_ID)
+    assert store.inventory() == {COURSE_ID: {10: 2}}
+
+
+def test_flushes_once_buffer_reaches_flush_rows(store):
+    _upsert(store, 10, ["a0", "a1", "a2"])
+    assert store.inventory() == {}
+
+    _upsert(store, 10, ["a3", "a4"])
+    assert store.inventory() == {COURSE_ID: {10: 5}}
+    assert COURSE_ID not in store._pending
+
+    _upsert(store, 10, ["a5"])
+    assert store.inventory() == {COURSE_ID: {10: 5}}  # The counter restarted after the flush
+
+
+def test_discard_drops_only_that_content(store):
+    _upsert(store, 10, ["a0", "a1"])
+    _upsert(store, 20, ["b0"])
+    store.update_metadata(COURSE_ID, ["a0"], [{"content_id": "10", "chunk_index": 5}])
+
+    store.discard(COURSE_ID, 10)
+    # The GC's delete_content flushes the course; the failed run must not be written
+    store.delete_content(COURSE_ID, 30)
+
+    assert store.inventory() == {COURSE_ID: {20: 1}}
+
+
+def test_discard_trims_mixed_batches_and_resets_row_count(store):
+    store.upsert(
+        COURSE_ID,
+        ["a0", "b0", "a1"],
+        ["a0", "b0", "a1"],
+        np.eye(3, DIM),
+        [{"content_id": "10"}, {"content_id": "20"}, {"content_id": "10"}],
+    )
+    store.discard(COURSE_ID, 10)
+    assert store._pending_rows[COURSE_ID] == 1
+
+    store.flush(COURSE_ID)
+    (hit,) = store.fetch(COURSE_ID, ["a0", "b0", "a1"])
+    assert hit.id == "b0"
+    np.testing.assert_allclose(hit.embedding, np.eye(3, DIM)[1])
+
+
+def test_discard_keeps_already_flushed_chunks(store):
+    _upsert(store, 10, ["a0", "a1", "a2", "a3"])  # Flushed: reached flush_rows
+    _upsert(store, 10, ["a4"])
+
+    store.discard(COURSE_ID, 10)
+    store.flush(COURSE_ID)
+
+    assert store.inventory() == {COURSE_ID: {10: 4}}
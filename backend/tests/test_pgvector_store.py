@@ -0,0 +1,198 @@
+"""PgVectorStore against a real PostgreSQL with the vector extension.
+
+Skipped unless TEST_DATABASE_URL points at a database where
+``CREATE EXTENSION vector`` is allowed. Tables are created in a throwaway
+schema that is dropped afterwards.
+"""
+import os
+import uuid
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app.core.database import Base
+from app.models import Course, CourseContent, User
+from app.models.course import ContentType
+from app.models.rag import EMBEDDING_DIM, ensure_pgvector_schema
+from app.services.lexical_index import PgLexicalIndex
+from app.services.vector_store import PgVectorStore
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+def _unit(*axes: int) -> np.ndarray:
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    vector[list(axes)] = 1.0
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def engine():
+    schema = f"pgvector_test_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(TEST_DATABASE_URL)
+    with admin.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(TEST_DATABASE_URL, connect_args={"options": f"-csearch_path={schema},public"})
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            ensure_pgvector_schema(connection)
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+@pytest.fixture
+def contents(engine):
+    """Two courses; course 1 has content items A and B, course 2 has C. Returns their ids."""
+    with Session(engine) as db:
+        teacher = User(name="Teacher", email="teacher@example.com", password="x")
+        first = Course(title="Data structures", teacher=teacher)
+        second = Course(title="Algorithms", teacher=teacher)
+        items = [
+            CourseContent(course=first, type=ContentType.PDF, title="A", url="a.pdf"),
+            CourseContent(course=first, type=ContentType.PDF, title="B", url="b.pdf"),
+            CourseContent(course=second, type=ContentType.PDF, title="C", url="c.pdf"),
+        ]
+        db.add_all(items)
+        db.commit()
+        return {
+            "course_1": first.id,
+            "course_2": second.id,
+            "a": items[0].id,
+            "b": items[1].id,
+            "c": items[2].id,
+        }
+
+
+def _upsert(store, course_id, content_id, chunks):
+    """chunks: (chunk id, text, vector) tuples."""
+    store.upsert(
+        course_id,
+        [chunk_id for chunk_id, _, _ in chunks],
+        [chunk_text for _, chunk_text, _ in chunks],
+        [vector for _, _, vector in chunks],
+        [
+            {"content_id": str(content_id), "course_id": str(course_id), "chunk_index": i}
+            for i in range(len(chunks))
+        ],
+    )
+
+
+@pytest.fixture
+def store(engine, contents):
+    store = PgVectorStore(engine=engine)
+    _upsert(store, contents["course_1"], contents["a"], [("a0", "a zero", _unit(0)), ("a1", "a one", _unit(1))])
+    _upsert(store, contents["course_1"], contents["b"], [("b0", "b zero", _unit(2)), ("b1", "b one", _unit(2, 3))])
+    _upsert(store, contents["course_2"], contents["c"], [("c0", "c zero", _unit(2))])
+    return store
+
+
+def test_copy_upsert_inserts_and_merges_on_chunk_id(store, contents):
+    course_1, a = contents["course_1"], contents["a"]
+    # Existing id updated in place, in-batch duplicate collapsed, new id inserted
+    _upsert(
+        store,
+        course_1,
+        a,
+        [("a1", "a one, edited", _unit(4)), ("a2", "a two", _unit(5)), ("a2", "a two", _unit(5))],
+    )
+
+    assert store.inventory() == {
+        course_1: {a: 3, contents["b"]: 2},
+        contents["course_2"]: {contents["c"]: 1},
+    }
+    (hit,) = store.fetch(course_1, ["a1"])
+    assert hit.text == "a one, edited"
+    np.testing.assert_allclose(hit.embedding, _unit(4), atol=1e-6)
+    assert set(store.get_content_metadata(course_1, a)) == {"a0", "a1", "a2"}
+
+
+def test_query_is_limited_to_course(store, contents):
+    hits = store.query(contents["course_1"], _unit(2), top_k=10)
+
+    assert [hit.id for hit in hits][:2] == ["b0", "b1"]
+    assert "c0" not in {hit.id for hit in hits}
+    assert hits[0].similarity == pytest.approx(1.0, abs=1e-5)
+
+
+def test_content_scoped_query_is_exact_and_scoped(store, contents):
+    hits = store.query(contents["course_1"], _unit(2), top_k=10, content_ids=[contents["a"]])
+
+    # Every row of the scoped content comes back, even though none is near the query
+    assert sorted(hit.id for hit in hits) == ["a0", "a1"]
+
+
+def _plan(engine, store, content_ids) -> str:
+    """EXPLAIN of ``store.query``'s statement, with sequential scans discouraged so
+    the tiny test table still shows which indexes the query shape allows."""
+    statement, params = store._query_statement(1, _unit(2), 10, False, content_ids)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN " + statement, params)
+        return "\n".join(row for (row,) in cursor.fetchall())
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def test_scoped_query_plan_avoids_the_hnsw_index(engine, store, contents):
+    whole_course = _plan(engine, store, None)
+    scoped = _plan(engine, store, [contents["a"]])
+
+    # Control: the same conditions let the whole-course query order by the HNSW index
+    assert "ix_document_chunks_embedding_hnsw" in whole_course
+    assert "ix_document_chunks_embedding_hnsw" not in scoped
+    assert "ix_document_chunks_content_id" in scoped or "ix_document_chunks_course_id" in scoped
+
+
+def test_delete_content_and_course(store, contents):
+    store.delete_content(contents["course_1"], contents["a"])
+    assert store.inventory() == {
+        contents["course_1"]: {contents["b"]: 2},
+        contents["course_2"]: {contents["c"]: 1},
+    }
+
+    store.delete_course(contents["course_1"])
+    assert store.inventory() == {contents["course_2"]: {contents["c"]: 1}}
+    assert store.query(contents["course_1"], _unit(2), top_k=10) == []
+
+
+def test_keyword_search_reads_the_shared_chunk_rows(engine, store, contents):
+    lexical = PgLexicalIndex(engine=engine)
+    course_1 = contents["course_1"]
+
+    assert {chunk_id for chunk_id, _ in lexical.search(course_1, "What is zero?", 10)} == {"a0", "b0"}
+    assert [chunk_id for chunk_id, _ in lexical.search(course_1, "zero", 10, [contents["a"]])] == ["a0"]
+
+    store.delete_content(course_1, contents["a"])
+    assert [chunk_id for chunk_id, _ in lexical.search(course_1, "zero", 10)] == ["b0"]
+
+
+def test_ensure_pgvector_schema_is_idempotent(engine):
+    with engine.begin() as connection:
+        ensure_pgvector_schema(connection)
+        column_type = connection.execute(
+            text(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = 'document_chunks'::regclass AND attname = 'embedding'"
+            )
+        ).scalar()
+    assert column_type == f"vector({EMBEDDING_DIM})"
+    with engine.connect() as connection:
+        indexes = set(
+            connection.execute(text(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE schemaname = current_schema() AND tablename = 'document_chunks'"
+            )).scalars()
+        )
+    assert {"ix_document_chunks_embedding_hnsw", "ix_document_chunks_chunk_text_fts"} <= indexes